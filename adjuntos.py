@@ -0,0 +1,156 @@
+"""
+Actualización del campo "Adjuntos" del mensaje de cada caso en el canal de
+registros. Las solicitudes se agrupan por IUC: una ráfaga de documentos
+adjuntos produce una sola edición, hecha fuera de la interacción y sobre el
+mensaje ya cacheado.
+"""
+
+import asyncio
+
+import discord
+
+import repositorio
+from cache import CacheLRU
+
+LIMITE_CAMPO = 1024
+LIMITE_CAMPOS = 25
+LIMITE_EMBED = 6000
+NOMBRE_CAMPO = "Adjuntos"
+
+
+def lineas_adjuntos(docs) -> list:
+    """docs: repositorio.Documento en orden de registro."""
+    lineas = []
+    for i, d in enumerate(docs):
+        linea = f"{i+1}. {d.tipo} - {d.titulo or 'Sin título'}\n   IUS: {d.ius or '-'}\n   Link: {d.link_drive or '-'}"
+        lineas.append(linea[:LIMITE_CAMPO])
+    return lineas
+
+
+def dividir_en_campos(lineas, max_campos: int = LIMITE_CAMPOS, max_total: int = LIMITE_EMBED) -> list:
+    """Reparte las líneas en valores de campo de hasta 1024 caracteres (las
+    líneas más largas se recortan). Si no caben en `max_campos`/`max_total`,
+    el último valor indica cuántos faltan."""
+    if not lineas:
+        return ["Ninguno"]
+    # (valor, líneas que contiene)
+    valores, actual, cantidad = [], "", 0
+    for linea in lineas:
+        linea = linea[:LIMITE_CAMPO]
+        candidato = f"{actual}\n{linea}" if actual else linea
+        if len(candidato) > LIMITE_CAMPO:
+            valores.append((actual, cantidad))
+            actual, cantidad = linea, 1
+        else:
+            actual, cantidad = candidato, cantidad + 1
+    if actual:
+        valores.append((actual, cantidad))
+    if not valores:
+        return ["Ninguno"]
+
+    # recortar a lo que admite el embed (dejando espacio para el aviso)
+    total, cortados = 0, []
+    for valor in valores:
+        if len(cortados) == max_campos or total + len(valor[0]) + len(NOMBRE_CAMPO) + 8 > max_total:
+            break
+        cortados.append(valor)
+        total += len(valor[0]) + len(NOMBRE_CAMPO) + 8
+    if len(cortados) < len(valores):
+        if cortados:
+            cortados.pop()
+        mostradas = sum(n for _, n in cortados)
+        if max_campos > len(cortados):
+            cortados.append((f"… y {len(lineas) - mostradas} adjuntos más (ver /buscar-caso)", 0))
+    return [valor for valor, _ in cortados]
+
+
+def nombres_campos(cantidad: int) -> list:
+    if cantidad == 1:
+        return [NOMBRE_CAMPO]
+    return [f"{NOMBRE_CAMPO} ({i}/{cantidad})" for i in range(1, cantidad + 1)]
+
+
+class EditorAdjuntos:
+    """Programa y agrupa las ediciones del embed de cada caso. Los mensajes
+    se cachean por IUC con límite de tamaño; si no está en el cache, se vuelve
+    a pedir con fetch_message."""
+
+    def __init__(self, bot, db, espera: float = 2.0, max_mensajes: int = 512, ttl_mensajes: float = 3600.0):
+        self.bot = bot
+        self.db = db
+        self.espera = espera
+        self._tareas = {}
+        self._sucios = set()
+        self._mensajes = CacheLRU('mensajes', max_items=max_mensajes, ttl=ttl_mensajes)
+
+    @property
+    def pendientes(self) -> int:
+        return len(self._tareas)
+
+    def recordar(self, iuc: str, mensaje: discord.Message):
+        """Cachea el mensaje del caso (p. ej. recién enviado por /registrar-caso)."""
+        self._mensajes.set(iuc, mensaje)
+
+    def olvidar(self, iuc: str):
+        self._mensajes.invalidar(iuc)
+        self._sucios.discard(iuc)
+
+    def renombrar(self, iuc_actual: str, nuevo_iuc: str):
+        mensaje = self._mensajes.get(iuc_actual)
+        self._mensajes.invalidar(iuc_actual)
+        if mensaje:
+            self._mensajes.set(nuevo_iuc, mensaje)
+
+    def programar(self, iuc: str):
+        """Marca el caso para actualizar; varias llamadas seguidas producen una edición."""
+        self._sucios.add(iuc)
+        if iuc not in self._tareas:
+            self._tareas[iuc] = asyncio.create_task(self._procesar(iuc))
+
+    async def _procesar(self, iuc: str):
+        try:
+            while iuc in self._sucios:
+                await asyncio.sleep(self.espera)
+                self._sucios.discard(iuc)
+                try:
+                    await self._actualizar(iuc)
+                except Exception as e:
+                    print(f"Error actualizando mensaje del caso {iuc}: {e}")
+        finally:
+            self._tareas.pop(iuc, None)
+
+    async def _obtener_mensaje(self, iuc: str):
+        mensaje = self._mensajes.get(iuc)
+        if mensaje:
+            return mensaje
+        caso = await self.db.run(repositorio.casos.obtener, iuc)
+        if not caso or not caso.mensaje_id or not caso.canal_registros_id:
+            return None
+        canal_id = int(caso.canal_registros_id)
+        channel = self.bot.get_channel(canal_id) or await self.bot.fetch_channel(canal_id)
+        mensaje = await channel.fetch_message(int(caso.mensaje_id))
+        self._mensajes.set(iuc, mensaje)
+        return mensaje
+
+    async def _actualizar(self, iuc: str):
+        mensaje = await self._obtener_mensaje(iuc)
+        if not mensaje or not mensaje.embeds:
+            return
+        docs = await self.db.run(repositorio.documentos.de_caso, iuc)
+
+        embed = mensaje.embeds[0]
+        otros = [f for f in embed.fields if not f.name.startswith(NOMBRE_CAMPO)]
+        espacio = LIMITE_EMBED - len(embed.title or "") - len(embed.description or "") - sum(
+            len(f.name) + len(f.value) for f in otros)
+        valores = dividir_en_campos(lineas_adjuntos(docs), LIMITE_CAMPOS - len(otros), espacio)
+
+        embed.clear_fields()
+        for f in otros:
+            embed.add_field(name=f.name, value=f.value, inline=f.inline)
+        for nombre, valor in zip(nombres_campos(len(valores)), valores):
+            embed.add_field(name=nombre, value=valor, inline=False)
+
+        try:
+            self._mensajes.set(iuc, await mensaje.edit(embed=embed))
+        except discord.NotFound:
+            self.olvidar(iuc)
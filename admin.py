@@ -1,12 +1,206 @@
 """
 Script de administración para el bot de Procuraduría
 Permite gestionar la base de datos sin usar Discord
+
+Sin argumentos abre el menú interactivo. Con un subcomando funciona como CLI
+no interactiva con salida JSON, pensada para cron y tareas masivas:
+
+    python admin.py stats
+    python admin.py list pqrs --estado PENDIENTE --limit 50
+    python admin.py get caso IUC-E-2025-0001 IUC-E-2025-0002
+    python admin.py update-state pqrs RESPONDIDA PQRS-2025-0001 PQRS-2025-0002
+    python admin.py delete documento - < lista_ius.txt
+    python admin.py export --formato jsonl --gzip --incremental
+    python admin.py import expedientes.csv --registrado-por archivo-central --guild 123456789
+    python admin.py asignar-guild 123456789
+    python admin.py links-rotos --guild 123456789
+
+Las escrituras (update-state, delete, import, asignar-guild y el menú) avisan
+al bot en ejecución, que recarga su autocompletado y vacía sus caches en los
+segundos siguientes (CAMBIOS_EXTERNOS_INTERVALO, 5 por defecto).
 """
 
+import argparse
+import json
 import sqlite3
-from datetime import datetime
 import sys
+from contextlib import contextmanager
+from datetime import datetime
+
+import cambios_externos
+import configuracion
+import exportar
+import importar
+import migraciones
+import repositorio
+import validador_drive
+from basedatos import DB_PATH, conectar
+
+ESTADOS_CASO = ['EN TRAMITE', 'EN INVESTIGACION', 'ARCHIVADO', 'SANCIONADO', 'ABSUELTO']
+ESTADOS_PQRS = ['PENDIENTE', 'RESPONDIDA']
+
+# entidad -> tabla del repositorio (columna identificadora: IUS, IUC o radicado)
+ENTIDADES = {
+    'documento': repositorio.documentos,
+    'caso': repositorio.casos,
+    'pqrs': repositorio.pqrs,
+}
+ESTADOS = {'caso': ESTADOS_CASO, 'pqrs': ESTADOS_PQRS}
+
+# límite de parámetros por sentencia en versiones antiguas de SQLite
+TAMANO_LOTE = 500
+
+# ==================== OPERACIONES ====================
+def abrir():
+    conn = conectar(DB_PATH)
+    migraciones.aplicar(conn)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+@contextmanager
+def transaccion(conn):
+    """Transacción de escritura. Avisa al bot en ejecución (ver
+    cambios_externos.py) para que recargue su autocompletado y sus caches."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        cambios_externos.avisar(conn)
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+def _lotes(valores):
+    for i in range(0, len(valores), TAMANO_LOTE):
+        yield valores[i:i + TAMANO_LOTE]
+
+def _normalizar(ids):
+    return list(dict.fromkeys(i.strip().upper() for i in ids if i and i.strip()))
+
+def _existentes(conn, tabla, columna, ids):
+    encontrados = set()
+    for lote in _lotes(ids):
+        marcas = ",".join("?" * len(lote))
+        encontrados.update(r[0] for r in conn.execute(
+            f"SELECT {columna} FROM {tabla} WHERE {columna} IN ({marcas})", lote))
+    return [i for i in ids if i in encontrados]
+
+def estadisticas(conn) -> dict:
+    row = conn.execute("""SELECT
+        (SELECT COUNT(*) FROM documentos),
+        (SELECT COUNT(*) FROM casos),
+        (SELECT COUNT(*) FROM pqrs),
+        (SELECT COUNT(*) FROM pqrs WHERE estado = 'PENDIENTE'),
+        (SELECT COUNT(*) FROM pqrs WHERE estado = 'RESPONDIDA')""").fetchone()
+    return {
+        'documentos': row[0],
+        'casos': row[1],
+        'pqrs': row[2],
+        'pqrs_pendientes': row[3],
+        'pqrs_respondidas': row[4],
+    }
+
+def listar(conn, entidad, estado=None, limite=None) -> list:
+    filas = ENTIDADES[entidad].listar(conn, estado.upper() if estado else None, limite)
+    return [repositorio.como_dict(f) for f in filas]
+
+def obtener(conn, entidad, ids) -> list:
+    return [repositorio.como_dict(f) for f in ENTIDADES[entidad].obtener_varios(conn, _normalizar(ids))]
+
+def actualizar_estado(conn, entidad, estado, ids) -> dict:
+    """Cambia el estado de todos los IDs en una sola transacción."""
+    tabla, columna = ENTIDADES[entidad].nombre, ENTIDADES[entidad].clave
+    estado = estado.upper()
+    if estado not in ESTADOS.get(entidad, []):
+        raise ValueError(f"Estado inválido para {entidad}: {estado}")
+    ids = _normalizar(ids)
+    fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with transaccion(conn):
+        encontrados = _existentes(conn, tabla, columna, ids)
+        if entidad == 'caso':
+            conn.executemany(
+                "UPDATE casos SET estado = ?, fecha_cierre = CASE WHEN ? = 'ARCHIVADO' THEN ? ELSE fecha_cierre END WHERE iuc = ?",
+                [(estado, estado, fecha, i) for i in encontrados])
+        else:
+            conn.executemany(
+                "UPDATE pqrs SET estado = ? WHERE radicado = ?",
+                [(estado, i) for i in encontrados])
+    return {
+        'estado': estado,
+        'actualizados': encontrados,
+        'no_encontrados': [i for i in ids if i not in set(encontrados)],
+    }
+
+def eliminar(conn, entidad, ids) -> dict:
+    """Elimina todos los IDs en una sola transacción. Al eliminar un caso
+    también se eliminan sus documentos adjuntos (como /borrar-caso)."""
+    tabla, columna = ENTIDADES[entidad].nombre, ENTIDADES[entidad].clave
+    ids = _normalizar(ids)
+    documentos_eliminados = 0
+    with transaccion(conn):
+        encontrados = _existentes(conn, tabla, columna, ids)
+        if entidad == 'caso':
+            c = conn.executemany("DELETE FROM documentos WHERE attached_iuc = ?", [(i,) for i in encontrados])
+            documentos_eliminados = c.rowcount
+        conn.executemany(f"DELETE FROM {tabla} WHERE {columna} = ?", [(i,) for i in encontrados])
+    resultado = {
+        'eliminados': encontrados,
+        'no_encontrados': [i for i in ids if i not in set(encontrados)],
+    }
+    if entidad == 'caso':
+        resultado['documentos_eliminados'] = documentos_eliminados
+    return resultado
+
+def exportar_tablas(tablas=exportar.TABLAS, directorio='.', formato='csv', comprimir=False, incremental=False) -> list:
+    conn = conectar(DB_PATH)
+    try:
+        migraciones.aplicar(conn)
+        archivos = exportar.exportar(conn, tablas=tablas, directorio=directorio, formato=formato,
+                                     comprimir=comprimir, incremental=incremental)
+    finally:
+        conn.close()
+    return [{'archivo': ruta, 'filas': filas} for ruta, filas in archivos]
+
+class _Simulacion(Exception):
+    pass
+
+def importar_archivo(conn, ruta, registrado_por='admin', simular=False, guild_id=None) -> dict:
+    """Importa casos y documentos desde un CSV/JSONL en una sola transacción.
+    Con `simular` se validan y numeran las filas pero se deshace todo."""
+    with open(ruta, encoding='utf-8') as f:
+        filas = importar.leer_filas(f.read(), ruta)
+    try:
+        with transaccion(conn):
+            resultado = importar.importar(conn, filas, registrado_por, guild_id)
+            if simular:
+                raise _Simulacion
+    except _Simulacion:
+        pass
+    return {
+        'simulacion': simular,
+        'casos': [iuc for iuc, _ in resultado['casos']],
+        'documentos': [{'ius': ius, 'iuc': iuc} for ius, iuc in resultado['documentos']],
+    }
+
+def asignar_guild(conn, guild_id) -> dict:
+    """Asigna el servidor a los casos, documentos y PQRS que no tienen (bases
+    anteriores a la configuración por servidor)."""
+    with transaccion(conn):
+        asignadas = configuracion.asignar_guild(conn, guild_id)
+    return {'guild_id': str(guild_id), 'asignadas': asignadas}
+
+def links_rotos(conn, guild_id=None) -> dict:
+    """Documentos cuyo archivo de Drive ya no está disponible, según la última
+    verificación del bot (ver validador_drive.py)."""
+    return {
+        'archivos': validador_drive.conteos(conn),
+        'documentos': [
+            {'ius': ius, 'titulo': titulo, 'link': link, 'estado': estado, 'verificado_en': verificado_en}
+            for ius, titulo, link, estado, verificado_en in validador_drive.rotos(conn, guild_id)
+        ],
+    }
 
+# ==================== MENÚ INTERACTIVO ====================
 def menu_principal():
     print("\n" + "="*50)
     print("ADMINISTRADOR - BOT PROCURADURÍA")
@@ -15,234 +209,264 @@ def menu_principal():
     print("2. Listar todos los documentos")
     print("3. Listar todos los casos")
     print("4. Listar todas las PQRS")
-    print("5. Buscar documento por número")
+    print("5. Buscar documento por IUS")
     print("6. Buscar caso por IUC")
     print("7. Eliminar documento")
     print("8. Actualizar estado de caso")
-    print("9. Exportar base de datos a CSV")
+    print("9. Exportar base de datos")
     print("0. Salir")
     print("="*50)
 
 def ver_estadisticas():
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
-    
-    c.execute("SELECT COUNT(*) FROM documentos")
-    total_docs = c.fetchone()[0]
-    
-    c.execute("SELECT COUNT(*) FROM casos")
-    total_casos = c.fetchone()[0]
-    
-    c.execute("SELECT COUNT(*) FROM pqrs")
-    total_pqrs = c.fetchone()[0]
-    
-    c.execute("SELECT COUNT(*) FROM pqrs WHERE estado = 'PENDIENTE'")
-    pqrs_pendientes = c.fetchone()[0]
-    
-    c.execute("SELECT COUNT(*) FROM pqrs WHERE estado = 'RESPONDIDA'")
-    pqrs_respondidas = c.fetchone()[0]
-    
+    conn = abrir()
+    stats = estadisticas(conn)
     conn.close()
-    
+
     print("\n📊 ESTADÍSTICAS")
-    print(f"Total documentos: {total_docs}")
-    print(f"Total casos (IUC): {total_casos}")
-    print(f"Total PQRS: {total_pqrs}")
-    print(f"  - Pendientes: {pqrs_pendientes}")
-    print(f"  - Respondidas: {pqrs_respondidas}")
+    print(f"Total documentos: {stats['documentos']}")
+    print(f"Total casos (IUC): {stats['casos']}")
+    print(f"Total PQRS: {stats['pqrs']}")
+    print(f"  - Pendientes: {stats['pqrs_pendientes']}")
+    print(f"  - Respondidas: {stats['pqrs_respondidas']}")
 
 def listar_documentos():
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
-    c.execute("SELECT tipo, numero, anio, titulo FROM documentos ORDER BY anio DESC, numero DESC")
-    docs = c.fetchall()
+    conn = abrir()
+    docs = listar(conn, 'documento')
     conn.close()
-    
+
     if not docs:
         print("\n❌ No hay documentos registrados")
         return
-    
+
     print("\n📄 DOCUMENTOS REGISTRADOS")
     print("-" * 80)
     for doc in docs:
-        print(f"{doc[0]} {doc[1]} de {doc[2]} - {doc[3]}")
+        adjunto = f" (IUC {doc['attached_iuc']})" if doc['attached_iuc'] else ""
+        print(f"{doc['tipo']} {doc['ius'] or '-'} - {doc['titulo']}{adjunto}")
 
 def listar_casos():
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
-    c.execute("SELECT iuc, tipo, implicado, estado FROM casos ORDER BY fecha_apertura DESC")
-    casos = c.fetchall()
+    conn = abrir()
+    casos = listar(conn, 'caso')
     conn.close()
-    
+
     if not casos:
         print("\n❌ No hay casos registrados")
         return
-    
+
     print("\n📋 CASOS REGISTRADOS")
     print("-" * 80)
     for caso in casos:
-        print(f"{caso[0]} - {caso[1]} - {caso[2]} - Estado: {caso[3]}")
+        print(f"{caso['iuc']} - {caso['tipo']} - {caso['implicado']} - Estado: {caso['estado']}")
 
 def listar_pqrs():
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
-    c.execute("SELECT radicado, tipo, usuario_nombre, asunto, estado FROM pqrs ORDER BY fecha_radicacion DESC")
-    pqrs_list = c.fetchall()
+    conn = abrir()
+    pqrs_list = listar(conn, 'pqrs')
     conn.close()
-    
+
     if not pqrs_list:
         print("\n❌ No hay PQRS registradas")
         return
-    
+
     print("\n📨 PQRS REGISTRADAS")
     print("-" * 80)
     for pqrs in pqrs_list:
-        print(f"{pqrs[0]} - {pqrs[1]} - {pqrs[2]}")
-        print(f"  Asunto: {pqrs[3]}")
-        print(f"  Estado: {pqrs[4]}")
+        print(f"{pqrs['radicado']} - {pqrs['tipo']} - {pqrs['usuario_nombre']}")
+        print(f"  Asunto: {pqrs['asunto']}")
+        print(f"  Estado: {pqrs['estado']}")
         print()
 
 def buscar_documento():
-    numero = input("\nIngrese número de documento: ")
-    
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
-    c.execute("SELECT * FROM documentos WHERE numero = ?", (numero,))
-    docs = c.fetchall()
+    ius = input("\nIngrese IUS del documento: ").upper()
+
+    conn = abrir()
+    docs = obtener(conn, 'documento', [ius])
     conn.close()
-    
+
     if not docs:
-        print(f"\n❌ No se encontró documento con número {numero}")
+        print(f"\n❌ No se encontró documento con IUS {ius}")
         return
-    
+
     for doc in docs:
-        print(f"\n📄 {doc[1]} {doc[2]} de {doc[3]}")
-        print(f"Título: {doc[4]}")
-        print(f"Link: {doc[6]}")
-        print(f"Registrado por: {doc[8]} el {doc[7]}")
+        print(f"\n📄 {doc['tipo']} {doc['ius']}")
+        print(f"Título: {doc['titulo']}")
+        print(f"Link: {doc['link_drive']}")
+        print(f"Adjunto a: {doc['attached_iuc'] or '-'}")
+        print(f"Registrado por: {doc['registrado_por']} el {doc['fecha_registro']}")
 
 def buscar_caso():
     iuc = input("\nIngrese IUC: ").upper()
-    
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
-    c.execute("SELECT * FROM casos WHERE iuc = ?", (iuc,))
-    caso = c.fetchone()
+
+    conn = abrir()
+    casos = obtener(conn, 'caso', [iuc])
     conn.close()
-    
-    if not caso:
+
+    if not casos:
         print(f"\n❌ No se encontró caso {iuc}")
         return
-    
-    print(f"\n📋 Caso {caso[1]}")
-    print(f"Tipo: {caso[2]}")
-    print(f"Implicado: {caso[4]}")
-    print(f"Estado: {caso[5]}")
-    print(f"Descripción: {caso[6]}")
-    print(f"Fecha apertura: {caso[7]}")
+
+    caso = casos[0]
+    print(f"\n📋 Caso {caso['iuc']}")
+    print(f"Tipo: {caso['tipo']}")
+    print(f"Implicado: {caso['implicado']}")
+    print(f"Estado: {caso['estado']}")
+    print(f"Visibilidad: {caso['visibilidad']}")
+    print(f"Descripción: {caso['descripcion']}")
+    print(f"Fecha apertura: {caso['fecha_apertura']}")
 
 def eliminar_documento():
-    numero = input("\nIngrese número de documento a eliminar: ")
-    confirmar = input(f"¿Seguro que desea eliminar el documento {numero}? (s/n): ")
-    
+    ius = input("\nIngrese IUS del documento a eliminar: ").upper()
+    confirmar = input(f"¿Seguro que desea eliminar el documento {ius}? (s/n): ")
+
     if confirmar.lower() != 's':
         print("Operación cancelada")
         return
-    
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
-    c.execute("DELETE FROM documentos WHERE numero = ?", (numero,))
-    conn.commit()
-    
-    if c.rowcount > 0:
-        print(f"✅ Documento {numero} eliminado")
-    else:
-        print(f"❌ No se encontró documento con número {numero}")
-    
+
+    conn = abrir()
+    resultado = eliminar(conn, 'documento', [ius])
     conn.close()
 
+    if resultado['eliminados']:
+        print(f"✅ Documento {ius} eliminado")
+    else:
+        print(f"❌ No se encontró documento con IUS {ius}")
+
 def actualizar_estado_caso():
     iuc = input("\nIngrese IUC del caso: ").upper()
-    
+
     print("\nEstados disponibles:")
-    print("1. EN TRAMITE")
-    print("2. EN INVESTIGACION")
-    print("3. ARCHIVADO")
-    print("4. SANCIONADO")
-    print("5. ABSUELTO")
-    
-    opcion = input("Seleccione nuevo estado (1-5): ")
-    
-    estados = {
-        '1': 'EN TRAMITE',
-        '2': 'EN INVESTIGACION',
-        '3': 'ARCHIVADO',
-        '4': 'SANCIONADO',
-        '5': 'ABSUELTO'
-    }
-    
+    for i, estado in enumerate(ESTADOS_CASO, start=1):
+        print(f"{i}. {estado}")
+
+    opcion = input(f"Seleccione nuevo estado (1-{len(ESTADOS_CASO)}): ")
+
+    estados = {str(i): estado for i, estado in enumerate(ESTADOS_CASO, start=1)}
+
     if opcion not in estados:
         print("❌ Opción inválida")
         return
-    
+
     nuevo_estado = estados[opcion]
-    
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
-    c.execute("UPDATE casos SET estado = ? WHERE iuc = ?", (nuevo_estado, iuc))
-    conn.commit()
-    
-    if c.rowcount > 0:
+
+    conn = abrir()
+    resultado = actualizar_estado(conn, 'caso', nuevo_estado, [iuc])
+    conn.close()
+
+    if resultado['actualizados']:
         print(f"✅ Estado del caso {iuc} actualizado a: {nuevo_estado}")
     else:
         print(f"❌ No se encontró caso {iuc}")
-    
-    conn.close()
 
 def exportar_csv():
-    import csv
-    
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
-    
-    # Exportar documentos
-    c.execute("SELECT * FROM documentos")
-    docs = c.fetchall()
-    with open('documentos_export.csv', 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(['ID', 'Tipo', 'Numero', 'Anio', 'Titulo', 'Descripcion', 'Link', 'Fecha', 'Registrado_por'])
-        writer.writerows(docs)
-    
-    # Exportar casos
-    c.execute("SELECT * FROM casos")
-    casos = c.fetchall()
-    with open('casos_export.csv', 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(['ID', 'IUC', 'Tipo', 'Anio', 'Implicado', 'Estado', 'Descripcion', 'Fecha_apertura'])
-        writer.writerows(casos)
-    
-    # Exportar PQRS
-    c.execute("SELECT * FROM pqrs")
-    pqrs = c.fetchall()
-    with open('pqrs_export.csv', 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(['ID', 'Radicado', 'Tipo', 'Usuario_ID', 'Usuario_nombre', 'Asunto', 
-                        'Descripcion', 'Estado', 'Fecha_radicacion', 'Fecha_respuesta', 
-                        'Respuesta', 'Canal_mensaje_id'])
-        writer.writerows(pqrs)
-    
-    conn.close()
-    
+    formato = input("\nFormato (csv/jsonl) [csv]: ").strip().lower() or 'csv'
+    if formato not in exportar.FORMATOS:
+        print("❌ Formato inválido")
+        return
+    comprimir = input("¿Comprimir con gzip? (s/n): ").lower() == 's'
+    incremental = input("¿Solo cambios desde la última exportación? (s/n): ").lower() == 's'
+
+    archivos = exportar_tablas(formato=formato, comprimir=comprimir, incremental=incremental)
+
     print("\n✅ Archivos exportados:")
-    print("- documentos_export.csv")
-    print("- casos_export.csv")
-    print("- pqrs_export.csv")
+    for archivo in archivos:
+        print(f"- {archivo['archivo']} ({archivo['filas']} filas)")
+
+# ==================== CLI ====================
+def construir_parser():
+    parser = argparse.ArgumentParser(
+        description="Administración no interactiva de procuraduria.db (salida JSON)",
+        epilog="Los cambios se avisan al bot en ejecución: su autocompletado y sus caches "
+               "se renuevan en unos segundos (CAMBIOS_EXTERNOS_INTERVALO).")
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    sub.add_parser('stats', help="Totales de documentos, casos y PQRS")
+
+    p = sub.add_parser('list', help="Listar registros")
+    p.add_argument('entidad', choices=ENTIDADES)
+    p.add_argument('--estado', help="Filtrar por estado")
+    p.add_argument('--limit', type=int, help="Máximo de filas")
+
+    p = sub.add_parser('get', help="Obtener registros por IUS/IUC/radicado")
+    p.add_argument('entidad', choices=ENTIDADES)
+    p.add_argument('ids', nargs='+', help="IDs, o '-' para leerlos de stdin (uno por línea)")
+
+    p = sub.add_parser('update-state', help="Cambiar el estado de varios casos o PQRS")
+    p.add_argument('entidad', choices=ESTADOS)
+    p.add_argument('estado')
+    p.add_argument('ids', nargs='+', help="IDs, o '-' para leerlos de stdin (uno por línea)")
+
+    p = sub.add_parser('delete', help="Eliminar varios registros")
+    p.add_argument('entidad', choices=ENTIDADES)
+    p.add_argument('ids', nargs='+', help="IDs, o '-' para leerlos de stdin (uno por línea)")
+
+    p = sub.add_parser('export', help="Exportar tablas a CSV/JSONL")
+    p.add_argument('--formato', choices=exportar.FORMATOS, default='csv')
+    p.add_argument('--gzip', action='store_true', help="Comprimir con gzip")
+    p.add_argument('--incremental', action='store_true', help="Solo filas cambiadas desde la última exportación")
+    p.add_argument('--directorio', default='.')
+    p.add_argument('--tablas', nargs='+', choices=exportar.TABLAS, default=list(exportar.TABLAS))
+
+    p = sub.add_parser('import', help="Importar casos y documentos desde CSV/JSONL")
+    p.add_argument('archivo')
+    p.add_argument('--registrado-por', default='admin')
+    p.add_argument('--dry-run', action='store_true', help="Validar y numerar sin guardar")
+    p.add_argument('--guild', help="ID del servidor de Discord dueño de los registros")
+
+    p = sub.add_parser('asignar-guild', help="Asignar un servidor a los registros que no tienen")
+    p.add_argument('guild_id', type=int)
+
+    p = sub.add_parser('links-rotos', help="Documentos con el link de Drive roto")
+    p.add_argument('--guild', help="Solo los documentos de este servidor")
+    return parser
+
+def _leer_ids(ids):
+    if ids == ['-']:
+        return [linea for linea in sys.stdin.read().split()]
+    return ids
+
+def ejecutar_cli(argv) -> int:
+    args = construir_parser().parse_args(argv)
+    try:
+        if args.comando == 'export':
+            resultado = exportar_tablas(args.tablas, args.directorio, args.formato, args.gzip, args.incremental)
+        else:
+            conn = abrir()
+            try:
+                if args.comando == 'stats':
+                    resultado = estadisticas(conn)
+                elif args.comando == 'list':
+                    resultado = listar(conn, args.entidad, args.estado, args.limit)
+                elif args.comando == 'get':
+                    resultado = obtener(conn, args.entidad, _leer_ids(args.ids))
+                elif args.comando == 'import':
+                    resultado = importar_archivo(conn, args.archivo, args.registrado_por, args.dry_run, args.guild)
+                elif args.comando == 'asignar-guild':
+                    resultado = asignar_guild(conn, args.guild_id)
+                elif args.comando == 'links-rotos':
+                    resultado = links_rotos(conn, args.guild)
+                elif args.comando == 'update-state':
+                    resultado = actualizar_estado(conn, args.entidad, args.estado, _leer_ids(args.ids))
+                else:
+                    resultado = eliminar(conn, args.entidad, _leer_ids(args.ids))
+            finally:
+                conn.close()
+    except importar.ErrorImportacion as e:
+        print(json.dumps({'error': str(e), 'filas': [{'linea': n, 'error': m} for n, m in e.errores]},
+                         ensure_ascii=False, indent=2))
+        return 1
+    except (ValueError, OSError, sqlite3.Error) as e:
+        print(json.dumps({'error': str(e)}, ensure_ascii=False))
+        return 1
+    print(json.dumps(resultado, ensure_ascii=False, indent=2, default=str))
+    return 0
 
 def main():
+    if len(sys.argv) > 1:
+        sys.exit(ejecutar_cli(sys.argv[1:]))
+
     while True:
         menu_principal()
         opcion = input("\nSeleccione una opción: ")
-        
+
         if opcion == '1':
             ver_estadisticas()
         elif opcion == '2':
@@ -266,8 +490,8 @@ def main():
             sys.exit(0)
         else:
             print("\n❌ Opción inválida")
-        
+
         input("\nPresione Enter para continuar...")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,164 @@
+"""
+API HTTP pública de solo lectura (servidor aiohttp del bot) para que portales
+externos consulten el estado de los casos sin pasar por Discord:
+
+    GET /casos/{iuc}                  caso público con sus documentos adjuntos
+    GET /estadisticas[?guild=<id>]    conteos agregados de casos y PQRS
+
+Los IUC son únicos en toda la base, así que /casos no distingue servidores.
+/estadisticas cuenta las filas de todos los servidores a propósito (cifras
+de la instalación completa); con ?guild=<id> cuenta solo las de ese servidor.
+
+Los casos RESERVADO responden 404, igual que los inexistentes. Cada respuesta
+lleva ETag (hash del cuerpo) y Last-Modified (columna actualizado_en) y se
+guarda ya serializada en una caché en memoria; If-None-Match /
+If-Modified-Since responden 304 sin cuerpo.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+import repositorio
+from cache import CacheLRU
+
+API_CACHE_TTL = float(os.getenv('API_CACHE_TTL', 30))
+RUTA_CASO = '/casos/{iuc}'
+RUTA_ESTADISTICAS = '/estadisticas'
+
+
+class Representacion:
+    """Cuerpo JSON ya serializado con sus validadores HTTP."""
+    __slots__ = ('cuerpo', 'etag', 'modificado')
+
+    def __init__(self, datos, modificado: datetime):
+        self.cuerpo = json.dumps(datos, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        self.etag = hashlib.sha256(self.cuerpo).hexdigest()[:32]
+        # HTTP-date no tiene fracciones de segundo
+        self.modificado = modificado.replace(microsecond=0) if modificado else None
+
+
+def _fecha(valor):
+    """TIMESTAMP de SQLite (UTC, CURRENT_TIMESTAMP) a datetime con zona."""
+    if not valor:
+        return None
+    try:
+        return datetime.fromisoformat(str(valor)[:19]).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def cargar_caso(conn, iuc: str):
+    """Datos públicos del caso y sus documentos; None si no existe o es reservado."""
+    caso = repositorio.casos.obtener(conn, iuc)
+    if not caso or caso.reservado:
+        return None
+    docs = repositorio.documentos.de_caso(conn, iuc)
+    datos = {
+        'iuc': caso.iuc,
+        'tipo': caso.tipo,
+        'anio': caso.anio,
+        'estado': caso.estado,
+        'fecha_apertura': caso.fecha_apertura,
+        'fecha_cierre': caso.fecha_cierre,
+        'documentos': [
+            {'tipo': d.tipo, 'titulo': d.titulo, 'ius': d.ius, 'fecha_registro': d.fecha_registro} for d in docs
+        ],
+    }
+    fechas = [f for f in [_fecha(caso.actualizado_en)] + [_fecha(d.actualizado_en) for d in docs] if f]
+    return Representacion(datos, max(fechas, default=None))
+
+
+def cargar_estadisticas(conn, guild_id: str = None) -> Representacion:
+    """Conteos por estado y tipo (incluye reservados: solo cifras agregadas).
+    Sin `guild_id` suma todos los servidores; con él, solo las filas de ese servidor."""
+    filtro, params = ("WHERE guild_id = ?", (guild_id,)) if guild_id else ("", ())
+
+    def total(tabla):
+        return conn.execute(f"SELECT COUNT(*) FROM {tabla} {filtro}", params).fetchone()[0]
+
+    def conteos(tabla, columna):
+        sql = f"SELECT {columna}, COUNT(*) FROM {tabla} {filtro} GROUP BY {columna}"
+        return {clave or 'SIN DATO': n for clave, n in conn.execute(sql, params)}
+
+    datos = {
+        'casos': {
+            'total': total('casos'),
+            'por_estado': conteos('casos', 'estado'),
+            'por_tipo': conteos('casos', 'tipo'),
+        },
+        'pqrs': {
+            'total': total('pqrs'),
+            'por_estado': conteos('pqrs', 'estado'),
+            'por_tipo': conteos('pqrs', 'tipo'),
+        },
+        'documentos': {'total': total('documentos')},
+    }
+    # sin filtro, MAX sobre columnas indexadas: sin recorrer las tablas
+    ultima = conn.execute(
+        f"""SELECT MAX(m) FROM (SELECT MAX(actualizado_en) AS m FROM casos {filtro}
+           UNION ALL SELECT MAX(actualizado_en) FROM pqrs {filtro}
+           UNION ALL SELECT MAX(actualizado_en) FROM documentos {filtro})""", params * 3
+    ).fetchone()[0]
+    if guild_id:
+        datos['guild_id'] = guild_id
+    return Representacion(datos, _fecha(ultima))
+
+
+def _no_modificado(request: web.Request, rep: Representacion) -> bool:
+    # If-None-Match tiene prioridad sobre If-Modified-Since (RFC 9110, 13.2.2)
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        etiquetas = {e.strip().removeprefix('W/').strip('"') for e in if_none_match.split(',')}
+        return '*' in etiquetas or rep.etag in etiquetas
+    desde = request.if_modified_since
+    return bool(desde and rep.modificado and rep.modificado <= desde)
+
+
+class ApiPublica:
+    def __init__(self, db, ttl: float = API_CACHE_TTL, max_items: int = 4096):
+        self.db = db
+        self.ttl = ttl
+        self.cache = CacheLRU('api', max_items=max_items, ttl=ttl)
+
+    def registrar(self, app: web.Application):
+        app.router.add_get(RUTA_CASO, self.handle_caso)
+        app.router.add_get(RUTA_ESTADISTICAS, self.handle_estadisticas)
+
+    def invalidar(self, *iucs):
+        """Descarta las respuestas cacheadas de los casos (las estadísticas
+        se renuevan solas al vencer el TTL)."""
+        self.cache.invalidar(*(RUTA_CASO.format(iuc=iuc.upper()) for iuc in iucs if iuc))
+
+    def _responder(self, request: web.Request, rep: Representacion) -> web.Response:
+        headers = {
+            'ETag': f'"{rep.etag}"',
+            'Cache-Control': f'public, max-age={int(self.ttl)}',
+        }
+        if rep.modificado:
+            headers['Last-Modified'] = rep.modificado.strftime('%a, %d %b %Y %H:%M:%S GMT')
+        if _no_modificado(request, rep):
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=rep.cuerpo, content_type='application/json', charset='utf-8', headers=headers)
+
+    async def handle_caso(self, request: web.Request) -> web.Response:
+        """Caso público por IUC con sus documentos adjuntos"""
+        iuc = request.match_info['iuc'].strip().upper()
+        rep = await self.cache.obtener(
+            RUTA_CASO.format(iuc=iuc), lambda: self.db.run(cargar_caso, iuc, operacion='api_caso'))
+        if rep is None:
+            return web.json_response({'error': 'Caso no encontrado'}, status=404)
+        return self._responder(request, rep)
+
+    async def handle_estadisticas(self, request: web.Request) -> web.Response:
+        """Conteos agregados de casos, PQRS y documentos (de un servidor con ?guild=<id>)"""
+        guild_id = request.query.get('guild', '').strip() or None
+        if guild_id and not guild_id.isdigit():
+            return web.json_response({'error': 'guild debe ser el ID numérico de un servidor'}, status=400)
+        clave = f"{RUTA_ESTADISTICAS}?guild={guild_id}" if guild_id else RUTA_ESTADISTICAS
+        rep = await self.cache.obtener(
+            clave, lambda: self.db.run(cargar_estadisticas, guild_id, operacion='api_estadisticas'))
+        return self._responder(request, rep)
@@ -0,0 +1,129 @@
+"""
+Índices en memoria para el autocompletado de IUC, IUS y radicados.
+Cada índice es una lista ordenada; las sugerencias se obtienen con bisect
+sin consultar SQLite en cada pulsación.
+"""
+
+from bisect import bisect_left, insort
+
+from discord import app_commands
+
+MAX_SUGERENCIAS = 25  # límite de Discord
+
+
+class IndicePrefijos:
+    def __init__(self):
+        self._claves = []
+        self._ocultos = set()
+
+    def __len__(self):
+        return len(self._claves)
+
+    def cargar(self, valores, ocultos=()):
+        self._claves = sorted({v.upper() for v in valores if v})
+        self._ocultos = {v.upper() for v in ocultos if v}
+
+    def agregar(self, valor: str, oculto: bool = False):
+        if not valor:
+            return
+        valor = valor.upper()
+        i = bisect_left(self._claves, valor)
+        if i == len(self._claves) or self._claves[i] != valor:
+            insort(self._claves, valor)
+        if oculto:
+            self._ocultos.add(valor)
+        else:
+            self._ocultos.discard(valor)
+
+    def quitar(self, valor: str):
+        if not valor:
+            return
+        valor = valor.upper()
+        i = bisect_left(self._claves, valor)
+        if i < len(self._claves) and self._claves[i] == valor:
+            del self._claves[i]
+        self._ocultos.discard(valor)
+
+    def renombrar(self, actual: str, nuevo: str):
+        oculto = actual.upper() in self._ocultos
+        self.quitar(actual)
+        self.agregar(nuevo, oculto)
+
+    def buscar(self, prefijo: str, limite: int = MAX_SUGERENCIAS, incluir_ocultos: bool = False) -> list:
+        prefijo = (prefijo or "").strip().upper()
+        resultado = []
+        i = bisect_left(self._claves, prefijo)
+        while i < len(self._claves) and len(resultado) < limite:
+            valor = self._claves[i]
+            if not valor.startswith(prefijo):
+                break
+            if incluir_ocultos or valor not in self._ocultos:
+                resultado.append(valor)
+            i += 1
+        return resultado
+
+    def opciones(self, prefijo: str, incluir_ocultos: bool = False) -> list:
+        """Sugerencias listas para responder a un autocomplete de Discord.
+        Los valores ocultos solo se incluyen si se pide explícitamente."""
+        return [app_commands.Choice(name=v, value=v) for v in self.buscar(prefijo, incluir_ocultos=incluir_ocultos)]
+
+
+class IndicesServidor:
+    """Índices de casos (IUC, con los reservados ocultos), documentos (IUS) y PQRS (radicado) de un servidor."""
+
+    def __init__(self):
+        self.casos = IndicePrefijos()
+        self.documentos = IndicePrefijos()
+        self.radicados = IndicePrefijos()
+
+
+class IndicesAutocompletado:
+    """Índices separados por servidor: la clave es el guild_id de las filas
+    (el ámbito de configuracion.Configuraciones.ambito), así un servidor no
+    recibe sugerencias con los IUC, IUS o radicados de otro."""
+
+    def __init__(self):
+        self._servidores = {}
+        self.cargado = False
+
+    def de(self, ambito) -> IndicesServidor:
+        """Índices del ámbito; se crean vacíos la primera vez."""
+        indices = self._servidores.get(ambito)
+        if indices is None:
+            indices = self._servidores[ambito] = IndicesServidor()
+        return indices
+
+    def totales(self) -> tuple:
+        """(IUC, IUS, radicados) sumando todos los servidores."""
+        return tuple(sum(len(getattr(i, nombre)) for i in self._servidores.values())
+                     for nombre in ('casos', 'documentos', 'radicados'))
+
+    def _leer(self, conn):
+        casos = conn.execute("SELECT guild_id, iuc, visibilidad FROM casos").fetchall()
+        ius = conn.execute("SELECT guild_id, ius FROM documentos WHERE ius IS NOT NULL").fetchall()
+        radicados = conn.execute("SELECT guild_id, radicado FROM pqrs").fetchall()
+        return casos, ius, radicados
+
+    @staticmethod
+    def _agrupar(filas) -> dict:
+        grupos = {}
+        for guild_id, *resto in filas:
+            grupos.setdefault(guild_id, []).append(resto)
+        return grupos
+
+    async def cargar(self, db):
+        casos, ius, radicados = await db.run(self._leer)
+        casos, ius, radicados = self._agrupar(casos), self._agrupar(ius), self._agrupar(radicados)
+        servidores = {}
+        for ambito in {*casos, *ius, *radicados}:
+            indices = servidores[ambito] = IndicesServidor()
+            filas = casos.get(ambito, [])
+            indices.casos.cargar(
+                [r[0] for r in filas],
+                [r[0] for r in filas if (r[1] or '').upper() == 'RESERVADO']
+            )
+            indices.documentos.cargar([r[0] for r in ius.get(ambito, [])])
+            indices.radicados.cargar([r[0] for r in radicados.get(ambito, [])])
+        # se reemplazan de una vez: el autocompletado nunca ve índices a medio cargar
+        self._servidores = servidores
+        self.cargado = True
@@ -0,0 +1,116 @@
+"""
+Capa de acceso a datos asíncrona para el bot de Procuraduría.
+Ejecuta el trabajo de SQLite en un pool de hilos acotado, con una conexión
+persistente por hilo (modo WAL y busy timeout), para que los comandos hagan
+`await` de sus consultas sin bloquear el event loop.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DB_PATH = os.getenv('DB_PATH', 'procuraduria.db')
+DB_WORKERS = int(os.getenv('DB_WORKERS', 4))
+BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', 5000))
+# sentencias preparadas que guarda cada conexión (sqlite3 usa 128 por defecto)
+SENTENCIAS_EN_CACHE = int(os.getenv('DB_CACHED_STATEMENTS', 256))
+
+
+def conectar(path: str = DB_PATH) -> sqlite3.Connection:
+    """Abre una conexión configurada para uso concurrente.
+    Se usa autocommit (isolation_level=None): las transacciones se abren
+    explícitamente con BaseDatos.transaccion."""
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        isolation_level=None,
+        check_same_thread=False,
+        cached_statements=SENTENCIAS_EN_CACHE,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class BaseDatos:
+    """Pool de conexiones SQLite servido por un ThreadPoolExecutor acotado."""
+
+    def __init__(self, path: str = DB_PATH, max_workers: int = DB_WORKERS, observar=None):
+        self.path = path
+        # observar(operacion, espera, duracion, error): se llama desde el hilo del pool
+        # tras cada operación (espera = tiempo en cola antes de tomar un hilo)
+        self.observar = observar
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sqlite')
+        self._local = threading.local()
+        self._conexiones = []
+        self._lock = threading.Lock()
+
+    @property
+    def pendientes(self) -> int:
+        """Operaciones esperando un hilo libre del pool."""
+        return self._executor._work_queue.qsize()
+
+    def _conexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = conectar(self.path)
+            self._local.conn = conn
+            with self._lock:
+                self._conexiones.append(conn)
+        return conn
+
+    def _ejecutar(self, func, args, operacion, encolado):
+        if self.observar is None:
+            return func(self._conexion(), *args)
+        inicio = time.perf_counter()
+        error = None
+        try:
+            return func(self._conexion(), *args)
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.observar(operacion or getattr(func, '__name__', 'run'),
+                          inicio - encolado, time.perf_counter() - inicio, error)
+
+    async def run(self, func, *args, operacion: str = None):
+        """Ejecuta func(conn, *args) en el pool y retorna su resultado.
+        `operacion` nombra la llamada en las métricas (por defecto, func.__name__)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self._ejecutar, func, args, operacion, time.perf_counter())
+
+    async def transaccion(self, func, *args):
+        """Como run, pero dentro de BEGIN IMMEDIATE / COMMIT (ROLLBACK si falla)."""
+        def _tx(conn, *a):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                resultado = func(conn, *a)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return resultado
+        return await self.run(_tx, *args, operacion=f"transaccion:{getattr(func, '__name__', 'tx')}")
+
+    async def fetchone(self, sql: str, params=()):
+        return await self.run(lambda conn: conn.execute(sql, params).fetchone(), operacion='fetchone')
+
+    async def fetchall(self, sql: str, params=()):
+        return await self.run(lambda conn: conn.execute(sql, params).fetchall(), operacion='fetchall')
+
+    async def execute(self, sql: str, params=()) -> int:
+        """Ejecuta una sentencia (autocommit) y retorna rowcount."""
+        return await self.run(lambda conn: conn.execute(sql, params).rowcount, operacion='execute')
+
+    def cerrar(self):
+        """Detiene el pool y cierra todas las conexiones abiertas."""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for conn in self._conexiones:
+                conn.close()
+            self._conexiones.clear()
@@ -0,0 +1,12 @@
+"""
+Benchmarks y pruebas de carga de los comandos del bot sobre bases sintéticas.
+
+    python -m benchmarks.comandos                      # 10k y 100k, compara con baseline.json
+    python -m benchmarks.comandos --tamanos 1m         # un millón de PQRS y casos
+    python -m benchmarks.comandos --guardar-baseline   # acepta los resultados actuales
+    python -m benchmarks.carga --tasa-pqrs 100         # prueba de carga concurrente (carga.py)
+    python -m benchmarks.validacion_drive              # validador de links contra un Drive local
+
+Las bases se generan una vez (sinteticos.py) y se copian antes de cada
+corrida; los comandos se invocan con objetos de Discord falsos (falsos.py).
+"""
@@ -0,0 +1,335 @@
+"""
+Prueba de carga concurrente: /radicar-pqrs (envío del formulario),
+/registrar-caso y /registrar-documento llegando a la vez, como cuando
+decenas de ciudadanos radican al mismo tiempo.
+
+Las llegadas siguen un proceso de Poisson con la tasa de cada comando
+(más una ráfaga inicial de PQRS); el outbox se entrega a canales falsos.
+Al terminar se verifican los invariantes:
+  - radicados, IUC e IUS sin duplicados ni saltos en cada serie,
+  - cada respuesta exitosa tiene su fila y cada fila nueva su respuesta,
+  - un mensaje de outbox por operación, todos entregados,
+  - ningún error (en particular, ningún "database is locked").
+
+    python -m benchmarks.carga [--duracion 10] [--tasa-pqrs 40] [--rafaga 50]
+"""
+
+import argparse
+import asyncio
+import collections
+import os
+import random
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+from datetime import datetime
+
+import secuencias
+from basedatos import DB_WORKERS, BaseDatos
+from benchmarks import sinteticos
+from benchmarks.entorno import cargar_bot, usar_base, usar_cliente, usar_guild
+from benchmarks.falsos import ClienteFalso, GuildFalso, InteraccionFalsa, MiembroFalso, RolFalso, llenar_modal
+
+OPERACIONES = ('pqrs', 'caso', 'documento')
+OBJETIVOS = 20  # casos a los que se adjuntan documentos (series de IUS con contención)
+BLOQUEADA = 'database is locked'
+
+_RADICADO = re.compile(r"\*\*Radicado:\*\* (PQRS-\d{4}-\d+)")
+_IUC = re.compile(r"\*\*IUC:\*\* (IUC-[ED]-\d{4}-\d+)")
+_IUS = re.compile(r"IUS generado: \*\*(IUS-[FA]-\d{4}-\d+-\d+)\*\*")
+
+
+def serie_de(codigo: str) -> tuple:
+    """(serie, anio, tipo, número) de un radicado, IUC o IUS (ver secuencias)."""
+    partes = codigo.split('-')
+    if partes[0] == 'PQRS':
+        return 'PQRS', int(partes[1]), '', int(partes[2])
+    if partes[0] == 'IUC':
+        return 'IUC', int(partes[2]), partes[1], int(partes[3])
+    return f"IUS-{partes[3]}", int(partes[2]), partes[1], int(partes[4])
+
+
+class Prueba:
+    def __init__(self, app, db: BaseDatos, cliente: ClienteFalso, rng: random.Random, objetivos: list):
+        self.app = app
+        self.db = db
+        self.cliente = cliente
+        self.rng = rng
+        self.objetivos = objetivos
+        self.guild = GuildFalso(sinteticos.GUILD_ID, roles=[RolFalso(app.ROL_PROCURADURIA_ID, 'Procuraduría')])
+        usar_guild(app, self.guild.id)
+        self.funcionarios = [
+            MiembroFalso(self.guild, roles=list(self.guild.roles.values()), nombre=f"funcionario{i}")
+            for i in range(5)
+        ]
+        self.latencias = collections.defaultdict(list)
+        self.errores = collections.defaultdict(list)  # operación -> [mensaje]
+        self.codigos = collections.defaultdict(list)  # operación -> [radicado/IUC/IUS respondido]
+        self.sin_codigo = collections.Counter()       # documentos sin IUS (sin adjuntar)
+
+    async def _medir(self, operacion: str, llegada: float, ejecutar):
+        loop = asyncio.get_running_loop()
+        try:
+            respuesta = await ejecutar()
+        except Exception as e:
+            self.errores[operacion].append(f"{type(e).__name__}: {e}")
+            return
+        finally:
+            self.latencias[operacion].append(loop.time() - llegada)
+        contenido = (respuesta.content or '') if respuesta else ''
+        if not contenido.startswith('✅'):
+            self.errores[operacion].append(contenido or 'sin respuesta')
+            return
+        patron = {'pqrs': _RADICADO, 'caso': _IUC, 'documento': _IUS}[operacion]
+        m = patron.search(contenido)
+        if m:
+            self.codigos[operacion].append(m.group(1))
+        else:
+            self.sin_codigo[operacion] += 1
+
+    # ---------- operaciones ----------
+    async def radicar_pqrs(self):
+        ciudadano = MiembroFalso(self.guild)
+        inicio = InteraccionFalsa(ciudadano)
+        await self.app.radicar_pqrs.callback(inicio)
+        envio = InteraccionFalsa(ciudadano)
+        llenar_modal(inicio.modal, envio,
+                     tipo_select=self.rng.choice('PQRS'),
+                     asunto=sinteticos._texto(self.rng, 5),
+                     descripcion=sinteticos._texto(self.rng, 30))
+        await inicio.modal.on_submit(envio)
+        return envio.ultimo
+
+    async def registrar_caso(self):
+        interaccion = InteraccionFalsa(self.rng.choice(self.funcionarios))
+        await self.app.registrar_caso.callback(
+            interaccion, tipo=self.rng.choice('ED'), implicado=sinteticos._nombre(self.rng),
+            descripcion=sinteticos._texto(self.rng, 12),
+            visibilidad='RESERVADO' if self.rng.random() < 0.1 else 'PUBLICO')
+        return interaccion.ultimo
+
+    async def registrar_documento(self):
+        interaccion = InteraccionFalsa(self.rng.choice(self.funcionarios))
+        adjuntar = self.rng.choice(self.objetivos) if self.rng.random() < 0.8 else None
+        await self.app.registrar_documento.callback(
+            interaccion, tipo=self.rng.choice(sinteticos.TIPOS_DOCUMENTO),
+            titulo=sinteticos._texto(self.rng, 6),
+            link=f"https://drive.google.com/file/d/carga{self.rng.getrandbits(48):x}/view",
+            adjuntar_iuc=adjuntar, ius_tipo=self.rng.choice('FA'))
+        return interaccion.ultimo
+
+    # ---------- generación de carga ----------
+    async def correr(self, tasas: dict, duracion: float, rafaga: int):
+        loop = asyncio.get_running_loop()
+        inicio = loop.time()
+        tareas = []
+        ejecutores = {'pqrs': self.radicar_pqrs, 'caso': self.registrar_caso, 'documento': self.registrar_documento}
+
+        def lanzar(operacion, llegada):
+            tareas.append(asyncio.create_task(self._medir(operacion, llegada, ejecutores[operacion])))
+
+        async def llegadas(operacion, tasa):
+            t = 0.0
+            while tasa > 0:
+                t += self.rng.expovariate(tasa)
+                if t > duracion:
+                    return
+                await asyncio.sleep(max(0.0, inicio + t - loop.time()))
+                lanzar(operacion, inicio + t)
+
+        for _ in range(rafaga):
+            lanzar('pqrs', inicio)
+        await asyncio.gather(*(llegadas(op, tasas[op]) for op in OPERACIONES))
+        await asyncio.gather(*tareas)
+        return loop.time() - inicio
+
+
+def _valores_iniciales(conn, series) -> dict:
+    """Último número emitido de cada serie antes de la carga (contador o, si
+    la serie aún no tiene contador, el mayor número usado)."""
+    valores = {}
+    for serie, anio, tipo in series:
+        row = conn.execute(
+            "SELECT valor FROM contadores WHERE serie = ? AND anio = ? AND tipo = ?", (serie, anio, tipo)
+        ).fetchone()
+        valores[serie, anio, tipo] = row[0] if row else secuencias._valor_inicial(conn, serie, anio, tipo)
+    return valores
+
+
+def _maximos(conn) -> dict:
+    return {tabla: conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {tabla}").fetchone()[0]
+            for tabla in ('pqrs', 'casos', 'documentos', 'outbox')}
+
+
+def verificar(conn, prueba: Prueba, iniciales: dict, maximos: dict) -> list:
+    """Retorna [(invariante, ok, detalle)]."""
+    resultados = []
+    nuevos = {
+        'pqrs': [r[0] for r in conn.execute("SELECT radicado FROM pqrs WHERE id > ?", (maximos['pqrs'],))],
+        'caso': [r[0] for r in conn.execute("SELECT iuc FROM casos WHERE id > ?", (maximos['casos'],))],
+        'documento': [r[0] for r in conn.execute(
+            "SELECT ius FROM documentos WHERE id > ? AND ius IS NOT NULL", (maximos['documentos'],))],
+    }
+    documentos_sin_ius = conn.execute(
+        "SELECT COUNT(*) FROM documentos WHERE id > ? AND ius IS NULL", (maximos['documentos'],)).fetchone()[0]
+
+    # series sin duplicados ni saltos, contador al día
+    por_serie = collections.defaultdict(list)
+    for codigos in nuevos.values():
+        for codigo in codigos:
+            serie, anio, tipo, numero = serie_de(codigo)
+            por_serie[serie, anio, tipo].append(numero)
+    problemas = []
+    for clave, numeros in sorted(por_serie.items()):
+        base = iniciales.get(clave)
+        if base is None:
+            problemas.append(f"{'/'.join(map(str, clave))}: serie inesperada")
+            continue
+        repetidos = [n for n, c in collections.Counter(numeros).items() if c > 1]
+        faltantes = sorted(set(range(base + 1, base + len(set(numeros)) + 1)) - set(numeros))
+        contador = conn.execute(
+            "SELECT valor FROM contadores WHERE serie = ? AND anio = ? AND tipo = ?", clave).fetchone()
+        if repetidos:
+            problemas.append(f"{'/'.join(map(str, clave))}: repetidos {repetidos[:5]}")
+        if faltantes:
+            problemas.append(f"{'/'.join(map(str, clave))}: saltos {faltantes[:5]}")
+        if not contador or contador[0] != base + len(numeros):
+            problemas.append(f"{'/'.join(map(str, clave))}: contador {contador and contador[0]}, "
+                             f"esperado {base + len(numeros)}")
+    resultados.append(("numeración sin duplicados ni saltos", not problemas,
+                       "; ".join(problemas[:5]) or f"{len(por_serie)} series"))
+
+    # respuestas y filas coinciden
+    problemas = []
+    for operacion, filas in nuevos.items():
+        respondidos = set(prueba.codigos[operacion])
+        perdidas = respondidos - set(filas)
+        huerfanas = set(filas) - respondidos
+        if perdidas:
+            problemas.append(f"{operacion}: {len(perdidas)} respondidos sin fila ({sorted(perdidas)[:3]})")
+        if huerfanas:
+            problemas.append(f"{operacion}: {len(huerfanas)} filas sin respuesta ({sorted(huerfanas)[:3]})")
+    if documentos_sin_ius != prueba.sin_codigo['documento']:
+        problemas.append(f"documento: {documentos_sin_ius} filas sin IUS, "
+                         f"{prueba.sin_codigo['documento']} respuestas sin IUS")
+    resultados.append(("sin filas perdidas", not problemas,
+                       "; ".join(problemas) or f"{sum(len(f) for f in nuevos.values()) + documentos_sin_ius} filas"))
+
+    # un mensaje de outbox por operación, entregado y con su callback aplicado
+    exitosas = sum(len(c) for c in prueba.codigos.values()) + sum(prueba.sin_codigo.values())
+    estados = dict(conn.execute(
+        "SELECT estado, COUNT(*) FROM outbox WHERE id > ? GROUP BY estado", (maximos['outbox'],)).fetchall())
+    sin_mensaje = conn.execute(
+        "SELECT (SELECT COUNT(*) FROM casos WHERE id > ? AND mensaje_id IS NULL)"
+        " + (SELECT COUNT(*) FROM pqrs WHERE id > ? AND canal_mensaje_id IS NULL)",
+        (maximos['casos'], maximos['pqrs'])).fetchone()[0]
+    problemas = []
+    if sum(estados.values()) != exitosas:
+        problemas.append(f"{sum(estados.values())} mensajes para {exitosas} operaciones")
+    if set(estados) - {'ENTREGADO'}:
+        problemas.append(f"estados {estados}")
+    if prueba.cliente.enviados != estados.get('ENTREGADO', 0):
+        problemas.append(f"{prueba.cliente.enviados} enviados a canales falsos")
+    if sin_mensaje:
+        problemas.append(f"{sin_mensaje} casos/PQRS sin ID de mensaje guardado")
+    resultados.append(("outbox completo y entregado", not problemas,
+                       "; ".join(problemas) or f"{exitosas} mensajes"))
+
+    bloqueos = sum(BLOQUEADA in e for errores in prueba.errores.values() for e in errores)
+    resultados.append((f"sin '{BLOQUEADA}'", bloqueos == 0, f"{bloqueos} errores"))
+    total_errores = sum(len(e) for e in prueba.errores.values())
+    ejemplos = [e for errores in prueba.errores.values() for e in errores][:3]
+    resultados.append(("sin errores", total_errores == 0,
+                       f"{total_errores} errores" + (f": {ejemplos}" if ejemplos else "")))
+    return resultados
+
+
+def _ms(valores: list, p: int) -> float:
+    if len(valores) < 2:
+        return (valores[0] if valores else 0) * 1000
+    return statistics.quantiles(valores, n=100, method='inclusive')[p - 1] * 1000
+
+
+async def _correr(app, args) -> bool:
+    origen = sinteticos.obtener(args.tamano)
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, 'carga.db')
+        sinteticos.copiar(origen, ruta)
+
+        anio = datetime.now().year
+        conn = sqlite3.connect(ruta)
+        objetivos = [r[0] for r in conn.execute(
+            "SELECT iuc FROM casos WHERE estado != 'ARCHIVADO' ORDER BY id DESC LIMIT ?", (OBJETIVOS,))]
+        series = {('PQRS', anio, ''), ('IUC', anio, 'E'), ('IUC', anio, 'D')}
+        for iuc in objetivos:
+            serie, anio_caso, _, numero = serie_de(iuc)
+            series |= {(f"IUS-{numero:04d}", anio_caso, t) for t in 'FA'}
+        iniciales = _valores_iniciales(conn, series)
+        maximos = _maximos(conn)
+        conn.close()
+
+        db = BaseDatos(ruta, max_workers=args.hilos)
+        cliente = ClienteFalso(latencia=args.latencia_discord_ms / 1000)
+        base_anterior = usar_base(app, db)
+        cliente_anterior = usar_cliente(app, cliente)
+        app.despachador.iniciar()
+        try:
+            prueba = Prueba(app, db, cliente, random.Random(args.semilla), objetivos)
+            tasas = {'pqrs': args.tasa_pqrs, 'caso': args.tasa_casos, 'documento': args.tasa_documentos}
+            print(f"Carga sobre {args.tamano}: {args.duracion:.0f}s, tasas {tasas} /s, ráfaga de {args.rafaga} PQRS, "
+                  f"{args.hilos} hilos de SQLite")
+            transcurrido = await prueba.correr(tasas, args.duracion, args.rafaga)
+
+            # esperar a que el outbox termine de entregar y a las ediciones de adjuntos
+            fin = asyncio.get_running_loop().time() + args.espera_outbox
+            while (await app.despachador.pendientes() or app.editor_adjuntos.pendientes) \
+                    and asyncio.get_running_loop().time() < fin:
+                app.despachador.despertar()
+                await asyncio.sleep(0.2)
+        finally:
+            await app.despachador.detener()
+            usar_cliente(app, cliente_anterior)
+            usar_base(app, base_anterior)
+            db.cerrar()
+
+        print(f"\n  {'operación':<12}{'ok':>6}{'error':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'máx ms':>9}")
+        for operacion in OPERACIONES:
+            lat = prueba.latencias[operacion]
+            ok = len(prueba.codigos[operacion]) + prueba.sin_codigo[operacion]
+            print(f"  {operacion:<12}{ok:>6}{len(prueba.errores[operacion]):>7}{_ms(lat, 50):>9.1f}"
+                  f"{_ms(lat, 95):>9.1f}{_ms(lat, 99):>9.1f}{max(lat, default=0) * 1000:>9.1f}")
+        total = sum(len(v) for v in prueba.latencias.values())
+        print(f"  {total} operaciones en {transcurrido:.1f}s: {total / transcurrido:.1f} ops/s\n")
+
+        conn = sqlite3.connect(ruta)
+        try:
+            resultados = verificar(conn, prueba, iniciales, maximos)
+        finally:
+            conn.close()
+    for nombre, ok, detalle in resultados:
+        print(f"{'✅' if ok else '❌'} {nombre}: {detalle}")
+    return all(ok for _, ok, _ in resultados)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga concurrente de radicación y registro")
+    parser.add_argument('--tamano', default='10k', choices=list(sinteticos.TAMANOS))
+    parser.add_argument('--duracion', type=float, default=10.0, help="segundos de llegadas")
+    parser.add_argument('--tasa-pqrs', type=float, default=40.0, help="envíos de /radicar-pqrs por segundo")
+    parser.add_argument('--tasa-casos', type=float, default=5.0, help="/registrar-caso por segundo")
+    parser.add_argument('--tasa-documentos', type=float, default=10.0, help="/registrar-documento por segundo")
+    parser.add_argument('--rafaga', type=int, default=50, help="PQRS simultáneas al inicio")
+    parser.add_argument('--hilos', type=int, default=DB_WORKERS, help="hilos del pool de SQLite")
+    parser.add_argument('--latencia-discord-ms', type=float, default=50.0, help="latencia de cada envío del outbox")
+    parser.add_argument('--espera-outbox', type=float, default=60.0, help="segundos máximos para vaciar el outbox")
+    parser.add_argument('--semilla', type=int, default=sinteticos.SEMILLA)
+    args = parser.parse_args(argv)
+
+    app = cargar_bot()
+    return 0 if asyncio.run(_correr(app, args)) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
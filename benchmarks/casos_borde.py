@@ -0,0 +1,146 @@
+"""
+Casos borde de bot.py y sus módulos que los benchmarks no recorren: cada
+prueba arma su propio estado (base temporal, objetos falsos) y retorna la
+lista de fallas encontradas.
+
+    python -m benchmarks.casos_borde [--pruebas adopcion-servidor,...]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+import adjuntos
+import drive
+import migraciones
+import repositorio
+from basedatos import BaseDatos
+from benchmarks.entorno import cargar_bot, usar_base
+from benchmarks.falsos import GuildFalso, InteraccionFalsa, MiembroFalso, RolFalso
+
+
+async def _adopcion_servidor(app) -> list:
+    """Una instalación sin GUILD_ID adopta su único servidor: los casos que ya
+    existían deben seguir apareciendo en el autocomplete y en /buscar-caso."""
+    fallas = []
+    db = BaseDatos(os.path.join(tempfile.mkdtemp(prefix='casos-borde-'), 'adopcion.db'))
+    anterior = usar_base(app, db)
+    principal = app.configuraciones.guild_principal
+    app.configuraciones.guild_principal = None
+    try:
+        await db.run(migraciones.aplicar)
+        await db.transaccion(lambda conn: repositorio.casos.insertar(
+            conn, iuc='IUC-E-2024-0001', tipo='E', anio=2024, implicado='Implicado', estado='ABIERTO',
+            descripcion='Caso anterior a la configuración por servidor', visibilidad='PUBLICO'))
+        await app.indices.cargar(db)
+        guild = GuildFalso(roles=[RolFalso(app.ROL_PROCURADURIA_ID, 'Procuraduría')], nombre='Procuraduría')
+        funcionario = MiembroFalso(guild, roles=list(guild.roles.values()), nombre='funcionario')
+
+        # un mensaje directo antes de la adopción deja la vista del caso en caché
+        dm = InteraccionFalsa(MiembroFalso(nombre='ciudadano'))
+        await app.buscar_caso.callback(dm, iuc='IUC-E-2024-0001')
+        if 'Caso IUC-E-2024-0001' not in (dm.ultimo.content or ''):
+            fallas.append(f"antes de la adopción: /buscar-caso respondió {dm.ultimo.content!r}")
+
+        await app.adoptar_servidor(guild)
+
+        opciones = await app.iuc_autocomplete(InteraccionFalsa(funcionario), 'IUC-E')
+        if [o.value for o in opciones] != ['IUC-E-2024-0001']:
+            fallas.append(f"autocomplete de IUC después de la adopción: {[o.value for o in opciones]}")
+        interaccion = InteraccionFalsa(MiembroFalso(guild, nombre='ciudadano'))
+        await app.buscar_caso.callback(interaccion, iuc='IUC-E-2024-0001')
+        if 'Caso IUC-E-2024-0001' not in (interaccion.ultimo.content or ''):
+            fallas.append(f"/buscar-caso después de la adopción respondió {interaccion.ultimo.content!r}")
+    finally:
+        app.configuraciones.guild_principal = principal
+        usar_base(app, anterior)
+        db.cerrar()
+    return fallas
+
+
+async def _reintentos_drive(app) -> list:
+    """Los errores locales (archivo de credenciales faltante o ilegible) se
+    lanzan en el primer intento; los de red se reintentan."""
+    fallas = []
+    for error, intentos_esperados in ((FileNotFoundError, 1), (PermissionError, 1), (ConnectionResetError, 2)):
+        intentos = 0
+
+        def fallar():
+            nonlocal intentos
+            intentos += 1
+            raise error("simulado")
+
+        try:
+            drive.con_reintentos(fallar, reintentos=1, espera_base=0)
+            fallas.append(f"{error.__name__}: con_reintentos no lanzó el error")
+        except error:
+            pass
+        if intentos != intentos_esperados:
+            fallas.append(f"{error.__name__}: {intentos} intentos, se esperaban {intentos_esperados}")
+    return fallas
+
+
+def _valores_invalidos(valores: list) -> list:
+    return [f"valor de {len(v)} caracteres" for v in valores if not v or len(v) > adjuntos.LIMITE_CAMPO]
+
+
+async def _campos_adjuntos(app) -> list:
+    """dividir_en_campos con presupuesto que no alcanza para el primer valor
+    y con una línea más larga que el límite de un campo."""
+    fallas = []
+    lineas = [f"{i + 1}. RESOLUCIÓN - Documento {i + 1}\n   IUS: IUS-F-2024-0001-{i + 1}\n   Link: -"
+              for i in range(60)]
+    for max_campos, max_total in ((1, 100), (25, 50), (1, adjuntos.LIMITE_EMBED)):
+        try:
+            valores = adjuntos.dividir_en_campos(lineas, max_campos, max_total)
+        except Exception as e:
+            fallas.append(f"max_campos={max_campos}, max_total={max_total}: {type(e).__name__}: {e}")
+            continue
+        if len(valores) > max_campos or not valores or "adjuntos más" not in valores[-1]:
+            fallas.append(f"max_campos={max_campos}, max_total={max_total}: {valores!r:.200}")
+        fallas += _valores_invalidos(valores)
+
+    larga = "1. RESOLUCIÓN - " + "x" * 3000
+    valores = adjuntos.dividir_en_campos([larga, "2. ACTA - corta"])
+    fallas += _valores_invalidos(valores)
+    if len(valores) != 2 or valores[1] != "2. ACTA - corta":
+        fallas.append(f"línea larga: {[len(v) for v in valores]} caracteres por valor")
+    return fallas
+
+
+PRUEBAS = {
+    'adopcion-servidor': _adopcion_servidor,
+    'reintentos-drive': _reintentos_drive,
+    'campos-adjuntos': _campos_adjuntos,
+}
+
+
+async def correr(nombres: list) -> int:
+    app = cargar_bot()
+    total = 0
+    for nombre in nombres:
+        fallas = await PRUEBAS[nombre](app)
+        print(f"{'✅' if not fallas else '❌'} {nombre}")
+        for falla in fallas:
+            print(f"  ❌ {falla}")
+        total += len(fallas)
+    print("✅ Casos borde correctos" if not total else f"❌ {total} fallas")
+    return 1 if total else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Casos borde de bot.py que los benchmarks no recorren")
+    parser.add_argument('--pruebas', default=','.join(PRUEBAS),
+                        help=f"separadas por coma, de: {', '.join(PRUEBAS)}")
+    args = parser.parse_args(argv)
+    nombres = [n.strip() for n in args.pruebas.split(',') if n.strip()]
+    desconocidas = [n for n in nombres if n not in PRUEBAS]
+    if desconocidas:
+        parser.error(f"pruebas desconocidas: {', '.join(desconocidas)}")
+    return asyncio.run(correr(nombres))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,361 @@
+"""
+Benchmark de los comandos de bot.py sobre bases sintéticas de distinto tamaño.
+
+Cada escenario prepara una invocación (fuera de la medición) e invoca el
+callback del comando con una interacción falsa; se mide la latencia de la
+llamada completa y las sentencias SQL que ejecutó. Al final se compara el p95
+y las consultas por llamada con baseline.json y se falla si alguno empeoró.
+Con más de un tamaño se exige además que el p50 de cada escenario no crezca
+con la base (ver escalamiento): todos los comandos deben tener costo
+constante, no proporcional a las filas.
+
+    python -m benchmarks.comandos [--tamanos 10k,100k] [--iteraciones 300]
+                                  [--escenarios buscar-caso,...] [--guardar-baseline]
+                                  [--sin-latencia]
+
+Las latencias dependen del equipo: el baseline guarda también una
+calibración (ver calibrar) y los límites del p95 se escalan por la razón
+entre la calibración actual y la guardada. Las consultas por llamada no
+dependen del equipo y se comparan exactas.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from discord import app_commands
+
+from benchmarks import sinteticos
+from benchmarks.entorno import BaseDatosContada, cargar_bot, usar_base, usar_guild
+from benchmarks.falsos import GuildFalso, InteraccionFalsa, MiembroFalso, RolFalso
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+TOLERANCIA = float(os.getenv('BENCH_TOLERANCIA', 0.5))  # p95 hasta 50% más lento
+MARGEN_MS = float(os.getenv('BENCH_MARGEN_MS', 1.0))    # ruido absoluto aceptado
+ESCALA_MAXIMA = float(os.getenv('BENCH_ESCALA_MAXIMA', 2.0))  # p50 del tamaño mayor / menor
+MUESTRA = 2000
+CLAVE_CALIBRACION = 'calibracion_ms'
+
+
+class Contexto:
+    """Estado compartido por los escenarios de un tamaño de base."""
+
+    def __init__(self, app, db: BaseDatosContada, ruta: str, rng: random.Random):
+        self.app = app
+        self.db = db
+        self.guild = GuildFalso(sinteticos.GUILD_ID, roles=[RolFalso(app.ROL_PROCURADURIA_ID, 'Procuraduría')])
+        usar_guild(app, self.guild.id)
+        self.funcionario = MiembroFalso(self.guild, roles=list(self.guild.roles.values()), nombre='funcionario')
+        self.ciudadano = MiembroFalso(self.guild, nombre='ciudadano')
+        # muestras al azar leídas fuera de la conexión medida
+        conn = sqlite3.connect(ruta)
+        try:
+            self.casos = self._muestra(conn, 'casos', 'iuc', rng)
+            self.pqrs = self._muestra(conn, 'pqrs', 'radicado, usuario_id', rng)
+            self.anios = [r[0] for r in conn.execute("SELECT DISTINCT anio FROM casos ORDER BY anio")]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _muestra(conn, tabla: str, columnas: str, rng: random.Random) -> list:
+        maximo = conn.execute(f"SELECT MAX(id) FROM {tabla}").fetchone()[0] or 0
+        sql = f"SELECT {columnas} FROM {tabla} WHERE id = ?"
+        filas = (conn.execute(sql, (rng.randint(1, maximo),)).fetchone() for _ in range(min(MUESTRA, maximo)))
+        return [f for f in filas if f]
+
+    def interaccion(self, usuario: MiembroFalso = None) -> InteraccionFalsa:
+        return InteraccionFalsa(usuario or self.ciudadano, self.guild)
+
+
+# ---------- escenarios ----------
+# Cada uno recibe (ctx, rng) y retorna (llamada, interaccion): la llamada es la
+# corrutina que se mide; la interacción se revisa después por errores.
+
+async def _buscar_caso(ctx, rng):
+    iuc = rng.choice(ctx.casos)[0] if rng.random() < 0.9 else 'IUC-E-1999-9999'
+    ctx.app.cache_casos.limpiar()
+    interaccion = ctx.interaccion()
+    return ctx.app.buscar_caso.callback(interaccion, iuc=iuc), interaccion
+
+
+async def _consultar_radicado(ctx, rng):
+    radicado, usuario_id = rng.choice(ctx.pqrs)
+    ctx.app.cache_pqrs.limpiar()
+    interaccion = ctx.interaccion(MiembroFalso(ctx.guild, usuario_id=int(usuario_id)))
+    return ctx.app.consultar_radicado.callback(interaccion, radicado=radicado), interaccion
+
+
+def _filtros_listado(ctx, rng) -> dict:
+    filtros = rng.choice([
+        {},
+        {'estado': 'PENDIENTE'},
+        {'estado': 'RESPONDIDA', 'anio': rng.choice(ctx.anios)},
+        {'tipo': 'QUEJA'},
+        {'anio': rng.choice(ctx.anios)},
+        {'usuario': True},
+    ])
+    argumentos = {}
+    if 'estado' in filtros:
+        argumentos['estado'] = app_commands.Choice(name=filtros['estado'].title(), value=filtros['estado'])
+    if 'tipo' in filtros:
+        argumentos['tipo'] = app_commands.Choice(name=filtros['tipo'].title(), value=filtros['tipo'])
+    if 'anio' in filtros:
+        argumentos['anio'] = filtros['anio']
+    if 'usuario' in filtros:
+        argumentos['usuario'] = MiembroFalso(ctx.guild, usuario_id=int(rng.choice(ctx.pqrs)[1]))
+    return argumentos
+
+
+async def _listar_pqrs(ctx, rng):
+    interaccion = ctx.interaccion(ctx.funcionario)
+    return ctx.app.listar_pqrs.callback(interaccion, **_filtros_listado(ctx, rng)), interaccion
+
+
+async def _listar_pqrs_siguiente(ctx, rng):
+    # la primera página se carga fuera de la medición; se mide el botón "Siguiente"
+    while True:
+        interaccion = ctx.interaccion(ctx.funcionario)
+        await ctx.app.listar_pqrs.callback(interaccion, **_filtros_listado(ctx, rng))
+        vista = interaccion.ultimo.view if interaccion.ultimo else None
+        if vista is not None and vista.siguiente is not None:
+            break
+    clic = ctx.interaccion(ctx.funcionario)
+    return vista.siguiente_btn.callback(clic), clic
+
+
+async def _generar_ius(ctx, rng):
+    iuc = rng.choice(ctx.casos)[0]
+    return ctx.db.transaccion(ctx.app.generar_ius, iuc, rng.choice('FA')), None
+
+
+async def _registrar_caso(ctx, rng):
+    interaccion = ctx.interaccion(ctx.funcionario)
+    llamada = ctx.app.registrar_caso.callback(
+        interaccion, tipo=rng.choice('ED'), implicado=sinteticos._nombre(rng),
+        descripcion=sinteticos._texto(rng, 12))
+    return llamada, interaccion
+
+
+ESCENARIOS = {
+    'buscar-caso': _buscar_caso,
+    'consultar-radicado': _consultar_radicado,
+    'listar-pqrs': _listar_pqrs,
+    'listar-pqrs-siguiente': _listar_pqrs_siguiente,
+    'generar-ius': _generar_ius,
+    'registrar-caso': _registrar_caso,
+}
+
+
+# ---------- medición ----------
+def _percentil(cuantiles: list, p: int) -> float:
+    return cuantiles[p - 1] * 1000
+
+
+async def medir(escenario, ctx, rng, iteraciones: int, calentamiento: int) -> dict:
+    tiempos, consultas = [], []
+    for i in range(calentamiento + iteraciones):
+        llamada, interaccion = await escenario(ctx, rng)
+        antes = ctx.db.consultas
+        inicio = time.perf_counter()
+        await llamada
+        duracion = time.perf_counter() - inicio
+        hechas = ctx.db.consultas - antes
+        ultimo = interaccion.ultimo if interaccion else None
+        if ultimo is not None and (ultimo.content or '').startswith('❌ Error'):
+            raise RuntimeError(f"el comando falló: {ultimo.content}")
+        if i >= calentamiento:
+            tiempos.append(duracion)
+            consultas.append(hechas)
+    cuantiles = statistics.quantiles(tiempos, n=100, method='inclusive')
+    return {
+        'p50_ms': round(_percentil(cuantiles, 50), 3),
+        'p95_ms': round(_percentil(cuantiles, 95), 3),
+        'p99_ms': round(_percentil(cuantiles, 99), 3),
+        'consultas': round(statistics.fmean(consultas), 3),
+        'consultas_max': max(consultas),
+        'iteraciones': iteraciones,
+    }
+
+
+async def correr(app, tamano: str, escenarios: list, iteraciones: int, calentamiento: int) -> dict:
+    origen = sinteticos.obtener(tamano)
+    resultados = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        # cada corrida parte de la misma base: los escenarios de escritura la modifican
+        ruta = os.path.join(directorio, 'bench.db')
+        sinteticos.copiar(origen, ruta)
+        # las llamadas son secuenciales: con un solo hilo (una sola conexión) el
+        # conteo es estable, FTS5 ejecuta sentencias propias en cada conexión nueva
+        db = BaseDatosContada(ruta, max_workers=1)
+        # solo las consultas de los comandos medidos, no las de tareas de fondo
+        db.tarea = asyncio.current_task()
+        anterior = usar_base(app, db)
+        try:
+            ctx = Contexto(app, db, ruta, random.Random(sinteticos.SEMILLA))
+            for nombre in escenarios:
+                rng = random.Random(f"{sinteticos.SEMILLA}-{nombre}")
+                resultados[nombre] = await medir(ESCENARIOS[nombre], ctx, rng, iteraciones, calentamiento)
+                r = resultados[nombre]
+                print(f"  {nombre:<24}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+                      f"{r['consultas']:>11.2f}{r['consultas_max']:>6}")
+        finally:
+            usar_base(app, anterior)
+            db.cerrar()
+    return resultados
+
+
+# ---------- calibración ----------
+def calibrar(repeticiones: int = 7) -> float:
+    """Milisegundos (mediana) de una carga fija: búsquedas por llave única en
+    una base SQLite en memoria, como las de los comandos. Las latencias del
+    baseline se escalan por la razón entre esta cifra y la del equipo donde
+    se guardó, así el límite del p95 no depende de la máquina."""
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, clave TEXT UNIQUE, valor TEXT)")
+        conn.executemany("INSERT INTO t (clave, valor) VALUES (?, ?)",
+                         ((f"clave-{i:06d}", 'x' * 40) for i in range(20_000)))
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            for i in range(0, 20_000, 4):
+                conn.execute("SELECT valor FROM t WHERE clave = ?", (f"clave-{i:06d}",)).fetchone()
+            tiempos.append(time.perf_counter() - inicio)
+    finally:
+        conn.close()
+    return round(statistics.median(tiempos) * 1000, 3)
+
+
+# ---------- baseline ----------
+def leer_baseline(ruta: str = BASELINE_PATH) -> dict:
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def guardar_baseline(resultados: dict, ruta: str = BASELINE_PATH, calibracion: float = None):
+    """Combina los resultados con el baseline existente (los tamaños no corridos se conservan)."""
+    baseline = leer_baseline(ruta)
+    for tamano, escenarios in resultados.items():
+        baseline.setdefault(tamano, {}).update(escenarios)
+    if calibracion:
+        baseline[CLAVE_CALIBRACION] = calibracion
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def comparar(resultados: dict, baseline: dict, tolerancia: float = TOLERANCIA, margen_ms: float = MARGEN_MS,
+             escala: float = 1.0, latencia: bool = True) -> list:
+    """Retorna la lista de regresiones: p95 por encima de (baseline·(1+tolerancia)+margen)·escala,
+    o más consultas por llamada que en el baseline. `escala` es la razón entre la
+    calibración de este equipo y la del baseline; sin `latencia` solo se comparan
+    las consultas. Las consultas solo se comparan con la misma cantidad de
+    iteraciones: con la semilla fija, la secuencia de llamadas es idéntica y el
+    promedio debe coincidir exactamente."""
+    regresiones = []
+    for tamano, escenarios in resultados.items():
+        for nombre, r in escenarios.items():
+            base = baseline.get(tamano, {}).get(nombre)
+            if not base:
+                continue
+            limite = (base['p95_ms'] * (1 + tolerancia) + margen_ms) * escala
+            if latencia and r['p95_ms'] > limite:
+                regresiones.append(
+                    f"{tamano} {nombre}: p95 {r['p95_ms']:.2f} ms supera {limite:.2f} ms "
+                    f"(baseline {base['p95_ms']:.2f} ms)")
+            if r['iteraciones'] == base.get('iteraciones') and r['consultas'] > base['consultas'] + 0.0005:
+                regresiones.append(
+                    f"{tamano} {nombre}: {r['consultas']:.2f} consultas por llamada "
+                    f"(baseline {base['consultas']:.2f})")
+    return regresiones
+
+
+def escalamiento(resultados: dict, maxima: float = ESCALA_MAXIMA, margen_ms: float = MARGEN_MS) -> list:
+    """Escenarios cuyo p50 en el tamaño mayor supera maxima·p50 del menor + margen.
+    Ambos se miden en la misma corrida y el mismo equipo, así que no hace falta
+    calibración: una consulta que recorre una tabla o un índice completo crece
+    con la base (10 veces de 10k a 100k) y no pasa."""
+    tamanos = sorted(resultados, key=sinteticos.TAMANOS.get)
+    if len(tamanos) < 2:
+        return []
+    menor, mayor = resultados[tamanos[0]], resultados[tamanos[-1]]
+    fallas = []
+    for nombre, r in mayor.items():
+        base = menor.get(nombre)
+        if base and r['p50_ms'] > base['p50_ms'] * maxima + margen_ms:
+            fallas.append(
+                f"{nombre}: p50 {r['p50_ms']:.2f} ms en {tamanos[-1]} vs {base['p50_ms']:.2f} ms en "
+                f"{tamanos[0]} (máximo ×{maxima:g} + {margen_ms:g} ms)")
+    return fallas
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de los comandos sobre bases sintéticas")
+    parser.add_argument('--tamanos', default='10k,100k', help=f"separados por comas: {', '.join(sinteticos.TAMANOS)}")
+    parser.add_argument('--escenarios', default=','.join(ESCENARIOS))
+    parser.add_argument('--iteraciones', type=int, default=300)
+    parser.add_argument('--calentamiento', type=int, default=20)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA)
+    parser.add_argument('--guardar-baseline', action='store_true',
+                        help="guarda los resultados como nuevo baseline en lugar de comparar")
+    parser.add_argument('--sin-latencia', action='store_true',
+                        help="compara solo las consultas por llamada (equipos con tiempos poco estables)")
+    args = parser.parse_args(argv)
+
+    tamanos = [t.strip() for t in args.tamanos.split(',') if t.strip()]
+    escenarios = [e.strip() for e in args.escenarios.split(',') if e.strip()]
+    desconocidos = [t for t in tamanos if t not in sinteticos.TAMANOS] + [e for e in escenarios if e not in ESCENARIOS]
+    if desconocidos:
+        parser.error(f"desconocidos: {', '.join(desconocidos)}")
+    if args.iteraciones < 2:
+        parser.error("se necesitan al menos 2 iteraciones")
+
+    app = cargar_bot()
+
+    async def _todas():
+        resultados = {}
+        for tamano in tamanos:
+            sinteticos.obtener(tamano)
+            print(f"\n{tamano}: {sinteticos.TAMANOS[tamano]:,} PQRS y casos, {args.iteraciones} iteraciones")
+            print(f"  {'escenario':<24}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'consultas':>11}{'máx':>6}")
+            resultados[tamano] = await correr(app, tamano, escenarios, args.iteraciones, args.calentamiento)
+        return resultados
+
+    resultados = asyncio.run(_todas())
+    calibracion = calibrar()
+
+    if args.guardar_baseline:
+        guardar_baseline(resultados, args.baseline, calibracion)
+        print(f"\n💾 Baseline guardado en {args.baseline} (calibración {calibracion:.1f} ms)")
+        return 0
+
+    baseline = leer_baseline(args.baseline)
+    escala = calibracion / baseline[CLAVE_CALIBRACION] if baseline.get(CLAVE_CALIBRACION) else 1.0
+    print(f"\nCalibración: {calibracion:.1f} ms (baseline {baseline.get(CLAVE_CALIBRACION) or '-'} ms), "
+          f"límites de p95 × {escala:.2f}")
+    faltantes = [f"{t} {e}" for t in resultados for e in resultados[t] if e not in baseline.get(t, {})]
+    if faltantes:
+        print(f"\nSin baseline (no se comparan): {', '.join(faltantes)}")
+    regresiones = comparar(resultados, baseline, args.tolerancia, escala=escala, latencia=not args.sin_latencia)
+    if not args.sin_latencia:
+        regresiones += [f"crece con la base: {falla}" for falla in escalamiento(resultados)]
+    for regresion in regresiones:
+        print(f"❌ {regresion}")
+    if not regresiones:
+        print("\n✅ Sin regresiones respecto al baseline ni costos que crezcan con la base")
+    return 1 if regresiones else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Google Drive local para probar el validador de links sin credenciales ni red:
+un servidor aiohttp con la parte de la API v3 que usa el bot (files.get, solo
+o dentro de una petición batch multipart/mixed) y un servicio de
+googleapiclient construido apuntando a él.
+"""
+
+import email.parser
+import email.policy
+import json
+import random
+import socket
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from aiohttp import web
+
+RUTA_ARCHIVO = '/drive/v3/files/{file_id}'
+RUTA_BATCH = '/batch/drive/v3'
+MAX_POR_LOTE = 100
+
+
+def _error(status: int, mensaje: str, razon: str) -> tuple:
+    return status, {'error': {'code': status, 'message': mensaje,
+                              'errors': [{'domain': 'global', 'reason': razon, 'message': mensaje}]}}
+
+
+class DriveLocal:
+    """Archivos en memoria servidos como la API de Drive. `tasa_limite` es la
+    fracción de llamadas que responde 403 userRateLimitExceeded (como Drive
+    cuando un batch supera la cuota), para ejercitar los reintentos."""
+
+    def __init__(self, tasa_limite: float = 0.0, rng: random.Random = None):
+        self.archivos = {}        # file_id -> metadatos como los devuelve la API
+        self.sin_acceso = set()   # existen, pero la cuenta de servicio no puede leerlos
+        self.tasa_limite = tasa_limite
+        self.rng = rng or random.Random(0)
+        self.peticiones = 0       # peticiones HTTP recibidas
+        self.llamadas = 0         # files.get atendidos (sueltos o dentro de un batch)
+        self.url = None
+        self._runner = None
+
+    def agregar(self, file_id: str, nombre: str, mime: str = 'application/pdf', tamano: int = None,
+                modificado: str = '2024-01-01T00:00:00.000Z', papelera: bool = False):
+        archivo = {'id': file_id, 'name': nombre, 'mimeType': mime, 'modifiedTime': modificado, 'trashed': papelera}
+        if tamano is not None:
+            archivo['size'] = str(tamano)  # int64 viaja como texto en JSON
+        self.archivos[file_id] = archivo
+
+    # ---------- servidor ----------
+    async def iniciar(self, host: str = '127.0.0.1') -> str:
+        app = web.Application()
+        app.router.add_get(RUTA_ARCHIVO, self._handle_archivo)
+        app.router.add_post(RUTA_BATCH, self._handle_batch)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        sock = socket.socket()
+        sock.bind((host, 0))
+        await web.SockSite(self._runner, sock).start()
+        self.url = f"http://{host}:{sock.getsockname()[1]}/"
+        return self.url
+
+    async def detener(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def servicio(self):
+        """Servicio de googleapiclient contra este servidor (sin autenticación)."""
+        import httplib2
+        from googleapiclient.discovery import build_from_document
+        from googleapiclient.discovery_cache import get_static_doc
+        documento = json.loads(get_static_doc('drive', 'v3'))
+        # batchPath se arma con rootUrl, así que se reemplaza en el documento
+        documento['rootUrl'] = self.url
+        documento['baseUrl'] = self.url + documento['servicePath']
+        return build_from_document(documento, http=httplib2.Http(timeout=30))
+
+    # ---------- API ----------
+    def _obtener(self, file_id: str, campos) -> tuple:
+        self.llamadas += 1
+        if self.tasa_limite and self.rng.random() < self.tasa_limite:
+            return _error(403, "User Rate Limit Exceeded", 'userRateLimitExceeded')
+        archivo = self.archivos.get(file_id)
+        if archivo is None:
+            return _error(404, f"File not found: {file_id}.", 'notFound')
+        if file_id in self.sin_acceso:
+            return _error(403, "The user does not have sufficient permissions for this file.", 'insufficientFilePermissions')
+        if campos:
+            pedidos = {c.strip() for c in campos.split(',')}
+            archivo = {k: v for k, v in archivo.items() if k in pedidos}
+        return 200, archivo
+
+    async def _handle_archivo(self, request: web.Request) -> web.Response:
+        self.peticiones += 1
+        status, cuerpo = self._obtener(request.match_info['file_id'], request.query.get('fields'))
+        return web.json_response(cuerpo, status=status)
+
+    async def _handle_batch(self, request: web.Request) -> web.Response:
+        self.peticiones += 1
+        cuerpo = await request.read()
+        mensaje = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            b'Content-Type: ' + request.headers['Content-Type'].encode() + b'\r\n\r\n' + cuerpo)
+        partes = list(mensaje.iter_parts())
+        if len(partes) > MAX_POR_LOTE:
+            status, error = _error(400, f"A batch can contain at most {MAX_POR_LOTE} calls", 'batchSizeTooLarge')
+            return web.json_response(error, status=status)
+        frontera = 'batch_drive_local'
+        respuesta = []
+        for parte in partes:
+            linea = parte.get_payload().lstrip().split('\n', 1)[0]
+            metodo, ruta, _ = linea.split(' ', 2)
+            url = urlsplit(ruta)
+            prefijo = RUTA_ARCHIVO.split('{')[0]
+            if metodo == 'GET' and url.path.startswith(prefijo):
+                campos = parse_qs(url.query).get('fields', [None])[0]
+                status, datos = self._obtener(unquote(url.path[len(prefijo):]), campos)
+            else:
+                status, datos = _error(400, f"Llamada no soportada: {metodo} {url.path}", 'badRequest')
+            contenido = json.dumps(datos)
+            respuesta.append(
+                f"--{frontera}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{parte['Content-ID'].strip('<>')}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\nContent-Length: {len(contenido)}\r\n\r\n"
+                f"{contenido}\r\n")
+        respuesta.append(f"--{frontera}--\r\n")
+        return web.Response(body=''.join(respuesta).encode(),
+                            headers={'Content-Type': f'multipart/mixed; boundary={frontera}'})
@@ -0,0 +1,92 @@
+"""
+Carga de bot.py para los benchmarks: importa el módulo sin conectarse a
+Discord y permite apuntar sus comandos a otra base de datos.
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+
+from basedatos import BaseDatos
+
+
+class BaseDatosContada(BaseDatos):
+    """BaseDatos que cuenta las sentencias SQL ejecutadas por sus conexiones
+    (sin los PRAGMA de conectar). SQLite reporta también cada programa de
+    trigger, así que un INSERT con triggers FTS cuenta más de una vez.
+
+    Con `tarea` (una asyncio.Task) solo se cuentan las operaciones pedidas
+    desde esa tarea: las de tareas de fondo (outbox, editor de adjuntos,
+    validador de Drive) no se suman al comando medido."""
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(path, **kwargs)
+        self.consultas = 0
+        self.tarea = None
+        self._lock_consultas = threading.Lock()
+
+    def _conexion(self):
+        nueva = getattr(self._local, 'conn', None) is None
+        conn = super()._conexion()
+        if nueva:
+            conn.set_trace_callback(self._contar)
+        return conn
+
+    def _contando(self, conn, func, *args):
+        self._local.contar = True
+        try:
+            return func(conn, *args)
+        finally:
+            self._local.contar = False
+
+    async def run(self, func, *args, operacion: str = None):
+        if self.tarea is not None and asyncio.current_task() is not self.tarea:
+            return await super().run(func, *args, operacion=operacion)
+        return await super().run(self._contando, func, *args,
+                                 operacion=operacion or getattr(func, '__name__', 'run'))
+
+    def _contar(self, sql: str):
+        if not getattr(self._local, 'contar', False):
+            return
+        with self._lock_consultas:
+            self.consultas += 1
+
+
+def cargar_bot():
+    """Importa bot.py. DB_PATH apunta a un archivo temporal por si algo
+    abriera la base por defecto antes de llamar a usar_base."""
+    os.environ.setdefault('DB_PATH', os.path.join(tempfile.gettempdir(), 'procuraduria-bench-sin-uso.db'))
+    import bot
+    return bot
+
+
+def usar_base(app, db: BaseDatos):
+    """Hace que los comandos de `app` (módulo bot) usen `db` y vacía las cachés.
+    Retorna la base anterior."""
+    anterior = app.db
+    app.db = db
+    app.editor_adjuntos.db = db
+    app.despachador.db = db
+    app.api_publica.db = db
+    app.validador.db = db
+    app.vigia_externos.db = db
+    app.cache_casos.limpiar()
+    app.cache_pqrs.limpiar()
+    app.api_publica.cache.limpiar()
+    return anterior
+
+
+def usar_guild(app, guild_id: int):
+    """Da al servidor `guild_id` la configuración del servidor principal
+    (canales y roles de las constantes de bot.py)."""
+    app.configuraciones.actualizar(app.configuraciones.respaldo.combinar(guild_id))
+
+
+def usar_cliente(app, cliente):
+    """Hace que el outbox y el editor de adjuntos envíen por `cliente` en lugar
+    del bot de Discord. Retorna el cliente anterior."""
+    anterior = app.despachador.bot
+    app.despachador.bot = cliente
+    app.editor_adjuntos.bot = cliente
+    return anterior
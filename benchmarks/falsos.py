@@ -0,0 +1,185 @@
+"""
+Objetos de Discord falsos para invocar los comandos sin conectarse: tienen
+solo los atributos y métodos que usan los handlers de bot.py (y el outbox,
+en el caso de ClienteFalso) y guardan lo que se habría enviado para que el
+benchmark o la prueba de carga puedan revisarlo.
+"""
+
+import asyncio
+import itertools
+
+_ids = itertools.count(10 ** 18)
+
+
+class RolFalso:
+    def __init__(self, rol_id: int, nombre: str = 'rol'):
+        self.id = rol_id
+        self.name = nombre
+        self.mention = f"<@&{rol_id}>"
+
+
+class GuildFalso:
+    def __init__(self, guild_id: int = None, roles=(), nombre: str = None):
+        self.id = guild_id or next(_ids)
+        self.name = nombre or f"servidor{self.id % 10 ** 6}"
+        self.roles = {rol.id: rol for rol in roles}
+
+    def get_role(self, rol_id):
+        return self.roles.get(rol_id)
+
+
+class MiembroFalso:
+    def __init__(self, guild: GuildFalso = None, roles=(), usuario_id: int = None, nombre: str = None):
+        self.id = usuario_id or next(_ids)
+        self.name = nombre or f"usuario{self.id % 10 ** 6}"
+        self.mention = f"<@{self.id}>"
+        self.guild = guild
+        self.roles = list(roles)
+
+    def get_role(self, rol_id):
+        return next((r for r in self.roles if r.id == rol_id), None)
+
+    def __str__(self):
+        return self.name
+
+
+class MensajeFalso:
+    def __init__(self, content=None, embed=None, view=None, canal=None):
+        self.id = next(_ids)
+        self.content = content
+        self.embed = embed
+        self.view = view
+        self.channel = canal
+
+    @property
+    def embeds(self) -> list:
+        return [self.embed] if self.embed is not None else []
+
+    async def edit(self, content=None, embed=None, view=None, **kwargs):
+        if content is not None:
+            self.content = content
+        if embed is not None:
+            self.embed = embed
+        if view is not None:
+            self.view = view
+        return self
+
+
+class RespuestaFalsa:
+    """interaction.response"""
+
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._hecha = False
+
+    def is_done(self) -> bool:
+        return self._hecha
+
+    async def defer(self, ephemeral: bool = False, thinking: bool = False):
+        self._hecha = True
+
+    async def send_message(self, content=None, embed=None, view=None, ephemeral: bool = False, **kwargs):
+        self._hecha = True
+        self._interaction.original = MensajeFalso(content, embed, view)
+        self._interaction.enviados.append(self._interaction.original)
+
+    async def send_modal(self, modal):
+        self._hecha = True
+        self._interaction.modal = modal
+
+    async def edit_message(self, content=None, embed=None, view=None, **kwargs):
+        self._hecha = True
+        await self._interaction.original.edit(content=content, embed=embed, view=view)
+
+
+class SeguimientoFalso:
+    """interaction.followup"""
+
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, content=None, embed=None, view=None, ephemeral: bool = False, wait: bool = False, **kwargs):
+        mensaje = MensajeFalso(content, embed, view)
+        self._interaction.enviados.append(mensaje)
+        return mensaje
+
+
+class InteraccionFalsa:
+    def __init__(self, usuario: MiembroFalso, guild: GuildFalso = None):
+        self.id = next(_ids)
+        self.user = usuario
+        self.guild = guild if guild is not None else usuario.guild
+        self.guild_id = self.guild.id if self.guild else None
+        self.response = RespuestaFalsa(self)
+        self.followup = SeguimientoFalso(self)
+        self.original = MensajeFalso()
+        self.enviados = []
+        self.modal = None
+
+    async def original_response(self):
+        return self.original
+
+    async def edit_original_response(self, content=None, embed=None, view=None, **kwargs):
+        return await self.original.edit(content=content, embed=embed, view=view)
+
+    @property
+    def ultimo(self) -> MensajeFalso:
+        """Último mensaje enviado (None si el comando no respondió)."""
+        return self.enviados[-1] if self.enviados else None
+
+
+def llenar_modal(modal, interaccion, **valores):
+    """Simula el envío del formulario: `valores` por nombre de atributo de cada
+    TextInput, con el mismo payload que manda Discord al enviar el modal."""
+    componentes = [
+        {'type': 4, 'custom_id': getattr(modal, nombre).custom_id, 'value': valor}
+        for nombre, valor in valores.items()
+    ]
+    modal._refresh(interaccion, [{'type': 1, 'components': componentes}])
+
+
+class CanalFalso:
+    """Canal de texto o DM: guarda los mensajes enviados, con latencia opcional."""
+
+    def __init__(self, canal_id: int, latencia: float = 0.0):
+        self.id = canal_id
+        self.latencia = latencia
+        self.mensajes = []
+
+    async def send(self, content=None, embed=None, view=None, **kwargs):
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        mensaje = MensajeFalso(content, embed, view, canal=self)
+        self.mensajes.append(mensaje)
+        return mensaje
+
+    async def fetch_message(self, mensaje_id: int):
+        return next((m for m in self.mensajes if m.id == mensaje_id), None)
+
+
+class ClienteFalso:
+    """Lo que usan del bot el despachador del outbox y el editor de adjuntos."""
+
+    def __init__(self, latencia: float = 0.0):
+        self.latencia = latencia
+        self.canales = {}
+
+    async def wait_until_ready(self):
+        return None
+
+    def get_channel(self, canal_id: int) -> CanalFalso:
+        if canal_id not in self.canales:
+            self.canales[canal_id] = CanalFalso(canal_id, self.latencia)
+        return self.canales[canal_id]
+
+    get_partial_messageable = get_channel
+    get_user = get_channel
+
+    async def fetch_channel(self, canal_id: int) -> CanalFalso:
+        return self.get_channel(canal_id)
+
+    fetch_user = fetch_channel
+
+    @property
+    def enviados(self) -> int:
+        return sum(len(c.mensajes) for c in self.canales.values())
@@ -0,0 +1,175 @@
+"""
+Generación de bases de datos sintéticas con el esquema actual (migraciones)
+y volúmenes realistas: PQRS, casos y documentos repartidos en varios años,
+con los contadores de secuencias al día. Los datos dependen solo de la
+semilla, así que dos corridas sobre la misma base son comparables.
+"""
+
+import collections
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+import migraciones
+
+TAMANOS = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+DIRECTORIO = os.getenv('BENCH_DATOS_DIR', os.path.join(tempfile.gettempdir(), 'procuraduria-bench'))
+SEMILLA = 20240601
+# fin del rango de fechas; fijo para que la base dependa solo de la semilla
+FECHA_FINAL = datetime(2025, 6, 30, 18, 0)
+GUILD_ID = 900_000_000_000_000_001  # servidor de Discord dueño de todas las filas
+ANIOS = 10
+LOTE = 20_000
+
+TIPOS_PQRS = ('PETICIÓN', 'QUEJA', 'RECLAMO', 'SOLICITUD')
+TIPOS_DOCUMENTO = ('RESOLUCIÓN', 'DECRETO', 'AUTO', 'FALLO')
+PALABRAS = (
+    'solicitud', 'certificado', 'contrato', 'licencia', 'proceso', 'queja',
+    'funcionario', 'alcaldía', 'multa', 'pago', 'retraso', 'respuesta',
+    'documento', 'copia', 'expediente', 'servicio', 'público', 'reclamo',
+    'información', 'derecho', 'petición', 'salud', 'educación', 'vía',
+)
+NOMBRES = ('Ana', 'Luis', 'Carlos', 'María', 'Jorge', 'Lucía', 'Pedro', 'Sofía', 'Andrés', 'Valentina')
+APELLIDOS = ('Gómez', 'Rodríguez', 'Pérez', 'Martínez', 'López', 'García', 'Torres', 'Ramírez', 'Díaz', 'Rojas')
+
+
+def _texto(rng, palabras: int) -> str:
+    return ' '.join(rng.choices(PALABRAS, k=palabras)).capitalize()
+
+
+def _nombre(rng) -> str:
+    return f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}"
+
+
+def _fechas(n: int, hasta: datetime):
+    """n marcas de tiempo crecientes desde el 1 de enero de hace ANIOS años."""
+    inicio = datetime(hasta.year - ANIOS + 1, 1, 1)
+    paso = (hasta - inicio) / n
+    for i in range(n):
+        yield inicio + paso * i
+
+
+def _en_lotes(conn, sql: str, filas):
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= LOTE:
+            conn.executemany(sql, lote)
+            lote.clear()
+    if lote:
+        conn.executemany(sql, lote)
+
+
+def generar(ruta: str, n: int, semilla: int = SEMILLA):
+    """Crea en `ruta` una base con n PQRS, n casos y n/2 documentos."""
+    rng = random.Random(semilla)
+    contadores = collections.Counter()  # (serie, anio, tipo) -> último número
+
+    conn = sqlite3.connect(ruta, isolation_level=None)
+    try:
+        migraciones.aplicar(conn)
+        # solo para la carga inicial: la base se descarta si el proceso muere
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("BEGIN")
+
+        usuarios = [str(10 ** 17 + i) for i in range(max(1, n // 20))]
+        guild = str(GUILD_ID)
+
+        def pqrs():
+            for fecha in _fechas(n, FECHA_FINAL):
+                contadores['PQRS', fecha.year, ''] += 1
+                radicado = f"PQRS-{fecha.year}-{contadores['PQRS', fecha.year, '']:04d}"
+                usuario = rng.choice(usuarios)
+                respondida = rng.random() < 0.6
+                yield (
+                    radicado, rng.choice(TIPOS_PQRS), usuario, f"ciudadano{usuario[-6:]}",
+                    _texto(rng, 5), _texto(rng, 25),
+                    'RESPONDIDA' if respondida else 'PENDIENTE',
+                    fecha.strftime("%Y-%m-%d %H:%M:%S"),
+                    fecha.strftime("%Y-%m-%d %H:%M:%S") if respondida else None,
+                    _texto(rng, 15) if respondida else None, guild,
+                )
+        _en_lotes(conn, """INSERT INTO pqrs
+            (radicado, tipo, usuario_id, usuario_nombre, asunto, descripcion, estado,
+             fecha_radicacion, fecha_respuesta, respuesta, guild_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", pqrs())
+
+        casos = []  # (iuc, anio, número de 4 dígitos)
+
+        def filas_casos():
+            for fecha in _fechas(n, FECHA_FINAL):
+                tipo = rng.choice('ED')
+                contadores['IUC', fecha.year, tipo] += 1
+                numero = f"{contadores['IUC', fecha.year, tipo]:04d}"
+                iuc = f"IUC-{tipo}-{fecha.year}-{numero}"
+                casos.append((iuc, fecha.year, numero))
+                yield (
+                    iuc, 'ÉTICO' if tipo == 'E' else 'DISCIPLINARIO', fecha.year, _nombre(rng),
+                    'ARCHIVADO' if rng.random() < 0.3 else 'EN TRAMITE', _texto(rng, 12),
+                    'RESERVADO' if rng.random() < 0.1 else 'PUBLICO',
+                    fecha.strftime("%Y-%m-%d %H:%M:%S"), guild,
+                )
+        _en_lotes(conn, """INSERT INTO casos
+            (iuc, tipo, anio, implicado, estado, descripcion, visibilidad, fecha_apertura, guild_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""", filas_casos())
+
+        def documentos():
+            for i, fecha in enumerate(_fechas(n // 2, FECHA_FINAL)):
+                iuc, anio, numero = rng.choice(casos)
+                tipo_ius = rng.choice('FA')
+                contadores[f'IUS-{numero}', anio, tipo_ius] += 1
+                yield (
+                    rng.choice(TIPOS_DOCUMENTO), _texto(rng, 6), _texto(rng, 10),
+                    f"https://drive.google.com/file/d/sintetico{i}/view",
+                    f"IUS-{tipo_ius}-{anio}-{numero}-{contadores[f'IUS-{numero}', anio, tipo_ius]}",
+                    iuc, fecha.strftime("%Y-%m-%d %H:%M:%S"), 'benchmark', guild, f"sintetico{i}",
+                )
+        _en_lotes(conn, """INSERT INTO documentos
+            (tipo, titulo, descripcion, link_drive, ius, attached_iuc, fecha_registro, registrado_por, guild_id,
+             drive_file_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", documentos())
+        # archivos agendados para verificar, como los deja /registrar-documento
+        conn.execute("INSERT INTO drive_metadatos (file_id) SELECT drive_file_id FROM documentos")
+
+        conn.executemany(
+            "INSERT INTO contadores (serie, anio, tipo, valor) VALUES (?, ?, ?, ?)",
+            [(serie, anio, tipo, valor) for (serie, anio, tipo), valor in contadores.items()])
+        conn.execute("COMMIT")
+        conn.execute("PRAGMA journal_mode=WAL")
+    finally:
+        conn.close()
+
+
+def obtener(tamano: str, directorio: str = DIRECTORIO) -> str:
+    """Ruta de la base sintética de `tamano` (ver TAMANOS); la genera si no existe.
+    El nombre incluye la versión del esquema para regenerarla tras una migración,
+    y la semilla y la fecha final de los datos."""
+    n = TAMANOS[tamano]
+    os.makedirs(directorio, exist_ok=True)
+    nombre = f"sintetico-{tamano}-v{len(migraciones.MIGRACIONES)}-s{SEMILLA}-f{FECHA_FINAL:%Y%m%d}.db"
+    ruta = os.path.join(directorio, nombre)
+    if not os.path.exists(ruta):
+        print(f"Generando base sintética de {tamano} ({n:,} PQRS y casos)...")
+        inicio = time.perf_counter()
+        temporal = ruta + '.tmp'
+        for sufijo in ('', '-wal', '-shm'):
+            if os.path.exists(temporal + sufijo):
+                os.remove(temporal + sufijo)
+        generar(temporal, n)
+        os.replace(temporal, ruta)
+        print(f"  lista en {time.perf_counter() - inicio:.1f}s: {ruta}")
+    return ruta
+
+
+def copiar(origen: str, destino: str):
+    """Copia consistente de la base (API de backup de SQLite)."""
+    fuente = sqlite3.connect(origen)
+    copia = sqlite3.connect(destino)
+    try:
+        fuente.backup(copia)
+    finally:
+        copia.close()
+        fuente.close()
@@ -0,0 +1,209 @@
+"""
+Prueba del validador de links de Drive contra el Drive local (drive_local.py):
+registra documentos con links a archivos disponibles, en la papelera, sin
+permiso e inexistentes (más links que no son de Drive y archivos compartidos
+por varios documentos), deja que ValidadorDrive los verifique por lotes y
+revisa que:
+  - cada archivo quede con el estado y los metadatos que tiene en Drive,
+  - las peticiones HTTP sean una por lote (más los reintentos por cuota),
+  - una revisión posterior detecte los archivos borrados o renombrados,
+  - los archivos que ya no enlaza ningún documento se borren de la tabla.
+
+    python -m benchmarks.validacion_drive [--documentos 2000] [--tasa-limite 0.05]
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+import migraciones
+import repositorio
+import validador_drive
+from basedatos import BaseDatos
+from benchmarks.drive_local import DriveLocal
+
+ESPERADOS = ('disponible', 'papelera', 'sin_acceso', 'inexistente', 'otro_sitio')
+
+
+def _generar(drive: DriveLocal, n: int, proporcion_rotos: float, rng: random.Random) -> list:
+    """Archivos en el Drive local y [(link, tipo esperado)] para n documentos."""
+    documentos = []
+    for i in range(n):
+        file_id = f"1local{i:08d}{rng.getrandbits(40):010x}"
+        sorteo = rng.random()
+        if sorteo < proporcion_rotos / 3:
+            tipo = 'papelera'
+            drive.agregar(file_id, f"documento-{i}.pdf", tamano=rng.randint(10_000, 5_000_000), papelera=True)
+        elif sorteo < proporcion_rotos * 2 / 3:
+            tipo = 'sin_acceso'
+            drive.agregar(file_id, f"documento-{i}.pdf")
+            drive.sin_acceso.add(file_id)
+        elif sorteo < proporcion_rotos:
+            tipo = 'inexistente'
+        elif sorteo < proporcion_rotos + 0.02:
+            documentos.append((f"https://example.org/archivo-{i}.pdf", 'otro_sitio'))
+            continue
+        else:
+            tipo = 'disponible'
+            if rng.random() < 0.2:
+                drive.agregar(file_id, f"Acta {i}", mime='application/vnd.google-apps.document')
+            else:
+                drive.agregar(file_id, f"documento-{i}.pdf", tamano=rng.randint(10_000, 5_000_000))
+        formato = rng.choice((
+            "https://drive.google.com/file/d/{}/view?usp=sharing",
+            "https://drive.google.com/open?id={}",
+            "https://docs.google.com/document/d/{}/edit",
+        ))
+        documentos.append((formato.format(file_id), tipo))
+        if rng.random() < 0.05:
+            # el mismo archivo enlazado por otro documento
+            documentos.append((f"https://drive.google.com/uc?id={file_id}&export=download", tipo))
+    return documentos
+
+
+def _registrar(conn, documentos):
+    """Inserta los documentos y agenda sus archivos como /registrar-documento."""
+    conn.execute("BEGIN IMMEDIATE")
+    for i, (link, _) in enumerate(documentos):
+        file_id = validador_drive.extraer_id(link)
+        repositorio.documentos.insertar(
+            conn, tipo='RESOLUCIÓN', titulo=f"Documento {i}", link_drive=link, ius=f"IUS-F-2024-9999-{i + 1}",
+            registrado_por='validacion', drive_file_id=file_id)
+        if file_id:
+            validador_drive.programar(conn, file_id)
+    conn.execute("COMMIT")
+
+
+def _revisar(conn, drive: DriveLocal) -> list:
+    """Diferencias entre drive_metadatos y el Drive local."""
+    errores = []
+    for fila in conn.execute("SELECT file_id FROM drive_metadatos").fetchall():
+        meta = validador_drive.obtener(conn, fila[0])
+        archivo = drive.archivos.get(meta.file_id)
+        if archivo is None:
+            esperado = validador_drive.NO_ENCONTRADO
+        elif meta.file_id in drive.sin_acceso:
+            esperado = validador_drive.SIN_ACCESO
+        elif archivo['trashed']:
+            esperado = validador_drive.PAPELERA
+        else:
+            esperado = validador_drive.DISPONIBLE
+        if meta.estado != esperado or meta.intentos:
+            errores.append(f"{meta.file_id}: {meta.estado} (intentos {meta.intentos}), esperado {esperado}")
+        elif esperado in (validador_drive.DISPONIBLE, validador_drive.PAPELERA):
+            tamano = int(archivo['size']) if 'size' in archivo else None
+            if (meta.nombre, meta.mime, meta.tamano, meta.modificado) != (
+                    archivo['name'], archivo['mimeType'], tamano, archivo['modifiedTime']):
+                errores.append(f"{meta.file_id}: metadatos {meta.nombre!r} no coinciden con Drive")
+    return errores
+
+
+async def _esperar_verificacion(db: BaseDatos, limite: float) -> bool:
+    """Espera a que no queden archivos vencidos ni reintentos pendientes."""
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        row = await db.fetchone(
+            """SELECT COUNT(*) FROM drive_metadatos
+               WHERE proximo <= CURRENT_TIMESTAMP OR estado IN ('PENDIENTE', 'ERROR') OR intentos > 0""")
+        if row[0] == 0:
+            return True
+        await asyncio.sleep(0.1)
+    return False
+
+
+async def correr(args) -> int:
+    rng = random.Random(args.semilla)
+    drive = DriveLocal(tasa_limite=args.tasa_limite, rng=random.Random(args.semilla))
+    await drive.iniciar()
+    directorio = tempfile.mkdtemp(prefix='validacion-drive-')
+    db = BaseDatos(os.path.join(directorio, 'validacion.db'))
+    validador = validador_drive.ValidadorDrive(
+        db, drive.servicio, lote=args.lote, espera_error=1, intervalo=0.2, espera_inicial=0)
+    fallas = []
+    try:
+        await db.run(migraciones.aplicar)
+        documentos = _generar(drive, args.documentos, args.rotos, rng)
+        await db.run(_registrar, documentos)
+        archivos = (await db.fetchone("SELECT COUNT(*) FROM drive_metadatos"))[0]
+        conteo = {t: sum(1 for _, tipo in documentos if tipo == t) for t in ESPERADOS}
+        print(f"{len(documentos)} documentos, {archivos} archivos de Drive: "
+              + ", ".join(f"{t} {n}" for t, n in conteo.items()))
+
+        # 1) primera verificación
+        inicio = time.perf_counter()
+        validador.iniciar()
+        if not await _esperar_verificacion(db, args.limite):
+            fallas.append("la primera verificación no terminó a tiempo")
+        duracion = time.perf_counter() - inicio
+        lotes = math.ceil(archivos / validador.lote)
+        print(f"Verificación: {archivos} archivos en {duracion:.2f}s, {drive.peticiones} peticiones HTTP "
+              f"({lotes} lotes sin reintentos), {drive.llamadas} llamadas a files.get")
+        fallas += await db.run(_revisar, drive)
+        if validador.peticiones != drive.peticiones:
+            fallas.append(f"el validador hizo {validador.peticiones} lotes pero Drive recibió {drive.peticiones} peticiones")
+        if not args.tasa_limite and drive.peticiones != lotes:
+            fallas.append(f"se esperaban {lotes} peticiones HTTP, hubo {drive.peticiones}")
+
+        # 2) revisión programada después de cambios en Drive
+        disponibles = [i for i, a in drive.archivos.items() if not a['trashed'] and i not in drive.sin_acceso]
+        borrados = rng.sample(disponibles, max(1, len(disponibles) // 20))
+        for file_id in borrados:
+            del drive.archivos[file_id]
+        renombrados = rng.sample([i for i in disponibles if i in drive.archivos], max(1, len(disponibles) // 20))
+        for file_id in renombrados:
+            drive.archivos[file_id].update(name=f"renombrado-{file_id}.pdf", modifiedTime='2025-06-01T12:00:00.000Z')
+        rotos_antes = validador.rotos_detectados
+        await db.execute("UPDATE drive_metadatos SET proximo = datetime('now', '-1 second')")
+        validador.despertar()
+        if not await _esperar_verificacion(db, args.limite):
+            fallas.append("la revisión no terminó a tiempo")
+        fallas += await db.run(_revisar, drive)
+        if validador.rotos_detectados - rotos_antes != len(borrados):
+            fallas.append(f"se detectaron {validador.rotos_detectados - rotos_antes} links rotos nuevos, "
+                          f"se borraron {len(borrados)} archivos")
+        print(f"Revisión: {len(borrados)} borrados y {len(renombrados)} renombrados en Drive, "
+              f"{validador.rotos_detectados - rotos_antes} links rotos nuevos detectados")
+
+        # 3) archivos sin documentos
+        eliminados = await db.execute(
+            "DELETE FROM documentos WHERE id IN (SELECT id FROM documentos WHERE drive_file_id IS NOT NULL "
+            "ORDER BY id LIMIT 50)")
+        podados = await db.transaccion(validador_drive.podar)
+        restantes = (await db.fetchone(
+            "SELECT COUNT(*) FROM drive_metadatos m WHERE NOT EXISTS "
+            "(SELECT 1 FROM documentos d WHERE d.drive_file_id = m.file_id)"))[0]
+        if restantes:
+            fallas.append(f"{restantes} archivos sin documentos siguen en drive_metadatos")
+        print(f"Poda: {eliminados} documentos eliminados, {podados} archivos borrados de drive_metadatos")
+    finally:
+        await validador.detener()
+        await drive.detener()
+        db.cerrar()
+
+    for falla in fallas[:20]:
+        print(f"  ❌ {falla}")
+    if len(fallas) > 20:
+        print(f"  … y {len(fallas) - 20} más")
+    print("✅ Validación de links correcta" if not fallas else f"❌ {len(fallas)} fallas")
+    return 1 if fallas else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Prueba del validador de links de Drive contra un Drive local")
+    parser.add_argument('--documentos', type=int, default=2000)
+    parser.add_argument('--rotos', type=float, default=0.1, help="fracción de links rotos")
+    parser.add_argument('--tasa-limite', type=float, default=0.05,
+                        help="fracción de llamadas que Drive rechaza por cuota (se reintentan)")
+    parser.add_argument('--lote', type=int, default=validador_drive.LOTE_METADATOS)
+    parser.add_argument('--limite', type=float, default=120.0, help="segundos máximos por verificación")
+    parser.add_argument('--semilla', type=int, default=20240601)
+    return asyncio.run(correr(parser.parse_args(argv)))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
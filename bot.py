@@ -6,12 +6,32 @@ import sqlite3
 import os
 from datetime import datetime
 import asyncio
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+import time
+import tempfile
 import io
 from dotenv import load_dotenv
 from aiohttp import web
+from basedatos import BaseDatos, DB_PATH
+import secuencias
+import migraciones
+from drive import ClienteDrive, ColaSubidas, subir_archivo
+import validador_drive
+from adjuntos import EditorAdjuntos
+import permisos
+import configuracion
+from cache import CacheLRU
+import busqueda
+from autocompletar import IndicesAutocompletado
+import listados
+import repositorio
+import importar
+import outbox
+import respuestas
+import metricas
+from vigilante import Vigilante
+import sincronizacion
+from api_publica import ApiPublica
+import cambios_externos
 
 # ...existing code...
 load_dotenv()
@@ -22,21 +42,52 @@ async def handle_health(request):
     """Health check endpoint"""
     return web.Response(text="Bot OK")
 
+async def handle_cache_stats(request):
+    """Contadores de hits/misses de las cachés de lectura"""
+    return web.json_response([c.estadisticas() for c in (cache_casos, cache_pqrs, api_publica.cache)])
+
+async def handle_metrics(request):
+    """Métricas en formato de texto de Prometheus"""
+    try:
+        metrica_outbox_pendientes.set(await despachador.pendientes())
+        conteos = await db.run(validador_drive.conteos)
+        for estado in validador_drive.DESCRIPCIONES:
+            metrica_drive_links.set(conteos.get(estado, 0), estado=estado)
+    except Exception as e:
+        print(f"Error leyendo el outbox y los links de Drive para /metrics: {e}")
+    return web.Response(text=registro_metricas.exponer(),
+                        headers={'Content-Type': metricas.TIPO_CONTENIDO})
+
+async def handle_vigilante(request):
+    """Bloqueos recientes del event loop con su pila y el comando en curso"""
+    return web.json_response({
+        'umbral': vigilante.umbral,
+        'retraso_maximo': round(vigilante.retraso_maximo, 3),
+        'reportes': list(vigilante.reportes),
+    })
+
 async def run_web_server():
     """Ejecutar servidor web en puerto 8080"""
     app = web.Application()
     app.router.add_get('/', handle_health)
     app.router.add_get('/health', handle_health)
+    app.router.add_get('/cache', handle_cache_stats)
+    app.router.add_get('/metrics', handle_metrics)
+    app.router.add_get('/vigilante', handle_vigilante)
+    api_publica.registrar(app)
     runner = web.AppRunner(app)
     await runner.setup()
     port = int(os.getenv('PORT', 8080))
     site = web.TCPSite(runner, '0.0.0.0', port)
     await site.start()
     print(f'🌐 Servidor web iniciado en puerto {port}')
+    return runner
 
 # ==================== CONFIGURACIÓN ====================
 SCOPES = ['https://www.googleapis.com/auth/drive']
 SERVICE_ACCOUNT_FILE = 'credentials.json'
+# Canales, roles y carpeta del servidor principal (GUILD_ID en .env); los demás
+# servidores se configuran con /configurar (ver configuracion.py)
 DRIVE_FOLDER_ID = '1fND6FHVGPNFFkJTcWBBeYzN5a4WGI1ZZ'  # Cambiar por el ID de tu carpeta
 CANAL_PQRS_ID = 1446524564006768751 # Cambiar por el ID del canal de PQRS
 ROL_PROCURADURIA_ID = 1220833789308174467  # Cambiar por el ID del rol de Procuraduria
@@ -44,165 +95,275 @@ REGISTROS_CHANNEL_ID = 1446522781897330699  # Cambiar por el ID del canal de reg
 # Rol adicional autorizado a responder PQRS (poner el ID aquí o definir RESPONDER_ROLE_ID en .env)
 # Si lo dejas en 0 o None, solo el rol de Procuraduría podrá responder.
 RESPONDER_ROLE_ID = 1289418666353623090
+# Tamaño máximo del archivo aceptado por /importar
+MAX_IMPORTACION_BYTES = 5 * 1024 * 1024
 
 # ==================== INICIALIZACIÓN ====================
+# Métricas expuestas en /metrics (las de estado se leen al momento de exponer)
+registro_metricas = metricas.Registro()
+metrica_comandos = registro_metricas.histograma(
+    'bot_comando_duracion_segundos', 'Duración de los comandos de barra', ('comando', 'resultado'))
+metrica_sqlite = registro_metricas.histograma(
+    'bot_sqlite_duracion_segundos', 'Tiempo de ejecución de las operaciones SQLite', ('operacion',))
+metrica_sqlite_espera = registro_metricas.histograma(
+    'bot_sqlite_espera_segundos', 'Tiempo en cola antes de tomar un hilo del pool SQLite')
+metrica_sqlite_errores = registro_metricas.contador(
+    'bot_sqlite_errores_total', 'Operaciones SQLite fallidas', ('operacion', 'error'))
+metrica_discord_llamadas = registro_metricas.contador(
+    'bot_discord_api_llamadas_total', 'Llamadas a la API de Discord por ruta y estado', ('ruta', 'estado'))
+metrica_discord_duracion = registro_metricas.histograma(
+    'bot_discord_api_duracion_segundos', 'Latencia de la API de Discord por ruta', ('ruta',))
+metrica_drive = registro_metricas.histograma(
+    'bot_drive_duracion_segundos', 'Latencia de las llamadas a Google Drive (con reintentos)', ('operacion',))
+metrica_drive_errores = registro_metricas.contador(
+    'bot_drive_errores_total', 'Llamadas a Google Drive fallidas', ('operacion', 'error'))
+registro_metricas.medidor(
+    'bot_gateway_latencia_segundos', 'Latencia del heartbeat del gateway de Discord',
+    funcion=lambda: bot.latency)
+registro_metricas.medidor(
+    'bot_cache_items', 'Entradas en las cachés de lectura', ('cache',),
+    funcion=lambda: {c.nombre: len(c) for c in (cache_casos, cache_pqrs, api_publica.cache)})
+registro_metricas.medidor(
+    'bot_cache_consultas_total', 'Consultas a las cachés de lectura', ('cache', 'resultado'), tipo='counter',
+    funcion=lambda: {(c.nombre, r): getattr(c, r) for c in (cache_casos, cache_pqrs, api_publica.cache) for r in ('hits', 'misses')})
+registro_metricas.medidor(
+    'bot_cola_pendientes', 'Trabajos en espera por cola', ('cola',),
+    funcion=lambda: {'sqlite': db.pendientes, 'drive': cola_subidas.pendientes,
+                     'adjuntos': editor_adjuntos.pendientes})
+metrica_outbox_pendientes = registro_metricas.medidor(
+    'bot_outbox_pendientes', 'Mensajes de Discord pendientes en el outbox')
+registro_metricas.medidor(
+    'bot_outbox_procesados_total', 'Mensajes del outbox entregados o descartados', ('resultado',), tipo='counter',
+    funcion=lambda: {'entregado': despachador.entregados, 'fallido': despachador.fallidos})
+metrica_drive_links = registro_metricas.medidor(
+    'bot_drive_links', 'Archivos de Drive enlazados por documentos, por estado de la última verificación', ('estado',))
+
+metrica_bucle_retraso = registro_metricas.histograma(
+    'bot_bucle_retraso_segundos', 'Retraso de planificación del event loop',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+metrica_bucle_bloqueos = registro_metricas.contador(
+    'bot_bucle_bloqueos_total', 'Bloqueos del event loop por encima del umbral', ('comando',))
+
+def observar_sqlite(operacion, espera, duracion, error):
+    metrica_sqlite.observar(duracion, operacion=operacion)
+    metrica_sqlite_espera.observar(espera)
+    if error:
+        metrica_sqlite_errores.inc(operacion=operacion, error=error)
+
+def observar_drive(operacion, duracion, error):
+    metrica_drive.observar(duracion, operacion=operacion)
+    if error:
+        metrica_drive_errores.inc(operacion=operacion, error=error)
+
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-bot = commands.Bot(command_prefix='!', intents=intents)
+def guild_sincronizacion():
+    """Si se proporciona GUILD_ID en .env, los comandos se sincronizan en ese guild."""
+    guild_id = os.getenv('GUILD_ID')
+    return discord.Object(id=int(guild_id)) if guild_id else None
 
-# Conexión a Google Drive
-# Intentar cargar credenciales desde archivo local o variable de entorno
-drive_service = None
-try:
-    import json
-    # Primero intentar desde variable de entorno (para deploy)
-    creds_json = os.getenv('GOOGLE_CREDENTIALS')
-    
-    if creds_json:
-        print("📌 Intentando usar GOOGLE_CREDENTIALS desde variable de entorno...")
+class BotProcuraduria(commands.AutoShardedBot):
+    """Bot con el arranque en setup_hook: se ejecuta una sola vez antes de
+    conectar, no en cada reconexión como on_ready. Con shards automáticos
+    (o SHARD_COUNT en .env) para atender muchos servidores en un proceso."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.web_runner = None
+
+    async def setup_hook(self):
+        pasos = [
+            ("migraciones", self._migrar),
+            ("configuración", self._cargar_configuracion),
+            ("autocompletado", self._cargar_indices),
+            ("servidor web", self._iniciar_web),
+            ("tareas de fondo", self._iniciar_tareas),
+            ("comandos", self._sincronizar_comandos),
+        ]
+        for nombre, paso in pasos:
+            inicio = time.perf_counter()
+            await paso()
+            print(f'🚀 Arranque: {nombre} ({time.perf_counter() - inicio:.2f}s)')
+
+    async def _migrar(self):
+        aplicadas = await db.run(migraciones.aplicar)
+        if aplicadas:
+            print(f'🗄️ Migraciones aplicadas: {aplicadas}')
+
+    async def _cargar_configuracion(self):
+        total = await db.run(configuraciones.cargar)
+        print(f'⚙️ Configuración: {total} servidores configurados')
+        sin_guild = await db.run(configuracion.filas_sin_guild)
+        if sin_guild:
+            print(f'⚠️ {sin_guild} registros sin servidor: se asignan al conectar si el bot está en un solo '
+                  f'servidor, o con "python admin.py asignar-guild <guild_id>"')
+
+    async def _cargar_indices(self):
+        await indices.cargar(db)
+        print('🔤 Autocompletado: {} IUC, {} IUS, {} radicados'.format(*indices.totales()))
+
+    async def _iniciar_web(self):
+        # Servidor web para Fly.io (una sola vez: el puerto no se vuelve a abrir al reconectar)
+        self.web_runner = await run_web_server()
+
+    async def _iniciar_tareas(self):
+        vigilante.iniciar()
+        # Entregar los mensajes pendientes del outbox (también los de antes de reiniciar)
+        despachador.iniciar()
+        validador.iniciar()
+        vigia_externos.iniciar()
+
+    async def _sincronizar_comandos(self):
+        guild = guild_sincronizacion()
+        destino = f"guild {guild.id}" if guild else "global"
         try:
-            creds_dict = json.loads(creds_json)
-            credentials = service_account.Credentials.from_service_account_info(
-                creds_dict, scopes=SCOPES)
-            drive_service = build('drive', 'v3', credentials=credentials)
-            print("✅ Google Drive conectado desde variable de entorno")
-        except json.JSONDecodeError as je:
-            print(f"❌ Error parsando JSON de GOOGLE_CREDENTIALS: {je}")
-            print("Verificar que el formato JSON sea correcto (sin saltos de línea extra)")
+            synced = await sincronizacion.sincronizar(self.tree, guild=guild)
+            if synced is None:
+                print(f'✅ Comandos sin cambios, no se sincronizan ({destino})')
+            else:
+                print(f'✅ {len(synced)} comandos sincronizados ({destino})')
         except Exception as e:
-            print(f"❌ Error autenticando con GOOGLE_CREDENTIALS: {e}")
-    else:
-        print("📌 GOOGLE_CREDENTIALS no definida, intentando desde archivo...")
-        # Si no, cargar desde archivo (desarrollo local)
-        credentials = service_account.Credentials.from_service_account_file(
-            SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-        drive_service = build('drive', 'v3', credentials=credentials)
-        print("✅ Google Drive conectado desde archivo local")
-        
-except FileNotFoundError:
-    print(f"⚠️ Archivo {SERVICE_ACCOUNT_FILE} no encontrado. Google Drive no disponible en producción.")
-    print("Solución: Añade la variable de entorno GOOGLE_CREDENTIALS en Koyeb")
-except Exception as e:
-    print(f"⚠️ No se pudo conectar a Google Drive: {e}")
-    print("Las funciones que requieren Google Drive no estarán disponibles")
-
-# ==================== BASE DE DATOS ====================
-def init_db():
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
-    
-    # Tabla de documentos
-    c.execute('''CREATE TABLE IF NOT EXISTS documentos (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        tipo TEXT NOT NULL,
-        titulo TEXT,
-        descripcion TEXT,
-        link_drive TEXT,
-        ius TEXT UNIQUE,
-        attached_iuc TEXT,
-        fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        registrado_por TEXT
-    )''')
-    
-    # Tabla de PQRS
-    c.execute('''CREATE TABLE IF NOT EXISTS pqrs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        radicado TEXT UNIQUE NOT NULL,
-        tipo TEXT NOT NULL,
-        usuario_id TEXT NOT NULL,
-        usuario_nombre TEXT NOT NULL,
-        asunto TEXT NOT NULL,
-        descripcion TEXT NOT NULL,
-        estado TEXT DEFAULT 'PENDIENTE',
-        fecha_radicacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        fecha_respuesta TIMESTAMP,
-        respuesta TEXT,
-        canal_mensaje_id TEXT
-    )''')
-    
-    # Tabla de casos (IUC)
-    c.execute('''CREATE TABLE IF NOT EXISTS casos (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        iuc TEXT UNIQUE NOT NULL,
-        tipo TEXT NOT NULL,
-        anio INTEGER NOT NULL,
-        implicado TEXT,
-        estado TEXT DEFAULT 'EN TRAMITE',
-        descripcion TEXT,
-        visibilidad TEXT DEFAULT 'PUBLICO',
-        fecha_apertura TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        fecha_cierre TIMESTAMP,
-        mensaje_id TEXT,
-        canal_registros_id TEXT
-    )''')
-    
-    conn.commit()
-    conn.close()
+            print(f'❌ Error sincronizando comandos: {e}')
 
-    # Asegurar columnas nuevas en tablas existentes (si la DB ya existía)
-    try:
-        conn = sqlite3.connect('procuraduria.db')
-        c = conn.cursor()
-        # adicionar columnas si no existen
-        try:
-            c.execute("ALTER TABLE documentos ADD COLUMN ius TEXT")
-        except sqlite3.OperationalError:
-            pass
-        try:
-            c.execute("ALTER TABLE documentos ADD COLUMN attached_iuc TEXT")
-        except sqlite3.OperationalError:
-            pass
-        try:
-            c.execute("ALTER TABLE casos ADD COLUMN visibilidad TEXT DEFAULT 'PUBLICO'")
-        except sqlite3.OperationalError:
-            pass
-        try:
-            c.execute("ALTER TABLE casos ADD COLUMN fecha_cierre TIMESTAMP")
-        except sqlite3.OperationalError:
-            pass
-        try:
-            c.execute("ALTER TABLE casos ADD COLUMN mensaje_id TEXT")
-        except sqlite3.OperationalError:
-            pass
-        try:
-            c.execute("ALTER TABLE casos ADD COLUMN canal_registros_id TEXT")
-        except sqlite3.OperationalError:
-            pass
-        conn.commit()
-    finally:
-        conn.close()
+    async def close(self):
+        vigilante.detener()
+        await despachador.detener()
+        await validador.detener()
+        await vigia_externos.detener()
+        await cola_subidas.detener()
+        if self.web_runner:
+            await self.web_runner.cleanup()
+        await super().close()
+
+# Esperas de rate limit de más de 30 s se reportan como discord.RateLimited en
+# lugar de bloquear; el despachador del outbox pausa solo ese destino
+bot = BotProcuraduria(command_prefix='!', intents=intents, max_ratelimit_timeout=30.0,
+                      shard_count=configuracion.entero_de_entorno('SHARD_COUNT'))
+metricas.instrumentar_http(bot.http, metrica_discord_llamadas, metrica_discord_duracion)
+
+# Acceso asíncrono a SQLite (pool de conexiones fuera del event loop)
+db = BaseDatos(DB_PATH, observar=observar_sqlite)
+
+# Vigilante del event loop: pila y comando de cada bloqueo (ver /vigilante)
+vigilante = Vigilante(
+    umbral=float(os.getenv('VIGILANTE_UMBRAL_MS', 250)) / 1000,
+    observar_retraso=metrica_bucle_retraso.observar,
+    al_bloqueo=lambda reporte: metrica_bucle_bloqueos.inc(comando=reporte['comando'] or 'ninguno')
+)
+
+# Configuración por servidor en memoria; el servidor principal usa las constantes
+# de arriba (RESPONDER_ROLE_ID en .env tiene prioridad sobre la constante)
+configuraciones = configuracion.Configuraciones(
+    respaldo=configuracion.ConfiguracionGuild(
+        None,
+        canal_pqrs_id=CANAL_PQRS_ID,
+        canal_registros_id=REGISTROS_CHANNEL_ID,
+        rol_procuraduria_id=ROL_PROCURADURIA_ID,
+        rol_responder_id=configuracion.entero_de_entorno('RESPONDER_ROLE_ID', RESPONDER_ROLE_ID),
+        drive_folder_id=DRIVE_FOLDER_ID
+    ),
+    guild_principal=configuracion.entero_de_entorno('GUILD_ID')
+)
+
+# Permisos por rol de cada servidor, cacheados por miembro
+resolutor_permisos = permisos.ResolutorPermisos(configuraciones.roles)
+resolutor_permisos.registrar_eventos(bot)
+
+# Cachés de lectura para /buscar-caso y /consultar-radicado
+CACHE_TTL = float(os.getenv('CACHE_TTL', 300))
+cache_casos = CacheLRU('casos', max_items=2048, ttl=CACHE_TTL)
+cache_pqrs = CacheLRU('pqrs', max_items=4096, ttl=CACHE_TTL)
+
+# API HTTP pública de solo lectura (/casos/{iuc}, /estadisticas) con su propia caché
+api_publica = ApiPublica(db)
+
+# Índices en memoria para autocompletar IUC, IUS y radicados
+indices = IndicesAutocompletado()
+
+# Ediciones agrupadas del campo "Adjuntos" de los mensajes de casos
+editor_adjuntos = EditorAdjuntos(bot, db)
+
+# Mensajes de Discord diferidos: se escriben en la tabla outbox junto con el
+# cambio y se entregan en segundo plano (ver outbox.py)
+despachador = outbox.Despachador(bot, db)
+
+@despachador.al_entregar('caso_registrado')
+async def guardar_mensaje_caso(mensaje, caso_id):
+    # Guardar el ID del mensaje y del canal en la BD
+    def _guardar(conn):
+        repositorio.casos.actualizar(conn, int(caso_id), mensaje_id=str(mensaje.id),
+                                     canal_registros_id=str(mensaje.channel.id))
+        caso = repositorio.casos.por_id(conn, int(caso_id))
+        return caso and (caso.iuc, repositorio.documentos.hay_de_caso(conn, caso.iuc))
+    guardado = await db.transaccion(_guardar)
+    if guardado:
+        iuc, con_adjuntos = guardado
+        editor_adjuntos.recordar(iuc, mensaje)
+        # documentos adjuntados antes de que se publicara el mensaje
+        if con_adjuntos:
+            editor_adjuntos.programar(iuc)
+
+@despachador.al_entregar('pqrs_publicada')
+async def guardar_mensaje_pqrs(mensaje, pqrs_id):
+    await db.run(lambda conn: repositorio.pqrs.actualizar(conn, int(pqrs_id), canal_mensaje_id=str(mensaje.id)))
+
+# Conexión a Google Drive: credenciales y cliente se crean en el primer uso
+# (GOOGLE_CREDENTIALS en deploy, credentials.json en desarrollo local)
+cliente_drive = ClienteDrive(SCOPES, SERVICE_ACCOUNT_FILE)
+
+# Subidas a Drive en segundo plano (un cliente por hilo de subida)
+cola_subidas = ColaSubidas(
+    cliente_drive.servicio,
+    DRIVE_FOLDER_ID,
+    workers=int(os.getenv('DRIVE_UPLOAD_WORKERS', 2)),
+    observar=observar_drive
+)
+
+# Verificación periódica de los links de Drive de los documentos, por lotes
+# (ver validador_drive.py)
+validador = validador_drive.ValidadorDrive(
+    db,
+    cliente_drive.servicio,
+    disponible=lambda: cliente_drive.disponible,
+    observar=observar_drive
+)
+
+# Cambios hechos con admin.py mientras el bot corre: recargar el autocompletado
+# y vaciar las cachés de lectura (ver cambios_externos.py)
+async def recargar_por_cambios_externos():
+    await indices.cargar(db)
+    for cache in (cache_casos, cache_pqrs, api_publica.cache):
+        cache.limpiar()
+
+vigia_externos = cambios_externos.VigiaCambiosExternos(db, recargar_por_cambios_externos)
 
 # ==================== FUNCIONES DE GOOGLE DRIVE ====================
 def subir_a_drive(archivo_path, nombre_archivo):
-    """Sube un archivo a Google Drive y retorna el link"""
-    if not drive_service:
+    """Sube un archivo a Google Drive y retorna el link (bloqueante).
+    Desde un comando usar `await subir_a_drive_async(...)`."""
+    if not cliente_drive.disponible:
         return None
     try:
-        file_metadata = {
-            'name': nombre_archivo,
-            'parents': [DRIVE_FOLDER_ID]
-        }
-        media = MediaFileUpload(archivo_path, resumable=True)
-        file = drive_service.files().create(
-            body=file_metadata,
-            media_body=media,
-            fields='id, webViewLink'
-        ).execute()
-        
-        # Hacer el archivo público
-        drive_service.permissions().create(
-            fileId=file['id'],
-            body={'type': 'anyone', 'role': 'reader'}
-        ).execute()
-        
-        return file.get('webViewLink')
+        return subir_archivo(cliente_drive.servicio(), archivo_path, nombre_archivo, DRIVE_FOLDER_ID,
+                             observar=observar_drive)
     except Exception as e:
         print(f"Error subiendo archivo: {e}")
         return None
 
 
+async def subir_a_drive_async(archivo_path, nombre_archivo, progreso=None, carpeta_id=None):
+    """Encola la subida en el pool de Drive y espera el link sin bloquear el bot."""
+    if not await asyncio.to_thread(lambda: cliente_drive.disponible):
+        return None
+    try:
+        futuro = await cola_subidas.subir(archivo_path, nombre_archivo, progreso, carpeta_id)
+        return await futuro
+    except Exception:
+        return None
+
+
 def _parse_iuc_numeric(iuc: str) -> str:
     """Extrae la parte numérica final del IUC y la deja en 4 dígitos.
     Ej: IUC-E-2025-1 -> '0001'"""
@@ -215,11 +376,11 @@ def _parse_iuc_numeric(iuc: str) -> str:
         return "0000"
 
 
-def generar_ius(iuc: str, tipo: str = 'F') -> str:
+def generar_ius(conn, iuc: str, tipo: str = 'F') -> str:
     """Genera un IUS único siguiendo el formato:
     IUS-(F|A)-(AÑO XXXX)-(XXXX del radicado IUC)-(X extra incremental)
     Se usa la parte numérica del IUC (4 dígitos) y se añade un contador incremental
-    para evitar colisiones.
+    para evitar colisiones. Debe llamarse dentro de una transacción.
     """
     tipo = tipo.upper() if tipo and tipo.upper() in ('F', 'A') else 'F'
     # extraer año del IUC si es posible
@@ -235,36 +396,56 @@ def generar_ius(iuc: str, tipo: str = 'F') -> str:
 
     iuc_num = _parse_iuc_numeric(iuc)
 
-    # contar cuántos IUS ya existen con mismo prefijo para asignar siguiente número
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
-    base_prefix = f"IUS-{tipo}-{year}-{iuc_num}-"
-    c.execute("SELECT COUNT(*) FROM documentos WHERE ius LIKE ?", (base_prefix + '%',))
-    count = c.fetchone()[0] or 0
-    next_index = count + 1
-    ius = f"{base_prefix}{next_index}"
-    conn.close()
+    # siguiente número del contador de IUS de este IUC
+    next_index = secuencias.siguiente(conn, f"IUS-{iuc_num}", year, tipo)
+    ius = f"IUS-{tipo}-{year}-{iuc_num}-{next_index}"
     return ius
 
+
+def cargar_vista_caso(conn, iuc: str):
+    """Caso y documentos adjuntos en una sola ida al pool (para cache_casos)."""
+    caso = repositorio.casos.obtener(conn, iuc)
+    if not caso:
+        return None
+    return caso, repositorio.documentos.de_caso(conn, iuc)
+
+async def configuracion_requerida(interaction: discord.Interaction, *campos):
+    """Configuración del servidor de la interacción. Si le falta alguno de
+    `campos` responde el error al usuario y retorna None."""
+    config = configuraciones.obtener(interaction.guild_id)
+    faltantes = [campo for campo in campos if not getattr(config, campo, None)]
+    if faltantes:
+        await interaction.followup.send(
+            f"❌ Este servidor no tiene configurado: {', '.join(configuracion.ETIQUETAS[c] for c in faltantes)}. "
+            f"Un administrador debe usar `/configurar`.",
+            ephemeral=True
+        )
+        return None
+    return config
+
 # ==================== EVENTOS DEL BOT ====================
 @bot.event
 async def on_ready():
-    print(f'✅ Bot conectado como {bot.user}')
-    init_db()
-    try:
-        # Si se proporciona GUILD_ID en .env, sincronizamos en ese guild
-        GUILD_ID = os.getenv('GUILD_ID')
-        if GUILD_ID:
-            guild_obj = discord.Object(id=int(GUILD_ID))
-            synced = await bot.tree.sync(guild=guild_obj)
-            print(f'✅ {len(synced)} comandos sincronizados (guild {GUILD_ID})')
-        else:
-            synced = await bot.tree.sync()
-            print(f'✅ {len(synced)} comandos sincronizados (global)')
-    except Exception as e:
-        print(f'❌ Error sincronizando comandos: {e}')
-    # Iniciar servidor web para Fly.io
-    asyncio.create_task(run_web_server())
+    # Se repite en cada reconexión: el arranque está en BotProcuraduria.setup_hook
+    print(f'✅ Bot conectado como {bot.user} ({bot.shard_count or 1} shards, {len(bot.guilds)} servidores)')
+    # Instalación anterior a la configuración por servidor, sin GUILD_ID: si el
+    # bot está en un solo servidor, ese es el principal y se queda con los datos
+    if configuraciones.guild_principal is None and not len(configuraciones) and len(bot.guilds) == 1:
+        await adoptar_servidor(bot.guilds[0])
+
+async def adoptar_servidor(guild):
+    """Configura `guild` como servidor principal y le asigna las filas sin servidor."""
+    config = configuraciones.respaldo.combinar(guild.id)
+    def _adoptar(conn):
+        configuracion.guardar(conn, config)
+        return configuracion.asignar_guild(conn, guild.id)
+    asignadas = await db.transaccion(_adoptar)
+    configuraciones.actualizar(config)
+    resolutor_permisos.invalidar(guild.id)
+    # los índices y las cachés tienen las filas con guild_id None (igual que
+    # después de `admin.py asignar-guild`)
+    await recargar_por_cambios_externos()
+    print(f'⚙️ Servidor {guild.name} ({guild.id}) configurado como principal; registros asignados: {asignadas}')
 
 # ==================== COMANDOS PARA CIUDADANOS ====================
 @bot.tree.command(name="buscar-caso", description="Buscar un caso por IUC (solo ciudadanos)")
@@ -272,35 +453,28 @@ async def on_ready():
 async def buscar_caso(interaction: discord.Interaction, iuc: str):
     await interaction.response.defer(ephemeral=True)
     
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
-    c.execute("SELECT iuc, tipo, estado, visibilidad FROM casos WHERE iuc = ?", (iuc.upper(),))
-    caso = c.fetchone()
-    conn.close()
+    vista = await cache_casos.obtener(iuc.upper(), lambda: db.run(cargar_vista_caso, iuc.upper()))
 
-    if not caso:
+    if not vista:
         await interaction.followup.send("❌ Caso no encontrado", ephemeral=True)
         return
 
-    iuc_val, tipo_val, estado_val, visibilidad_val = caso[0], caso[1], caso[2], (caso[3] if len(caso) > 3 else 'PUBLICO')
+    caso, attached_docs = vista
+    # los casos de otros servidores no existen para este
+    if caso.guild_id != configuraciones.ambito(interaction.guild_id):
+        await interaction.followup.send("❌ Caso no encontrado", ephemeral=True)
+        return
 
     # Si el caso es reservado y el usuario no es procuraduría, negar acceso a TODO
-    rol = interaction.guild.get_role(ROL_PROCURADURIA_ID)
-    es_procuraduria_user = rol in interaction.user.roles if rol else False
-    if visibilidad_val and visibilidad_val.upper() == 'RESERVADO' and not es_procuraduria_user:
+    es_procuraduria_user = resolutor_permisos.tiene(interaction.user, permisos.PROCURADURIA)
+    if caso.reservado and not es_procuraduria_user:
         await interaction.followup.send("🔒 Caso reservado", ephemeral=True)
         return
 
     # mostrar también documentos adjuntos (solo si NO es reservado o si es procuraduría)
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
-    c.execute("SELECT tipo, numero, anio, titulo, ius FROM documentos WHERE attached_iuc = ?", (iuc.upper(),))
-    attached_docs = c.fetchall()
-    conn.close()
-
-    msg = f"**Caso {iuc_val}**\nTipo: {tipo_val}\nEstado: {estado_val}"
+    msg = f"**Caso {caso.iuc}**\nTipo: {caso.tipo}\nEstado: {caso.estado}"
     if attached_docs:
-        msg += "\n\nDocumentos adjuntos:\n" + "\n".join([f"- {d[0]} {d[1]} de {d[2]} | IUS: {d[4]}" for d in attached_docs])
+        msg += "\n\nDocumentos adjuntos:\n" + "\n".join([f"- {d.tipo} {d.titulo} | IUS: {d.ius}" for d in attached_docs])
     await interaction.followup.send(msg, ephemeral=True)
 
 @bot.tree.command(name="radicar-pqrs", description="Radicar una Petición, Queja, Reclamo o Solicitud")
@@ -345,50 +519,42 @@ async def radicar_pqrs(interaction: discord.Interaction):
                 return
             
             tipo_completo = tipo_dict[tipo_letra]
+            config = await configuracion_requerida(interaction, 'canal_pqrs_id')
+            if not config:
+                return
+            guild_id = configuraciones.ambito(interaction.guild_id)
+            rol = interaction.guild.get_role(config.rol_procuraduria_id) if interaction.guild else None
             
-            # Generar radicado
-            conn = sqlite3.connect('procuraduria.db')
-            c = conn.cursor()
-            anio = datetime.now().year
-            c.execute("SELECT COUNT(*) FROM pqrs WHERE radicado LIKE ?", (f"PQRS-{anio}-%",))
-            count = c.fetchone()[0] + 1
-            radicado = f"PQRS-{anio}-{count:04d}"
+            def _radicar(conn):
+                # Generar radicado y guardar PQRS en la misma transacción
+                anio = datetime.now().year
+                count = secuencias.siguiente(conn, 'PQRS', anio)
+                radicado = f"PQRS-{anio}-{count:04d}"
+                pqrs_id = repositorio.pqrs.insertar(
+                    conn, radicado=radicado, tipo=tipo_completo, usuario_id=str(interaction.user.id),
+                    usuario_nombre=interaction.user.name, asunto=self.asunto.value,
+                    descripcion=self.descripcion.value, guild_id=guild_id)
+                
+                # Aviso al canal de PQRS (el ID del mensaje se guarda al entregarlo)
+                embed = discord.Embed(
+                    title=f"📨 Nueva PQRS: {radicado}",
+                    color=discord.Color.orange(),
+                    timestamp=datetime.now()
+                )
+                embed.add_field(name="Tipo", value=tipo_completo, inline=True)
+                embed.add_field(name="Radicado", value=radicado, inline=True)
+                embed.add_field(name="Usuario", value=interaction.user.mention, inline=True)
+                embed.add_field(name="Asunto", value=self.asunto.value, inline=False)
+                embed.add_field(name="Descripción", value=self.descripcion.value[:1000], inline=False)
+                outbox.encolar(conn, outbox.CANAL, config.canal_pqrs_id,
+                               contenido=rol.mention if rol else '@Procuraduría', embed=embed,
+                               al_entregar='pqrs_publicada', clave=pqrs_id)
+                return radicado
             
-            # Guardar PQRS
             try:
-                c.execute("""INSERT INTO pqrs 
-                    (radicado, tipo, usuario_id, usuario_nombre, asunto, descripcion) 
-                    VALUES (?, ?, ?, ?, ?, ?)""",
-                    (radicado, tipo_completo, str(interaction.user.id), 
-                     interaction.user.name, self.asunto.value, self.descripcion.value))
-                conn.commit()
-                
-                # Enviar al canal de PQRS
-                canal = bot.get_channel(CANAL_PQRS_ID)
-                if canal:
-                    rol = interaction.guild.get_role(ROL_PROCURADURIA_ID)
-                    embed = discord.Embed(
-                        title=f"📨 Nueva PQRS: {radicado}",
-                        color=discord.Color.orange(),
-                        timestamp=datetime.now()
-                    )
-                    embed.add_field(name="Tipo", value=tipo_completo, inline=True)
-                    embed.add_field(name="Radicado", value=radicado, inline=True)
-                    embed.add_field(name="Usuario", value=interaction.user.mention, inline=True)
-                    embed.add_field(name="Asunto", value=self.asunto.value, inline=False)
-                    embed.add_field(name="Descripción", value=self.descripcion.value[:1000], inline=False)
-                    
-                    mensaje = await canal.send(
-                        content=f"{rol.mention if rol else '@Procuraduría'}",
-                        embed=embed
-                    )
-                    
-                    # Guardar ID del mensaje
-                    c.execute("UPDATE pqrs SET canal_mensaje_id = ? WHERE radicado = ?",
-                             (str(mensaje.id), radicado))
-                    conn.commit()
-                
-                conn.close()
+                radicado = await db.transaccion(_radicar)
+                despachador.despertar()
+                indices.de(guild_id).radicados.agregar(radicado)
                 
                 # Confirmar al usuario
                 await interaction.followup.send(
@@ -400,7 +566,6 @@ async def radicar_pqrs(interaction: discord.Interaction):
                 )
                 
             except Exception as e:
-                conn.close()
                 await interaction.followup.send(
                     f"❌ Error al radicar PQRS: {e}",
                     ephemeral=True
@@ -413,12 +578,13 @@ async def radicar_pqrs(interaction: discord.Interaction):
 async def consultar_radicado(interaction: discord.Interaction, radicado: str):
     await interaction.response.defer(ephemeral=True)
     
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
-    c.execute("SELECT * FROM pqrs WHERE radicado = ? AND usuario_id = ?", 
-              (radicado.upper(), str(interaction.user.id)))
-    pqrs = c.fetchone()
-    conn.close()
+    pqrs = await cache_pqrs.obtener(
+        radicado.upper(),
+        lambda: db.run(repositorio.pqrs.obtener, radicado.upper())
+    )
+    # solo el usuario que radicó puede consultarla
+    if pqrs and pqrs.usuario_id != str(interaction.user.id):
+        pqrs = None
     
     if not pqrs:
         await interaction.followup.send(
@@ -428,146 +594,162 @@ async def consultar_radicado(interaction: discord.Interaction, radicado: str):
         return
     
     embed = discord.Embed(
-        title=f"📋 PQRS {pqrs[1]}",
+        title=f"📋 PQRS {pqrs.radicado}",
         color=discord.Color.blue(),
         timestamp=datetime.now()
     )
-    embed.add_field(name="Tipo", value=pqrs[2], inline=True)
-    embed.add_field(name="Estado", value=pqrs[8], inline=True)
-    embed.add_field(name="Fecha Radicación", value=pqrs[7][:10], inline=True)
-    embed.add_field(name="Asunto", value=pqrs[5], inline=False)
+    embed.add_field(name="Tipo", value=pqrs.tipo, inline=True)
+    embed.add_field(name="Estado", value=pqrs.estado, inline=True)
+    embed.add_field(name="Fecha Radicación", value=(pqrs.fecha_radicacion or "")[:10], inline=True)
+    embed.add_field(name="Asunto", value=pqrs.asunto, inline=False)
     
-    if pqrs[8] == 'RESPONDIDA' and pqrs[10]:
-        embed.add_field(name="Respuesta", value=pqrs[10], inline=False)
-        embed.add_field(name="Fecha Respuesta", value=pqrs[9][:10] if pqrs[9] else "N/A", inline=True)
+    if pqrs.estado == 'RESPONDIDA' and pqrs.respuesta:
+        embed.add_field(name="Respuesta", value=pqrs.respuesta, inline=False)
+        embed.add_field(name="Fecha Respuesta", value=pqrs.fecha_respuesta[:10] if pqrs.fecha_respuesta else "N/A", inline=True)
     
     await interaction.followup.send(embed=embed, ephemeral=True)
 
+@bot.tree.command(name="buscar", description="Buscar casos, documentos y PQRS por texto")
+@app_commands.describe(
+    texto="Palabras a buscar (nombre, asunto, título, descripción...)",
+    pagina="Página de resultados (opcional, por defecto 1)"
+)
+async def buscar(interaction: discord.Interaction, texto: str, pagina: int = 1):
+    await interaction.response.defer(ephemeral=True)
+    
+    pagina = max(1, pagina)
+    # Procuraduría ve casos reservados y todas las PQRS; el resto solo lo público y sus PQRS
+    es_procuraduria_user = resolutor_permisos.tiene(interaction.user, permisos.PROCURADURIA)
+    resultados, hay_mas = await db.run(
+        busqueda.buscar, texto, es_procuraduria_user, str(interaction.user.id),
+        configuraciones.ambito(interaction.guild_id), pagina)
+    
+    if not resultados:
+        await interaction.followup.send(f"❌ Sin resultados para '{texto}'", ephemeral=True)
+        return
+    
+    iconos = {'caso': '📋', 'documento': '📄', 'pqrs': '📨'}
+    embed = discord.Embed(
+        title=f"🔎 Resultados para '{texto[:100]}'",
+        color=discord.Color.blue(),
+        timestamp=datetime.now()
+    )
+    for clase, ident, titulo, fragmento, _rank in resultados:
+        embed.add_field(
+            name=f"{iconos[clase]} {ident}"[:256],
+            value=f"{titulo or '-'}\n{fragmento or ''}"[:1024],
+            inline=False
+        )
+    embed.set_footer(text=f"Página {pagina}" + (f" · siguiente: /buscar pagina:{pagina + 1}" if hay_mas else ""))
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
 # ==================== COMANDOS PARA PROCURADURÍA ====================
 def es_procuraduria():
     """Decorador para verificar si el usuario tiene el rol de Procuraduría"""
-    async def predicate(interaction: discord.Interaction) -> bool:
-        # Verificar rol tradicional de Procuraduría
-        rol = interaction.guild.get_role(ROL_PROCURADURIA_ID)
-        if rol and rol in interaction.user.roles:
-            return True
-
-        await interaction.response.send_message(
-            "❌ No tienes permisos para usar este comando",
-            ephemeral=True
-        )
-        return False
-    return app_commands.check(predicate)
+    return resolutor_permisos.check(permisos.PROCURADURIA)
 
 @bot.tree.command(name="registrar-documento", description="[PROCURADURÍA] Registrar resolución o decreto")
 @app_commands.describe(
     tipo="Tipo de documento",
     titulo="Título del documento",
-    link="Link de Google Drive",
+    link="Link de Google Drive (opcional si se adjunta el archivo)",
     adjuntar_iuc="Radicado IUC al que adjuntar (opcional, ej: IUC-E-2025-0001)",
-    ius_tipo="Tipo de IUS: F=Fallos, A=Autos (opcional, por defecto F)"
+    ius_tipo="Tipo de IUS: F=Fallos, A=Autos (opcional, por defecto F)",
+    archivo="Archivo a subir a Google Drive (opcional, ej: PDF de la resolución)"
 )
 @es_procuraduria()
 async def registrar_documento(
     interaction: discord.Interaction,
     tipo: str,
     titulo: str,
-    link: str,
+    link: str = None,
     adjuntar_iuc: str = None,
-    ius_tipo: str = 'F'
+    ius_tipo: str = 'F',
+    archivo: discord.Attachment = None
 ):
     await interaction.response.defer(ephemeral=True)
     
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
+    if not link and not archivo:
+        await interaction.followup.send("❌ Debe indicar un link o adjuntar el archivo", ephemeral=True)
+        return
+    
+    config = await configuracion_requerida(
+        interaction, 'canal_registros_id', *(['drive_folder_id'] if archivo else []))
+    if not config:
+        return
+    guild_id = configuraciones.ambito(interaction.guild_id)
     
     # si se adjunta a un IUC, validar que el caso existe y que no esté archivado
-    ius_value = None
     attached = None
     if adjuntar_iuc:
         attached = adjuntar_iuc.strip().upper()
-        c.execute("SELECT estado, visibilidad FROM casos WHERE iuc = ?", (attached,))
-        row = c.fetchone()
-        if not row:
+        caso = await db.run(repositorio.casos.obtener, attached, guild_id)
+        if not caso:
             await interaction.followup.send(f"❌ No existe el caso {attached}", ephemeral=True)
-            conn.close()
             return
-        estado_caso = row[0] if row and len(row) > 0 else None
-        if estado_caso and estado_caso.upper() == 'ARCHIVADO':
+        if caso.archivado:
             await interaction.followup.send(f"❌ No puede adjuntarse documentos a un caso archivado ({attached})", ephemeral=True)
-            conn.close()
             return
-        ius_value = generar_ius(attached, tipo=ius_tipo)
     
-    try:
-        c.execute("""INSERT INTO documentos 
-            (tipo, titulo, link_drive, ius, attached_iuc, registrado_por) 
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-            (tipo.upper(), titulo, link, ius_value, attached, interaction.user.name))
-        conn.commit()
+    # Subir el archivo adjunto a Drive en segundo plano
+    if archivo:
+        ultimo_aviso = 0
+        async def progreso(fraccion):
+            nonlocal ultimo_aviso
+            porcentaje = int(fraccion * 100) // 25 * 25
+            if porcentaje > ultimo_aviso:
+                ultimo_aviso = porcentaje
+                await interaction.edit_original_response(content=f"⏫ Subiendo {archivo.filename}... {porcentaje}%")
         
-        # Actualizar el mensaje del caso si está adjunto a un IUC
+        with tempfile.TemporaryDirectory() as tmp:
+            ruta = os.path.join(tmp, archivo.filename)
+            await archivo.save(ruta)
+            link = await subir_a_drive_async(ruta, archivo.filename, progreso, config.drive_folder_id)
+        if not link:
+            await interaction.followup.send("❌ No se pudo subir el archivo a Google Drive", ephemeral=True)
+            return
+    
+    # el link se verifica en segundo plano; si no es de Drive solo se avisa
+    drive_file_id = validador_drive.extraer_id(link)
+
+    def _insertar(conn):
+        # el IUS se asigna en la misma transacción que el INSERT
+        ius = generar_ius(conn, attached, tipo=ius_tipo) if attached else None
+        repositorio.documentos.insertar(
+            conn, tipo=tipo.upper(), titulo=titulo, link_drive=link, ius=ius, attached_iuc=attached,
+            registrado_por=interaction.user.name, guild_id=guild_id, drive_file_id=drive_file_id)
+        if drive_file_id:
+            validador_drive.programar(conn, drive_file_id)
+        
+        # Log al canal de registros
+        embed = discord.Embed(title="Nuevo documento registrado", color=discord.Color.blue(), timestamp=datetime.now())
+        embed.add_field(name="Documento", value=f"{tipo.upper()} ", inline=False)
+        embed.add_field(name="Título", value=titulo or "-", inline=False)
         if attached:
-            try:
-                c.execute("SELECT mensaje_id, canal_registros_id FROM casos WHERE iuc = ?", (attached,))
-                caso_info = c.fetchone()
-                if caso_info and caso_info[0] and caso_info[1]:
-                    mensaje_id = int(caso_info[0])
-                    canal_id = int(caso_info[1])
-                    # Obtener el canal y el mensaje
-                    try:
-                        channel = bot.get_channel(canal_id) or await bot.fetch_channel(canal_id)
-                        mensaje = await channel.fetch_message(mensaje_id)
-                        
-                        # Obtener todos los documentos adjuntos a este caso
-                        c.execute("SELECT tipo, titulo, link_drive, ius FROM documentos WHERE attached_iuc = ? ORDER BY fecha_registro", (attached,))
-                        docs = c.fetchall()
-                        
-                        # Construir lista de adjuntos
-                        adjuntos_text = ""
-                        if docs:
-                            adjuntos_text = "\n".join([f"{i+1}. {d[0]} {d[1]} ({d[2]}) - {d[3]}\n   IUS: {d[5]}\n   Link: {d[4]}" for i, d in enumerate(docs)])
-                        else:
-                            adjuntos_text = "Ninguno"
-                        
-                        # Actualizar el embed del mensaje
-                        embeds = mensaje.embeds
-                        if embeds:
-                            embed = embeds[0]
-                            # Buscar y actualizar el field de "Adjuntos"
-                            found = False
-                            for i, field in enumerate(embed.fields):
-                                if field.name == "Adjuntos":
-                                    embed.set_field_at(i, name="Adjuntos", value=adjuntos_text, inline=False)
-                                    found = True
-                                    break
-                            if not found:
-                                embed.add_field(name="Adjuntos", value=adjuntos_text, inline=False)
-                            
-                            await mensaje.edit(embed=embed)
-                    except Exception as e:
-                        print(f"Error actualizando mensaje del caso: {e}")
-            except Exception as e:
-                print(f"Error en actualización de mensaje: {e}")
+            embed.add_field(name="Adjunto a IUC", value=attached, inline=True)
+        if ius:
+            embed.add_field(name="IUS generado", value=ius, inline=True)
+        embed.add_field(name="Registrado por", value=interaction.user.name, inline=True)
+        embed.add_field(name="Link", value=link or "-", inline=False)
+        outbox.encolar(conn, outbox.CANAL, config.canal_registros_id, embed=embed)
+        return ius
+    
+    try:
+        ius_value = await db.transaccion(_insertar)
+        despachador.despertar()
+        if drive_file_id:
+            validador.despertar()
+        indices.de(guild_id).documentos.agregar(ius_value)
         
-        # Enviar log al canal de registros si existe
-        try:
-            channel = bot.get_channel(REGISTROS_CHANNEL_ID) or await bot.fetch_channel(REGISTROS_CHANNEL_ID)
-            embed = discord.Embed(title="Nuevo documento registrado", color=discord.Color.blue(), timestamp=datetime.now())
-            embed.add_field(name="Documento", value=f"{tipo.upper()} ", inline=False)
-            embed.add_field(name="Título", value=titulo or "-", inline=False)
-            if attached:
-                embed.add_field(name="Adjunto a IUC", value=attached, inline=True)
-            if ius_value:
-                embed.add_field(name="IUS generado", value=ius_value, inline=True)
-            embed.add_field(name="Registrado por", value=interaction.user.name, inline=True)
-            embed.add_field(name="Link", value=link or "-", inline=False)
-            await channel.send(embed=embed)
-        except Exception:
-            pass
+        # Actualizar el mensaje del caso si está adjunto a un IUC (en segundo plano)
+        if attached:
+            cache_casos.invalidar(attached)
+            api_publica.invalidar(attached)
+            editor_adjuntos.programar(attached)
         
         await interaction.followup.send(
-            f"✅ Documento registrado:\n**{tipo} **\n{titulo}" + (f"\nRadicado IUS generado: **{ius_value}**" if ius_value else ""),
+            f"✅ Documento registrado:\n**{tipo} **\n{titulo}" + (f"\nRadicado IUS generado: **{ius_value}**" if ius_value else "")
+            + ("" if drive_file_id else "\n⚠️ El link no es de Google Drive: no se verificará que siga disponible"),
             ephemeral=True
         )
     except sqlite3.IntegrityError:
@@ -575,62 +757,53 @@ async def registrar_documento(
             "❌ Error: Ya existe un documento con esos datos",
             ephemeral=True
         )
-    finally:
-        conn.close()
 
 @bot.tree.command(name="buscar-documento", description="[PROCURADURÍA] Buscar documento por IUS")
 @app_commands.describe(ius="IUS del documento (ej: IUS-F-2025-0001-1)")
 @es_procuraduria()
 async def buscar_documento(interaction: discord.Interaction, ius: str):
-    """Buscar documento(s) por IUS.
+    """Buscar documento por IUS.
     Retorna los metadatos y un embed con link (si existe).
     """
     await interaction.response.defer(ephemeral=True)
 
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
-    c.execute("SELECT * FROM documentos WHERE ius = ?", (ius.strip().upper(),))
-    docs = c.fetchall()
-    conn.close()
+    def _cargar(conn):
+        doc = repositorio.documentos.obtener(conn, ius.strip().upper(), configuraciones.ambito(interaction.guild_id))
+        return doc, doc and validador_drive.obtener(conn, doc.drive_file_id)
+    doc, archivo = await db.run(_cargar)
 
-    if not docs:
+    if not doc:
         await interaction.followup.send(
             f"❌ No se encontró ningún documento con IUS {ius}",
             ephemeral=True
         )
         return
 
-    # Mostrar lista resumida y luego un embed por documento
-    lines = []
-    for d in docs:
-        # documentos table: id,tipo,numero,anio,titulo,descripcion,link_drive, ius, attached_iuc, fecha_registro, registrado_por
-        doc_tipo = d[1]
-        doc_numero = d[2]
-        doc_anio = d[3]
-        doc_titulo = d[4]
-        doc_ius = d[7]
-        doc_attached = d[8]
-        s = f"**{doc_tipo} {doc_numero} de {doc_anio}** - {doc_titulo} | IUS: {doc_ius}"
-        if doc_attached:
-            s += f" | Adjuntado a IUC: {doc_attached}"
-        lines.append(s)
-
-    await interaction.followup.send("\n".join(lines), ephemeral=True)
-
-    for doc in docs:
-        embed = discord.Embed(
-            title=f"{doc[1]} {doc[2]} de {doc[3]}",
-            description=doc[4] if doc[4] else "Sin título",
-            color=discord.Color.green(),
-            url=doc[6] if doc[6] else None
-        )
-        if doc[5]:
-            embed.add_field(name="Descripción", value=doc[5], inline=False)
-        if doc[6]:
-            embed.add_field(name="📎 Link", value=f"[Ver documento]({doc[6]})", inline=False)
-        embed.set_footer(text=f"Registrado por {doc[10]}")
+    # el IUS es único: un solo embed con los metadatos y el link
+    embed = discord.Embed(
+        title=f"{doc.tipo} {doc.ius}",
+        description=doc.titulo or "Sin título",
+        color=discord.Color.green(),
+        url=doc.link_drive or None
+    )
+    if doc.descripcion:
+        embed.add_field(name="Descripción", value=doc.descripcion[:1024], inline=False)
+    if doc.attached_iuc:
+        embed.add_field(name="Adjuntado a IUC", value=doc.attached_iuc, inline=True)
+    if doc.link_drive:
+        embed.add_field(name="📎 Link", value=f"[Ver documento]({doc.link_drive})", inline=False)
+    if archivo and archivo.verificado_en:
+        if archivo.roto:
+            estado = f"❌ Link roto: {archivo.descripcion()}"
+        elif archivo.nombre:
+            tamano = f" · {archivo.tamano / 1024 / 1024:.1f} MB" if archivo.tamano else ""
+            estado = f"✅ {archivo.nombre}{tamano}"
+        else:
+            estado = f"⚠️ {archivo.descripcion()}"
+        embed.add_field(name="Drive", value=f"{estado}\nVerificado: {archivo.verificado_en[:16]} UTC"[:1024], inline=False)
+    embed.set_footer(text=f"Registrado por {doc.registrado_por or '-'} · {(doc.fecha_registro or '')[:10]}")
 
-        await interaction.followup.send(embed=embed, ephemeral=True)
+    await interaction.followup.send(embed=embed, ephemeral=True)
 
 @bot.tree.command(name="registrar-caso", description="[PROCURADURÍA] Registrar nuevo caso (IUC)")
 @app_commands.describe(
@@ -663,58 +836,57 @@ async def registrar_caso(
     if visibilidad not in ['PUBLICO', 'RESERVADO']:
         visibilidad = 'PUBLICO'
     
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
-    
     # Generar IUC con 4 dígitos en el sufijo
     anio = datetime.now().year
     
-    # Si se proporciona consecutivo, usarlo; si no, generar automáticamente
     if consecutivo is not None:
         consecutivo = max(1, min(9999, int(consecutivo)))
-        iuc = f"IUC-{tipo}-{anio}-{consecutivo:04d}"
-        # Verificar que no exista ya
-        c.execute("SELECT id FROM casos WHERE iuc = ?", (iuc,))
-        if c.fetchone():
-            await interaction.followup.send(
-                f"❌ El IUC {iuc} ya existe",
-                ephemeral=True
-            )
-            conn.close()
-            return
-    else:
-        c.execute("SELECT COUNT(*) FROM casos WHERE iuc LIKE ?", (f"IUC-{tipo}-{anio}-%",))
-        count = c.fetchone()[0] + 1
-        iuc = f"IUC-{tipo}-{anio}-{count:04d}"
     
     tipo_completo = "ÉTICO" if tipo == "E" else "DISCIPLINARIO"
     
-    try:
-        c.execute("""INSERT INTO casos 
-            (iuc, tipo, anio, implicado, descripcion, visibilidad) 
-            VALUES (?, ?, ?, ?, ?, ?)""",
-            (iuc, tipo_completo, anio, implicado, descripcion, visibilidad))
-        conn.commit()
+    config = await configuracion_requerida(interaction, 'canal_registros_id')
+    if not config:
+        return
+    guild_id = configuraciones.ambito(interaction.guild_id)
+    
+    def _registrar(conn):
+        # Si se proporciona consecutivo, usarlo; si no, generar automáticamente
+        if consecutivo is not None:
+            iuc = f"IUC-{tipo}-{anio}-{consecutivo:04d}"
+            # Verificar que no exista ya
+            if repositorio.casos.obtener(conn, iuc):
+                return None
+            # el automático nunca debe volver a entregar este número
+            secuencias.asegurar_minimo(conn, 'IUC', anio, tipo, consecutivo)
+        else:
+            count = secuencias.siguiente(conn, 'IUC', anio, tipo)
+            iuc = f"IUC-{tipo}-{anio}-{count:04d}"
+        caso_id = repositorio.casos.insertar(
+            conn, iuc=iuc, tipo=tipo_completo, anio=anio, implicado=implicado,
+            descripcion=descripcion, visibilidad=visibilidad, guild_id=guild_id)
         
-        # Enviar log al canal de registros
-        mensaje_guardado = None
-        try:
-            channel = bot.get_channel(REGISTROS_CHANNEL_ID) or await bot.fetch_channel(REGISTROS_CHANNEL_ID)
-            embed = discord.Embed(title="Nuevo caso registrado", color=discord.Color.green(), timestamp=datetime.now())
-            embed.add_field(name="IUC", value=iuc, inline=True)
-            embed.add_field(name="Tipo", value=tipo_completo, inline=True)
-            embed.add_field(name="Implicado", value=implicado or "-", inline=False)
-            embed.add_field(name="Visibilidad", value=visibilidad, inline=True)
-            embed.add_field(name="Registrado por", value=interaction.user.name, inline=True)
-            embed.add_field(name="Adjuntos", value="Ninguno", inline=False)
-            mensaje_guardado = await channel.send(embed=embed)
-            # Guardar el ID del mensaje y del canal en la BD
-            if mensaje_guardado:
-                c.execute("UPDATE casos SET mensaje_id = ?, canal_registros_id = ? WHERE iuc = ?", 
-                         (str(mensaje_guardado.id), str(channel.id), iuc))
-                conn.commit()
-        except Exception as e:
-            print(f"Error enviando log a REGISTROS: {e}")
+        # Log al canal de registros; al entregarse se guarda su ID en el caso
+        embed = discord.Embed(title="Nuevo caso registrado", color=discord.Color.green(), timestamp=datetime.now())
+        embed.add_field(name="IUC", value=iuc, inline=True)
+        embed.add_field(name="Tipo", value=tipo_completo, inline=True)
+        embed.add_field(name="Implicado", value=implicado or "-", inline=False)
+        embed.add_field(name="Visibilidad", value=visibilidad, inline=True)
+        embed.add_field(name="Registrado por", value=interaction.user.name, inline=True)
+        embed.add_field(name="Adjuntos", value="Ninguno", inline=False)
+        outbox.encolar(conn, outbox.CANAL, config.canal_registros_id, embed=embed,
+                       al_entregar='caso_registrado', clave=caso_id)
+        return iuc
+    
+    try:
+        iuc = await db.transaccion(_registrar)
+        if iuc is None:
+            await interaction.followup.send(
+                f"❌ El IUC IUC-{tipo}-{anio}-{consecutivo:04d} ya existe",
+                ephemeral=True
+            )
+            return
+        despachador.despertar()
+        indices.de(guild_id).casos.agregar(iuc, oculto=(visibilidad == 'RESERVADO'))
         
         await interaction.followup.send(
             f"✅ **Caso registrado**\n\n"
@@ -729,130 +901,293 @@ async def registrar_caso(
             f"❌ Error al registrar caso: {e}",
             ephemeral=True
         )
-    finally:
-        conn.close()
-
-@bot.tree.command(name="responder-pqrs", description="[PROCURADURÍA] Responder una PQRS")
-@app_commands.describe(
-    radicado="Número de radicado",
-    respuesta="Respuesta a la PQRS"
-)
-async def responder_pqrs(interaction: discord.Interaction, radicado: str, respuesta: str):
-    await interaction.response.defer(ephemeral=True)
-    # Permisos: permitir solo al rol adicional configurado (RESPONDER_ROLE_ID o .env)
-    responder_role = None
-    if interaction.guild:
-        try:
-            env_id = os.getenv('RESPONDER_ROLE_ID')
-            if env_id:
-                responder_role = interaction.guild.get_role(int(env_id))
-        except Exception:
-            responder_role = None
-        if not responder_role and RESPONDER_ROLE_ID:
-            try:
-                responder_role = interaction.guild.get_role(int(RESPONDER_ROLE_ID))
-            except Exception:
-                responder_role = None
 
+async def verificar_responder(interaction: discord.Interaction) -> bool:
+    """Permite solo al rol de respuesta configurado en el servidor.
+    Responde el error al usuario y retorna False si no puede responder PQRS."""
     # Si no hay rol configurado, denegar por seguridad
-    if not responder_role:
+    if not resolutor_permisos.configurado(permisos.RESPONDER, interaction.guild_id):
         await interaction.followup.send(
             "❌ No hay un rol autorizado configurado para responder PQRS. Contacta al administrador.",
             ephemeral=True
         )
-        return
+        return False
 
     # Comprobar que el usuario tiene el rol autorizado
-    if responder_role not in interaction.user.roles:
+    if not resolutor_permisos.tiene(interaction.user, permisos.RESPONDER):
         await interaction.followup.send(
             "❌ No tienes permisos para responder PQRS.",
             ephemeral=True
         )
+        return False
+    return True
+
+def embed_respuesta_pqrs(radicado: str, asunto: str, respuesta: str) -> discord.Embed:
+    embed = discord.Embed(
+        title=f"📬 Respuesta a su PQRS {radicado}",
+        color=discord.Color.green(),
+        timestamp=datetime.now()
+    )
+    embed.add_field(name="Asunto", value=asunto, inline=False)
+    embed.add_field(name="Respuesta", value=respuesta[:1024], inline=False)
+    embed.set_footer(text="Procuraduría General de la Nación")
+    return embed
+
+@bot.tree.command(name="responder-pqrs", description="[PROCURADURÍA] Responder una PQRS")
+@app_commands.describe(
+    radicado="Número de radicado",
+    respuesta="Respuesta a la PQRS"
+)
+async def responder_pqrs(interaction: discord.Interaction, radicado: str, respuesta: str):
+    await interaction.response.defer(ephemeral=True)
+    if not await verificar_responder(interaction):
         return
 
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
-    
     # Buscar PQRS
-    c.execute("SELECT * FROM pqrs WHERE radicado = ?", (radicado.upper(),))
-    pqrs = c.fetchone()
+    pqrs = await db.run(repositorio.pqrs.obtener, radicado.upper(), configuraciones.ambito(interaction.guild_id))
     
     if not pqrs:
-        conn.close()
         await interaction.followup.send(
             f"❌ No se encontró el radicado {radicado}",
             ephemeral=True
         )
         return
     
-    # Actualizar PQRS
+    # Actualizar PQRS y dejar en cola la notificación al usuario por DM
     fecha_actual = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    c.execute("""UPDATE pqrs 
-        SET estado = 'RESPONDIDA', respuesta = ?, fecha_respuesta = ? 
-        WHERE radicado = ?""",
-        (respuesta, fecha_actual, radicado.upper()))
-    conn.commit()
-    conn.close()
+    embed = embed_respuesta_pqrs(pqrs.radicado, pqrs.asunto, respuesta)
     
-    # Notificar al usuario por DM
-    try:
-        usuario = await bot.fetch_user(int(pqrs[3]))
-        embed = discord.Embed(
-            title=f"📬 Respuesta a su PQRS {radicado}",
-            color=discord.Color.green(),
-            timestamp=datetime.now()
-        )
-        embed.add_field(name="Asunto", value=pqrs[5], inline=False)
-        embed.add_field(name="Respuesta", value=respuesta, inline=False)
-        embed.set_footer(text="Procuraduría General de la Nación")
-        
-        await usuario.send(embed=embed)
-        
+    def _responder(conn):
+        repositorio.pqrs.actualizar(conn, pqrs.id, estado='RESPONDIDA', respuesta=respuesta,
+                                    fecha_respuesta=fecha_actual)
+        outbox.encolar(conn, outbox.DM, pqrs.usuario_id, embed=embed)
+    
+    await db.transaccion(_responder)
+    despachador.despertar()
+    cache_pqrs.invalidar(radicado.upper())
+    
+    await interaction.followup.send(
+        f"✅ PQRS {radicado} respondida. La notificación al usuario se enviará por DM en segundo plano",
+        ephemeral=True
+    )
+
+@bot.tree.command(name="responder-pqrs-lote", description="[PROCURADURÍA] Responder varias PQRS a la vez")
+@app_commands.describe(
+    archivo="CSV con columnas radicado,respuesta (una fila por PQRS)",
+    radicados="Radicados separados por comas o espacios (usa la respuesta como plantilla)",
+    respuesta="Respuesta común; admite {radicado} y {asunto}",
+    incluir_respondidas="Volver a responder las PQRS que ya estaban respondidas"
+)
+async def responder_pqrs_lote(
+    interaction: discord.Interaction,
+    archivo: discord.Attachment = None,
+    radicados: str = None,
+    respuesta: str = None,
+    incluir_respondidas: bool = False
+):
+    await interaction.response.defer(ephemeral=True)
+    if not await verificar_responder(interaction):
+        return
+
+    if archivo:
+        if archivo.size > MAX_IMPORTACION_BYTES:
+            await interaction.followup.send("❌ El archivo es demasiado grande.", ephemeral=True)
+            return
+        try:
+            pares = respuestas.leer_respuestas((await archivo.read()).decode('utf-8'))
+        except UnicodeDecodeError:
+            await interaction.followup.send("❌ El archivo debe estar en UTF-8.", ephemeral=True)
+            return
+    elif radicados and respuesta:
+        pares = [(r, respuesta) for r in respuestas.leer_radicados(radicados)]
+    else:
         await interaction.followup.send(
-            f"✅ PQRS {radicado} respondida y notificación enviada al usuario",
+            "❌ Adjunte un CSV radicado,respuesta o indique radicados y una respuesta común.",
             ephemeral=True
         )
-    except:
-        await interaction.followup.send(
-            f"✅ PQRS {radicado} respondida, pero no se pudo enviar DM al usuario",
-            ephemeral=True
+        return
+
+    if not pares:
+        await interaction.followup.send("❌ No se encontraron radicados para responder.", ephemeral=True)
+        return
+    if len(pares) > respuestas.MAX_LOTE:
+        await interaction.followup.send(f"❌ Máximo {respuestas.MAX_LOTE} PQRS por lote.", ephemeral=True)
+        return
+    if any(not r for _, r in pares):
+        await interaction.followup.send("❌ Hay filas sin respuesta.", ephemeral=True)
+        return
+
+    fecha_actual = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    guild_id = configuraciones.ambito(interaction.guild_id)
+
+    def _responder(conn):
+        # todas las filas y sus DMs en una sola transacción
+        resultado = respuestas.responder(conn, pares, fecha_actual, guild_id, incluir_respondidas)
+        resultado['notificaciones'] = {
+            outbox.encolar(conn, outbox.DM, usuario_id, embed=embed_respuesta_pqrs(radicado, asunto, texto)):
+                (radicado, usuario_id)
+            for radicado, usuario_id, asunto, texto in resultado['respondidas']
+        }
+        return resultado
+
+    try:
+        resultado = await db.transaccion(_responder)
+    except Exception as e:
+        await interaction.followup.send(f"❌ Error respondiendo las PQRS: {e}", ephemeral=True)
+        return
+    despachador.despertar()
+    for radicado, *_ in resultado['respondidas']:
+        cache_pqrs.invalidar(radicado)
+
+    resumen = f"✅ **{len(resultado['respondidas'])} PQRS respondidas**"
+    for clave, etiqueta in (('no_encontradas', 'No encontradas'),
+                            ('ya_respondidas', 'Ya respondidas (omitidas)'),
+                            ('repetidas', 'Repetidas en el lote')):
+        if resultado[clave]:
+            lista = ", ".join(resultado[clave][:20]) + (" …" if len(resultado[clave]) > 20 else "")
+            resumen += f"\n**{etiqueta}:** {lista}"
+
+    notificaciones = resultado['notificaciones']
+    if not notificaciones:
+        await interaction.followup.send(resumen, ephemeral=True)
+        return
+
+    # Los DMs salen por el outbox con concurrencia limitada; aquí solo se reporta el avance
+    mensaje = await interaction.followup.send(
+        f"{resumen}\n\n⏳ Notificando usuarios: 0/{len(notificaciones)}", ephemeral=True, wait=True)
+
+    async def progreso(entregados, fallidos, total):
+        texto = f"{resumen}\n\n⏳ Notificando usuarios: {entregados + fallidos}/{total}"
+        if fallidos:
+            texto += f" ({fallidos} sin entregar)"
+        try:
+            await mensaje.edit(content=texto)
+        except discord.HTTPException:
+            pass
+
+    # el token de la interacción dura 15 minutos
+    estados = await despachador.esperar(notificaciones, progreso, limite=600)
+
+    fallidas = [notificaciones[i] for i, (estado, _) in estados.items() if estado == 'FALLIDO']
+    pendientes = [notificaciones[i] for i, (estado, _) in estados.items() if estado == 'PENDIENTE']
+    entregadas = len(notificaciones) - len(fallidas) - len(pendientes)
+    texto = f"{resumen}\n\n📬 **DMs entregados:** {entregadas}/{len(notificaciones)}"
+    if fallidas:
+        lineas = [f"• {radicado} — <@{usuario_id}>" for radicado, usuario_id in fallidas[:25]]
+        if len(fallidas) > 25:
+            lineas.append(f"… y {len(fallidas) - 25} más")
+        texto += "\n**Usuarios sin DM (DMs cerrados o no encontrados):**\n" + "\n".join(lineas)
+    if pendientes:
+        texto += f"\n⏳ {len(pendientes)} notificaciones siguen en cola y se reintentarán."
+    try:
+        await mensaje.edit(content=texto[:2000])
+    except discord.HTTPException:
+        await interaction.followup.send(texto[:2000], ephemeral=True)
+
+class PaginasPQRS(discord.ui.View):
+    """Botones Anterior/Siguiente de /listar-pqrs; guarda el cursor de cada página visitada."""
+
+    def __init__(self, autor_id: int, filtros: dict, descripcion_filtros: str):
+        super().__init__(timeout=300)
+        self.autor_id = autor_id
+        self.filtros = filtros
+        self.descripcion_filtros = descripcion_filtros
+        self.cursores = [None]
+        self.siguiente = None
+
+    async def cargar(self):
+        """Lee la página actual y retorna su embed (None si no hay filas)."""
+        filas, self.siguiente = await db.run(
+            lambda conn: listados.pagina_pqrs(conn, cursor=self.cursores[-1], **self.filtros))
+        self.anterior_btn.disabled = len(self.cursores) == 1
+        self.siguiente_btn.disabled = self.siguiente is None
+        if not filas:
+            return None
+
+        embed = discord.Embed(
+            title=f"📋 PQRS — página {len(self.cursores)}",
+            description=self.descripcion_filtros or None,
+            color=discord.Color.blue(),
+            timestamp=datetime.now()
         )
+        for _id, radicado, tipo, asunto, estado, fecha in filas:
+            estado_emoji = "✅" if estado == "RESPONDIDA" else "⏳"
+            embed.add_field(
+                name=f"{estado_emoji} {radicado}",
+                value=f"**{tipo}** - {asunto[:50]}... ({(fecha or '')[:10]})",
+                inline=False
+            )
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.autor_id
+
+    @discord.ui.button(label="◀ Anterior", style=discord.ButtonStyle.secondary)
+    async def anterior_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.cursores.pop()
+        embed = await self.cargar()
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="Siguiente ▶", style=discord.ButtonStyle.primary)
+    async def siguiente_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.cursores.append(self.siguiente)
+        embed = await self.cargar()
+        await interaction.response.edit_message(embed=embed, view=self)
 
 @bot.tree.command(name="listar-pqrs", description="[PROCURADURÍA] Ver todas las PQRS pendientes")
+@app_commands.describe(
+    estado="Filtrar por estado (opcional)",
+    tipo="Filtrar por tipo (opcional)",
+    anio="Filtrar por año de radicación (opcional)",
+    usuario="Filtrar por usuario que radicó (opcional)"
+)
+@app_commands.choices(
+    estado=[
+        app_commands.Choice(name="Pendiente", value="PENDIENTE"),
+        app_commands.Choice(name="Respondida", value="RESPONDIDA"),
+    ],
+    tipo=[
+        app_commands.Choice(name="Petición", value="PETICIÓN"),
+        app_commands.Choice(name="Queja", value="QUEJA"),
+        app_commands.Choice(name="Reclamo", value="RECLAMO"),
+        app_commands.Choice(name="Solicitud", value="SOLICITUD"),
+    ]
+)
 @es_procuraduria()
-async def listar_pqrs(interaction: discord.Interaction):
+async def listar_pqrs(
+    interaction: discord.Interaction,
+    estado: app_commands.Choice[str] = None,
+    tipo: app_commands.Choice[str] = None,
+    anio: int = None,
+    usuario: discord.User = None
+):
     await interaction.response.defer(ephemeral=True)
     
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
-    c.execute("SELECT radicado, tipo, asunto, estado FROM pqrs ORDER BY fecha_radicacion DESC LIMIT 20")
-    pqrs_list = c.fetchall()
-    conn.close()
+    filtros = {
+        'guild_id': configuraciones.ambito(interaction.guild_id),
+        'estado': estado.value if estado else None,
+        'tipo': tipo.value if tipo else None,
+        'anio': anio,
+        'usuario_id': usuario.id if usuario else None,
+    }
+    descripcion = " · ".join(filter(None, [
+        f"Estado: {estado.value}" if estado else None,
+        f"Tipo: {tipo.value}" if tipo else None,
+        f"Año: {anio}" if anio else None,
+        f"Usuario: {usuario.mention}" if usuario else None,
+    ]))
     
-    if not pqrs_list:
+    vista = PaginasPQRS(interaction.user.id, filtros, descripcion)
+    embed = await vista.cargar()
+    if not embed:
         await interaction.followup.send("📋 No hay PQRS registradas", ephemeral=True)
         return
     
-    embed = discord.Embed(
-        title="📋 Últimas 20 PQRS",
-        color=discord.Color.blue(),
-        timestamp=datetime.now()
-    )
-    
-    for pqrs in pqrs_list:
-        estado_emoji = "✅" if pqrs[3] == "RESPONDIDA" else "⏳"
-        embed.add_field(
-            name=f"{estado_emoji} {pqrs[0]}",
-            value=f"**{pqrs[1]}** - {pqrs[2][:50]}...",
-            inline=False
-        )
-    
-    await interaction.followup.send(embed=embed, ephemeral=True)
+    await interaction.followup.send(embed=embed, view=vista, ephemeral=True)
 
 @bot.tree.command(name="ayuda", description="Ver comandos disponibles")
 async def ayuda(interaction: discord.Interaction):
-    rol = interaction.guild.get_role(ROL_PROCURADURIA_ID)
-    es_procuraduria_user = rol in interaction.user.roles if rol else False
+    es_procuraduria_user = resolutor_permisos.tiene(interaction.user, permisos.PROCURADURIA)
     
     embed = discord.Embed(
         title="📚 Comandos del Bot - Procuraduría",
@@ -867,6 +1202,7 @@ async def ayuda(interaction: discord.Interaction):
             "`/buscar-caso` - Buscar caso por IUC\n"
             "`/radicar-pqrs` - Radicar PQRS\n"
             "`/consultar-radicado` - Ver estado de PQRS\n"
+            "`/buscar` - Buscar casos, documentos y PQRS por texto\n"
             "`/ayuda` - Ver esta ayuda"
         ),
         inline=False
@@ -886,6 +1222,13 @@ async def ayuda(interaction: discord.Interaction):
             inline=False
         )
     
+    if interaction.permissions.manage_guild:
+        embed.add_field(
+            name="🛠️ Administración del servidor",
+            value="`/configurar` - Canales, roles y carpeta de Drive del servidor",
+            inline=False
+        )
+    
     embed.set_footer(text="Procuraduría General de la Nación")
     
     await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -896,49 +1239,105 @@ async def sync_commands(interaction: discord.Interaction):
     """Forzar la sincronización de application commands (guild o global)."""
     await interaction.response.defer(ephemeral=True)
     try:
-        GUILD_ID = os.getenv('GUILD_ID')
-        if GUILD_ID:
-            guild_obj = discord.Object(id=int(GUILD_ID))
-            synced = await bot.tree.sync(guild=guild_obj)
-            await interaction.followup.send(f"✅ {len(synced)} comandos sincronizados (guild {GUILD_ID})", ephemeral=True)
-        else:
-            synced = await bot.tree.sync()
-            await interaction.followup.send(f"✅ {len(synced)} comandos sincronizados (global)", ephemeral=True)
+        guild = guild_sincronizacion()
+        synced = await sincronizacion.sincronizar(bot.tree, guild=guild, forzar=True)
+        destino = f"guild {guild.id}" if guild else "global"
+        await interaction.followup.send(f"✅ {len(synced)} comandos sincronizados ({destino})", ephemeral=True)
     except Exception as e:
         await interaction.followup.send(f"❌ Error sincronizando comandos: {e}", ephemeral=True)
 
+@bot.tree.command(name="configurar", description="[ADMIN] Configurar canales, roles y carpeta de Drive de este servidor")
+@app_commands.describe(
+    canal_pqrs="Canal donde se anuncian las PQRS nuevas",
+    canal_registros="Canal de registros de casos y documentos",
+    rol_procuraduria="Rol con acceso a los comandos de Procuraduría",
+    rol_responder="Rol autorizado a responder PQRS",
+    carpeta_drive="ID de la carpeta de Google Drive para los archivos subidos"
+)
+@app_commands.guild_only()
+@app_commands.default_permissions(manage_guild=True)
+async def configurar(
+    interaction: discord.Interaction,
+    canal_pqrs: discord.TextChannel = None,
+    canal_registros: discord.TextChannel = None,
+    rol_procuraduria: discord.Role = None,
+    rol_responder: discord.Role = None,
+    carpeta_drive: str = None
+):
+    """Sin opciones muestra la configuración actual; con opciones cambia solo esas."""
+    await interaction.response.defer(ephemeral=True)
+    # default_permissions solo oculta el comando: el servidor puede habilitarlo a otros roles
+    if not interaction.permissions.manage_guild:
+        await interaction.followup.send("❌ Necesitas el permiso Gestionar servidor.", ephemeral=True)
+        return
+
+    config = configuraciones.obtener(interaction.guild_id)
+    cambios = {
+        'canal_pqrs_id': canal_pqrs.id if canal_pqrs else None,
+        'canal_registros_id': canal_registros.id if canal_registros else None,
+        'rol_procuraduria_id': rol_procuraduria.id if rol_procuraduria else None,
+        'rol_responder_id': rol_responder.id if rol_responder else None,
+        'drive_folder_id': carpeta_drive.strip() if carpeta_drive else None,
+    }
+    titulo = "⚙️ Configuración del servidor"
+    if any(valor is not None for valor in cambios.values()):
+        nueva = (config or configuracion.ConfiguracionGuild(None)).combinar(interaction.guild_id, **cambios)
+        try:
+            await db.transaccion(configuracion.guardar, nueva)
+        except Exception as e:
+            await interaction.followup.send(f"❌ Error guardando la configuración: {e}", ephemeral=True)
+            return
+        configuraciones.actualizar(nueva)
+        # los permisos cacheados se calcularon con los roles anteriores
+        resolutor_permisos.invalidar(interaction.guild_id)
+        config = nueva
+        titulo = "⚙️ Configuración actualizada"
+
+    formatos = {
+        'canal_pqrs_id': "<#{}>",
+        'canal_registros_id': "<#{}>",
+        'rol_procuraduria_id': "<@&{}>",
+        'rol_responder_id': "<@&{}>",
+        'drive_folder_id': "`{}`",
+    }
+    embed = discord.Embed(title=titulo, color=discord.Color.blue(), timestamp=datetime.now())
+    for campo, formato in formatos.items():
+        dato = getattr(config, campo, None)
+        embed.add_field(name=configuracion.ETIQUETAS[campo],
+                        value=formato.format(dato) if dato else "Sin configurar", inline=False)
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
 @bot.tree.command(name="terminar-proceso", description="[PROCURADURÍA] Archivar un caso por IUC")
 @app_commands.describe(radicado="Radicado IUC a archivar (ej: IUC-E-2025-0001)")
 @es_procuraduria()
 async def terminar_proceso(interaction: discord.Interaction, radicado: str):
     await interaction.response.defer(ephemeral=True)
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
-    c.execute("SELECT id, estado FROM casos WHERE iuc = ?", (radicado.upper(),))
-    row = c.fetchone()
-    if not row:
-        conn.close()
+    config = await configuracion_requerida(interaction, 'canal_registros_id')
+    if not config:
+        return
+    caso = await db.run(repositorio.casos.obtener, radicado.upper(), configuraciones.ambito(interaction.guild_id))
+    if not caso:
         await interaction.followup.send("❌ No se encontró el caso.", ephemeral=True)
         return
     try:
         fecha_cierre = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        c.execute("UPDATE casos SET estado = 'ARCHIVADO', fecha_cierre = ? WHERE id = ?", (fecha_cierre, row[0]))
-        conn.commit()
-        await interaction.followup.send(f"✅ Caso {radicado.upper()} archivado.", ephemeral=True)
         # Log en canal de registros
-        try:
-            channel = bot.get_channel(REGISTROS_CHANNEL_ID) or await bot.fetch_channel(REGISTROS_CHANNEL_ID)
-            embed = discord.Embed(title="Proceso archivado", color=discord.Color.dark_blue(), timestamp=datetime.now())
-            embed.add_field(name="IUC", value=radicado.upper(), inline=True)
-            embed.add_field(name="Archivado por", value=interaction.user.name, inline=True)
-            embed.add_field(name="Fecha", value=fecha_cierre, inline=False)
-            await channel.send(embed=embed)
-        except Exception:
-            pass
+        embed = discord.Embed(title="Proceso archivado", color=discord.Color.dark_blue(), timestamp=datetime.now())
+        embed.add_field(name="IUC", value=radicado.upper(), inline=True)
+        embed.add_field(name="Archivado por", value=interaction.user.name, inline=True)
+        embed.add_field(name="Fecha", value=fecha_cierre, inline=False)
+        
+        def _archivar(conn):
+            repositorio.casos.actualizar(conn, caso.id, estado='ARCHIVADO', fecha_cierre=fecha_cierre)
+            outbox.encolar(conn, outbox.CANAL, config.canal_registros_id, embed=embed)
+        
+        await db.transaccion(_archivar)
+        despachador.despertar()
+        cache_casos.invalidar(radicado.upper())
+        api_publica.invalidar(radicado)
+        await interaction.followup.send(f"✅ Caso {radicado.upper()} archivado.", ephemeral=True)
     except Exception as e:
         await interaction.followup.send(f"❌ Error archivando el caso: {e}", ephemeral=True)
-    finally:
-        conn.close()
 
 @bot.tree.command(name="borrar-caso", description="[PROCURADURÍA] Eliminar un caso de la base de datos (solo procuraduría)")
 @app_commands.describe(iuc="Radicado IUC a eliminar (ej: IUC-E-2025-0001)")
@@ -946,53 +1345,54 @@ async def terminar_proceso(interaction: discord.Interaction, radicado: str):
 async def borrar_caso(interaction: discord.Interaction, iuc: str):
     await interaction.response.defer(ephemeral=True)
     
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
+    config = await configuracion_requerida(interaction, 'canal_registros_id')
+    if not config:
+        return
     
     # Verificar que el caso existe
-    c.execute("SELECT id FROM casos WHERE iuc = ?", (iuc.upper(),))
-    row = c.fetchone()
-    if not row:
-        conn.close()
+    caso = await db.run(repositorio.casos.obtener, iuc.upper(), configuraciones.ambito(interaction.guild_id))
+    if not caso:
         await interaction.followup.send(f"❌ No se encontró el caso {iuc.upper()}", ephemeral=True)
         return
     
     try:
-        caso_id = row[0]
-        iuc_upper = iuc.upper()
-        
-        # Eliminar documentos adjuntos a este caso
-        c.execute("DELETE FROM documentos WHERE attached_iuc = ?", (iuc_upper,))
-        docs_deleted = c.rowcount
+        iuc_upper = caso.iuc
         
-        # Eliminar el caso
-        c.execute("DELETE FROM casos WHERE id = ?", (caso_id,))
+        def _borrar(conn):
+            # Eliminar documentos adjuntos a este caso
+            eliminados = repositorio.documentos.eliminar_de_caso(conn, iuc_upper)
+            ius_borrados = [d.ius for d in eliminados if d.ius]
+            docs_deleted = len(eliminados)
+            # Eliminar el caso
+            repositorio.casos.eliminar(conn, caso.id)
+            
+            # Log en canal de registros
+            embed = discord.Embed(title="⚠️ Caso eliminado", color=discord.Color.red(), timestamp=datetime.now())
+            embed.add_field(name="IUC", value=iuc_upper, inline=True)
+            embed.add_field(name="Documentos eliminados", value=str(docs_deleted), inline=True)
+            embed.add_field(name="Eliminado por", value=interaction.user.name, inline=True)
+            embed.add_field(name="Razón", value="Eliminación de base de datos (error procurador/numérico)", inline=False)
+            outbox.encolar(conn, outbox.CANAL, config.canal_registros_id, embed=embed)
+            return docs_deleted, ius_borrados
         
-        conn.commit()
+        docs_deleted, ius_borrados = await db.transaccion(_borrar)
+        despachador.despertar()
+        indices_guild = indices.de(caso.guild_id)
+        indices_guild.casos.quitar(iuc_upper)
+        for ius_borrado in ius_borrados:
+            indices_guild.documentos.quitar(ius_borrado)
+        cache_casos.invalidar(iuc_upper)
+        api_publica.invalidar(iuc_upper)
+        editor_adjuntos.olvidar(iuc_upper)
         
         await interaction.followup.send(
             f"✅ Caso {iuc_upper} eliminado correctamente.\n"
             f"📄 Documentos eliminados: {docs_deleted}",
             ephemeral=True
         )
-        
-        # Log en canal de registros
-        try:
-            channel = bot.get_channel(REGISTROS_CHANNEL_ID) or await bot.fetch_channel(REGISTROS_CHANNEL_ID)
-            embed = discord.Embed(title="⚠️ Caso eliminado", color=discord.Color.red(), timestamp=datetime.now())
-            embed.add_field(name="IUC", value=iuc_upper, inline=True)
-            embed.add_field(name="Documentos eliminados", value=str(docs_deleted), inline=True)
-            embed.add_field(name="Eliminado por", value=interaction.user.name, inline=True)
-            embed.add_field(name="Razón", value="Eliminación de base de datos (error procurador/numérico)", inline=False)
-            await channel.send(embed=embed)
-        except Exception:
-            pass
             
     except Exception as e:
-        conn.rollback()
         await interaction.followup.send(f"❌ Error eliminando el caso: {e}", ephemeral=True)
-    finally:
-        conn.close()
 
 @bot.tree.command(name="editar-iuc", description="[PROCURADURÍA] Editar la parte numérica final de un IUC (solo procuraduría)")
 @app_commands.describe(
@@ -1014,26 +1414,179 @@ async def editar_iuc(interaction: discord.Interaction, iuc_actual: str, nuevo_nu
     parts[-1] = nuevo_numero_str
     nuevo_iuc = '-'.join(parts).upper()
 
-    conn = sqlite3.connect('procuraduria.db')
-    c = conn.cursor()
     # verificar que el caso existe
-    c.execute("SELECT id FROM casos WHERE iuc = ?", (iuc_actual.upper(),))
-    row = c.fetchone()
-    if not row:
+    caso = await db.run(repositorio.casos.obtener, iuc_actual.upper(), configuraciones.ambito(interaction.guild_id))
+    if not caso:
         await interaction.followup.send("No se encontró un caso con ese IUC.", ephemeral=True)
-        conn.close()
         return
 
     # actualizar casos e documentos adjuntos
     try:
-        c.execute("UPDATE casos SET iuc = ? WHERE id = ?", (nuevo_iuc, row[0]))
-        c.execute("UPDATE documentos SET attached_iuc = ? WHERE attached_iuc = ?", (nuevo_iuc, iuc_actual.upper()))
-        conn.commit()
+        def _renombrar(conn):
+            repositorio.casos.actualizar(conn, caso.id, iuc=nuevo_iuc)
+            repositorio.documentos.renombrar_caso(conn, caso.iuc, nuevo_iuc)
+            # IUC-(E|D)-AÑO-XXXX: el contador no debe volver a entregar el nuevo número
+            if len(parts) == 4 and parts[2].isdigit():
+                secuencias.asegurar_minimo(conn, 'IUC', int(parts[2]), parts[1].upper(), nuevo_numero)
+        
+        await db.transaccion(_renombrar)
+        cache_casos.invalidar(iuc_actual.upper(), nuevo_iuc)
+        api_publica.invalidar(iuc_actual, nuevo_iuc)
+        indices.de(caso.guild_id).casos.renombrar(iuc_actual.upper(), nuevo_iuc)
+        editor_adjuntos.renombrar(iuc_actual.upper(), nuevo_iuc)
         await interaction.followup.send(f"✅ IUC actualizado a {nuevo_iuc}. Documentos adjuntos actualizados.", ephemeral=True)
     except Exception as e:
         await interaction.followup.send(f"❌ Error actualizando IUC: {e}", ephemeral=True)
-    finally:
-        conn.close()
+
+@bot.tree.command(name="importar", description="[PROCURADURÍA] Importar casos y documentos desde un CSV/JSONL")
+@app_commands.describe(
+    archivo="Archivo CSV o JSONL con la columna clase (caso/documento)",
+    simular="Solo validar y mostrar la numeración, sin guardar"
+)
+@es_procuraduria()
+async def importar_registros(interaction: discord.Interaction, archivo: discord.Attachment, simular: bool = False):
+    await interaction.response.defer(ephemeral=True)
+
+    if archivo.size > MAX_IMPORTACION_BYTES:
+        await interaction.followup.send(
+            f"❌ El archivo supera el máximo de {MAX_IMPORTACION_BYTES // (1024 * 1024)} MB.",
+            ephemeral=True
+        )
+        return
+    try:
+        contenido = (await archivo.read()).decode('utf-8')
+        filas = importar.leer_filas(contenido, archivo.filename)
+    except UnicodeDecodeError:
+        await interaction.followup.send("❌ El archivo debe estar en UTF-8.", ephemeral=True)
+        return
+    except importar.ErrorImportacion as e:
+        linea, mensaje = e.errores[0]
+        await interaction.followup.send(f"❌ Línea {linea}: {mensaje}", ephemeral=True)
+        return
+
+    config = await configuracion_requerida(interaction, 'canal_registros_id')
+    if not config:
+        return
+    registrado_por = interaction.user.name
+    guild_id = configuraciones.ambito(interaction.guild_id)
+
+    class _Simulacion(Exception):
+        def __init__(self, resultado):
+            self.resultado = resultado
+
+    def _rango(valores):
+        valores = sorted(v for v in valores if v)
+        if not valores:
+            return "-"
+        return valores[0] if len(valores) == 1 else f"{valores[0]} … {valores[-1]}"
+
+    def _importar(conn):
+        resultado = importar.importar(conn, filas, registrado_por, guild_id)
+        if simular:
+            # deshace la transacción conservando el resultado para mostrarlo
+            raise _Simulacion(resultado)
+        iucs_nuevos = {iuc for iuc, _ in resultado['casos']}
+        existentes = {iuc for _, iuc in resultado['documentos'] if iuc and iuc not in iucs_nuevos}
+
+        # Un solo log en el canal de registros para toda la importación
+        embed = discord.Embed(title="Importación masiva", color=discord.Color.green(), timestamp=datetime.now())
+        embed.add_field(name="Archivo", value=archivo.filename, inline=False)
+        embed.add_field(name="Casos", value=str(len(resultado['casos'])), inline=True)
+        embed.add_field(name="Documentos", value=str(len(resultado['documentos'])), inline=True)
+        embed.add_field(name="IUC asignados", value=_rango(iucs_nuevos), inline=False)
+        embed.add_field(name="IUS asignados", value=_rango(ius for ius, _ in resultado['documentos']), inline=False)
+        if existentes:
+            embed.add_field(name="Casos existentes con nuevos adjuntos", value=str(len(existentes)), inline=True)
+        embed.add_field(name="Importado por", value=registrado_por, inline=True)
+        outbox.encolar(conn, outbox.CANAL, config.canal_registros_id, embed=embed)
+        return resultado
+
+    try:
+        resultado = await db.transaccion(_importar)
+    except _Simulacion as s:
+        resultado = s.resultado
+    except importar.ErrorImportacion as e:
+        detalle = "\n".join(f"Línea {linea}: {mensaje}" for linea, mensaje in e.errores[:15])
+        if len(e.errores) > 15:
+            detalle += f"\n… y {len(e.errores) - 15} más"
+        await interaction.followup.send(
+            f"❌ No se importó nada, {len(e.errores)} filas con errores:\n{detalle}",
+            ephemeral=True
+        )
+        return
+    except Exception as e:
+        await interaction.followup.send(f"❌ Error importando: {e}", ephemeral=True)
+        return
+
+    casos = resultado['casos']
+    documentos = resultado['documentos']
+    iucs_nuevos = {iuc for iuc, _ in casos}
+
+    if simular:
+        await interaction.followup.send(
+            f"🧪 **Simulación correcta** (no se guardó nada)\n\n"
+            f"**Casos:** {len(casos)} ({_rango(iucs_nuevos)})\n"
+            f"**Documentos:** {len(documentos)}",
+            ephemeral=True
+        )
+        return
+
+    despachador.despertar()
+    validador.despertar()
+    indices_guild = indices.de(guild_id)
+    for iuc, visibilidad in casos:
+        indices_guild.casos.agregar(iuc, oculto=(visibilidad == 'RESERVADO'))
+    for ius, iuc in documentos:
+        indices_guild.documentos.agregar(ius)
+        # los casos ya registrados cambian de adjuntos; los nuevos no tienen mensaje propio
+        if iuc and iuc not in iucs_nuevos:
+            cache_casos.invalidar(iuc)
+            api_publica.invalidar(iuc)
+            editor_adjuntos.programar(iuc)
+
+    await interaction.followup.send(
+        f"✅ **Importación completada**\n\n"
+        f"**Casos:** {len(casos)}\n"
+        f"**Documentos:** {len(documentos)}",
+        ephemeral=True
+    )
+
+# ==================== AUTOCOMPLETADO ====================
+# Las sugerencias salen de los índices en memoria del servidor, sin consultar SQLite.
+# Discord no ejecuta los checks del comando antes del autocompletado, así que
+# cada callback verifica el permiso y no sugiere nada a quien no lo tiene.
+@buscar_caso.autocomplete('iuc')
+async def buscar_caso_iuc_autocomplete(interaction: discord.Interaction, current: str):
+    # los casos reservados solo se sugieren a Procuraduría
+    es_procuraduria_user = resolutor_permisos.tiene(interaction.user, permisos.PROCURADURIA)
+    return indices.de(configuraciones.ambito(interaction.guild_id)).casos.opciones(
+        current, incluir_ocultos=es_procuraduria_user)
+
+@registrar_documento.autocomplete('adjuntar_iuc')
+@terminar_proceso.autocomplete('radicado')
+@borrar_caso.autocomplete('iuc')
+@editar_iuc.autocomplete('iuc_actual')
+async def iuc_autocomplete(interaction: discord.Interaction, current: str):
+    if not resolutor_permisos.tiene(interaction.user, permisos.PROCURADURIA):
+        return []
+    return indices.de(configuraciones.ambito(interaction.guild_id)).casos.opciones(current, incluir_ocultos=True)
+
+@buscar_documento.autocomplete('ius')
+async def ius_autocomplete(interaction: discord.Interaction, current: str):
+    if not resolutor_permisos.tiene(interaction.user, permisos.PROCURADURIA):
+        return []
+    return indices.de(configuraciones.ambito(interaction.guild_id)).documentos.opciones(current)
+
+@responder_pqrs.autocomplete('radicado')
+async def radicado_autocomplete(interaction: discord.Interaction, current: str):
+    if not resolutor_permisos.tiene(interaction.user, permisos.RESPONDER):
+        return []
+    return indices.de(configuraciones.ambito(interaction.guild_id)).radicados.opciones(current)
+
+# ==================== MÉTRICAS ====================
+# Debe quedar después de definir todos los comandos
+metricas.instrumentar_comandos(bot.tree, metrica_comandos)
+vigilante.seguir_comandos(bot.tree)
 
 # ==================== EJECUTAR BOT ====================
 if __name__ == "__main__":
@@ -1043,4 +1596,8 @@ if __name__ == "__main__":
         print("Crea un archivo .env con: DISCORD_TOKEN=tu_token_aqui")
         exit(1)
     else:
-        bot.run(TOKEN)
+        # migraciones, índices, servidor web y sincronización: ver BotProcuraduria.setup_hook
+        try:
+            bot.run(TOKEN)
+        finally:
+            db.cerrar()
@@ -0,0 +1,70 @@
+"""
+Búsqueda de texto completo sobre casos, documentos y PQRS (tablas FTS5
+mantenidas por triggers, ver migraciones._004_busqueda_fts).
+"""
+
+import re
+
+POR_PAGINA = 10
+
+# Cada subconsulta trae como máximo `?` resultados ya ordenados por rank, de
+# modo que el UNION solo ordena unos pocos candidatos por página.
+_SQL_BUSCAR = """
+SELECT * FROM (
+    SELECT 'caso', c.iuc, c.implicado,
+           snippet(casos_fts, -1, '**', '**', '…', 12), casos_fts.rank AS r
+    FROM casos_fts JOIN casos c ON c.id = casos_fts.rowid
+    WHERE casos_fts MATCH :q AND c.guild_id IS :guild
+      AND (:todo OR COALESCE(c.visibilidad, 'PUBLICO') != 'RESERVADO')
+    ORDER BY r LIMIT :n
+)
+UNION ALL
+SELECT * FROM (
+    SELECT 'documento', COALESCE(d.ius, d.tipo), d.titulo,
+           snippet(documentos_fts, -1, '**', '**', '…', 12), documentos_fts.rank AS r
+    FROM documentos_fts JOIN documentos d ON d.id = documentos_fts.rowid
+    LEFT JOIN casos c ON c.iuc = d.attached_iuc
+    WHERE documentos_fts MATCH :q AND d.guild_id IS :guild
+      AND (:todo OR COALESCE(c.visibilidad, 'PUBLICO') != 'RESERVADO')
+    ORDER BY r LIMIT :n
+)
+UNION ALL
+SELECT * FROM (
+    SELECT 'pqrs', p.radicado, p.asunto,
+           snippet(pqrs_fts, -1, '**', '**', '…', 12), pqrs_fts.rank AS r
+    FROM pqrs_fts JOIN pqrs p ON p.id = pqrs_fts.rowid
+    WHERE pqrs_fts MATCH :q AND p.guild_id IS :guild
+      AND (:todo OR p.usuario_id = :usuario)
+    ORDER BY r LIMIT :n
+)
+ORDER BY 5 LIMIT :limite OFFSET :offset
+"""
+
+
+def consulta_fts(texto: str) -> str:
+    """Convierte texto libre en una consulta FTS5 segura: cada palabra se
+    busca como prefijo y todas deben aparecer."""
+    palabras = re.findall(r"\w+", texto or "")
+    return " ".join(f'"{p}"*' for p in palabras)
+
+
+def buscar(conn, texto: str, todo: bool, usuario_id: str, guild_id: str, pagina: int = 1,
+           por_pagina: int = POR_PAGINA):
+    """Retorna (resultados, hay_mas). Cada resultado es
+    (clase, identificador, titulo, fragmento, rank).
+    `todo` (Procuraduría) incluye casos reservados y todas las PQRS; si no,
+    solo las PQRS del propio usuario. Solo busca en el servidor `guild_id`."""
+    q = consulta_fts(texto)
+    if not q:
+        return [], False
+    offset = (max(1, pagina) - 1) * por_pagina
+    filas = conn.execute(_SQL_BUSCAR, {
+        'q': q,
+        'todo': 1 if todo else 0,
+        'usuario': str(usuario_id),
+        'guild': guild_id,
+        'n': offset + por_pagina + 1,
+        'limite': por_pagina + 1,
+        'offset': offset,
+    }).fetchall()
+    return filas[:por_pagina], len(filas) > por_pagina
@@ -0,0 +1,70 @@
+"""
+Caché LRU en memoria con TTL para lecturas frecuentes (casos y radicados).
+Se usa solo desde el event loop, por lo que no necesita locks.
+"""
+
+import time
+from collections import OrderedDict
+
+_FALTA = object()
+
+
+class CacheLRU:
+    def __init__(self, nombre: str, max_items: int = 1024, ttl: float = 300.0):
+        self.nombre = nombre
+        self.max_items = max_items
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        # cambia en cada invalidación; evita guardar una carga iniciada antes
+        self._generacion = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._datos)
+
+    def get(self, clave, default=None):
+        item = self._datos.get(clave, _FALTA)
+        if item is _FALTA or item[0] < time.monotonic():
+            if item is not _FALTA:
+                del self._datos[clave]
+            self.misses += 1
+            return default
+        self._datos.move_to_end(clave)
+        self.hits += 1
+        return item[1]
+
+    def set(self, clave, valor):
+        self._datos[clave] = (time.monotonic() + self.ttl, valor)
+        self._datos.move_to_end(clave)
+        while len(self._datos) > self.max_items:
+            self._datos.popitem(last=False)
+
+    def invalidar(self, *claves):
+        self._generacion += 1
+        for clave in claves:
+            self._datos.pop(clave, None)
+
+    def limpiar(self):
+        self._generacion += 1
+        self._datos.clear()
+
+    async def obtener(self, clave, cargar):
+        """Lectura a través de la caché: si falta, espera `cargar()` y guarda
+        el resultado (los resultados None no se cachean)."""
+        valor = self.get(clave, _FALTA)
+        if valor is _FALTA:
+            generacion = self._generacion
+            valor = await cargar()
+            if valor is not None and generacion == self._generacion:
+                self.set(clave, valor)
+        return valor
+
+    def estadisticas(self) -> dict:
+        return {
+            'nombre': self.nombre,
+            'items': len(self._datos),
+            'max_items': self.max_items,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
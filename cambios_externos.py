@@ -0,0 +1,79 @@
+"""
+Aviso de cambios hechos fuera del bot. El bot guarda en memoria los índices
+de autocompletado y los caches de casos, PQRS y de la API pública; admin.py
+escribe directo en SQLite, así que cada transacción suya sube la generación
+de la tabla cambios_externos antes del COMMIT. El bot lee esa fila cada
+pocos segundos (una lectura por llave primaria) y, si cambió, recarga los
+índices y vacía los caches.
+
+Se usa una fila propia y no PRAGMA data_version porque esta cambia con los
+commits de cualquier otra conexión, también con los del pool del propio bot.
+"""
+
+import asyncio
+import os
+
+INTERVALO = float(os.getenv('CAMBIOS_EXTERNOS_INTERVALO', 5))
+
+
+def crear_tabla(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS cambios_externos (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        generacion INTEGER NOT NULL
+    )''')
+    conn.execute("INSERT OR IGNORE INTO cambios_externos (id, generacion) VALUES (1, 0)")
+
+
+def avisar(conn):
+    """Marca que hubo cambios; llamar dentro de la transacción que los hace."""
+    conn.execute("UPDATE cambios_externos SET generacion = generacion + 1 WHERE id = 1")
+
+
+def generacion(conn) -> int:
+    row = conn.execute("SELECT generacion FROM cambios_externos WHERE id = 1").fetchone()
+    return row[0] if row else 0
+
+
+class VigiaCambiosExternos:
+    """Tarea de fondo que llama a `al_cambiar()` (corrutina) cuando otro
+    proceso avisó cambios. La primera lectura solo toma la generación actual."""
+
+    def __init__(self, db, al_cambiar, intervalo: float = INTERVALO):
+        self.db = db
+        self.intervalo = intervalo
+        self.recargas = 0
+        self._al_cambiar = al_cambiar
+        self._generacion = None
+        self._tarea = None
+
+    def iniciar(self):
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.create_task(self._bucle())
+
+    async def detener(self):
+        if self._tarea:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    async def revisar(self) -> bool:
+        """Lee la generación y recarga si cambió desde la lectura anterior."""
+        actual = await self.db.run(generacion, operacion='cambios_externos')
+        anterior, self._generacion = self._generacion, actual
+        if anterior is None or actual == anterior:
+            return False
+        await self._al_cambiar()
+        self.recargas += 1
+        return True
+
+    async def _bucle(self):
+        while True:
+            try:
+                if await self.revisar():
+                    print("🔄 Cambios hechos fuera del bot: índices de autocompletado y caches recargados")
+            except Exception as e:
+                print(f"Error revisando cambios externos: {e}")
+            await asyncio.sleep(self.intervalo)
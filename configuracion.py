@@ -0,0 +1,123 @@
+"""
+Configuración por servidor (guild): canal de PQRS, canal de registros, roles
+de Procuraduría y de respuesta, y carpeta de Drive. Se guarda en la tabla
+configuracion_guild y se mantiene en memoria (un dict por guild_id) para que
+los comandos la lean sin consultar SQLite; /configurar actualiza ambas.
+
+Los datos (casos, documentos, PQRS) llevan el guild_id del servidor donde se
+crearon. El servidor principal (GUILD_ID en .env, o el único servidor del bot
+en una instalación existente) usa como respaldo las constantes de bot.py,
+así una instalación de un solo servidor sigue funcionando sin configurar nada.
+"""
+
+import os
+
+import permisos
+
+CAMPOS = ('canal_pqrs_id', 'canal_registros_id', 'rol_procuraduria_id', 'rol_responder_id', 'drive_folder_id')
+# los IDs de Discord se guardan como TEXT (igual que usuario_id) y se usan como int
+_CAMPOS_DISCORD = CAMPOS[:4]
+TABLAS_CON_GUILD = ('casos', 'documentos', 'pqrs')
+ETIQUETAS = {
+    'canal_pqrs_id': "Canal de PQRS",
+    'canal_registros_id': "Canal de registros",
+    'rol_procuraduria_id': "Rol de Procuraduría",
+    'rol_responder_id': "Rol para responder PQRS",
+    'drive_folder_id': "Carpeta de Drive",
+}
+
+
+def entero_de_entorno(nombre: str, defecto=None):
+    """Variable de entorno entera; `defecto` si no está definida o no es un número."""
+    valor = os.getenv(nombre)
+    try:
+        return int(valor) if valor else defecto
+    except ValueError:
+        return defecto
+
+
+class ConfiguracionGuild:
+    __slots__ = ('guild_id',) + CAMPOS
+
+    def __init__(self, guild_id, canal_pqrs_id=None, canal_registros_id=None,
+                 rol_procuraduria_id=None, rol_responder_id=None, drive_folder_id=None):
+        self.guild_id = int(guild_id) if guild_id else None
+        self.canal_pqrs_id = int(canal_pqrs_id) if canal_pqrs_id else None
+        self.canal_registros_id = int(canal_registros_id) if canal_registros_id else None
+        self.rol_procuraduria_id = int(rol_procuraduria_id) if rol_procuraduria_id else None
+        self.rol_responder_id = int(rol_responder_id) if rol_responder_id else None
+        self.drive_folder_id = drive_folder_id or None
+
+    def combinar(self, guild_id, **cambios) -> 'ConfiguracionGuild':
+        """Copia para `guild_id` con los campos de `cambios` que no sean None."""
+        valores = {campo: getattr(self, campo) for campo in CAMPOS}
+        valores.update({campo: valor for campo, valor in cambios.items() if valor is not None})
+        return ConfiguracionGuild(guild_id, **valores)
+
+    def roles(self) -> dict:
+        """permiso -> ID de rol, para permisos.ResolutorPermisos."""
+        return {permisos.PROCURADURIA: self.rol_procuraduria_id, permisos.RESPONDER: self.rol_responder_id}
+
+
+class Configuraciones:
+    """Configuración de todos los servidores en memoria."""
+
+    def __init__(self, respaldo: ConfiguracionGuild = None, guild_principal: int = None):
+        self._por_guild = {}
+        self.respaldo = respaldo
+        self.guild_principal = guild_principal
+
+    def __len__(self):
+        return len(self._por_guild)
+
+    def cargar(self, conn) -> int:
+        filas = conn.execute(f"SELECT guild_id, {', '.join(CAMPOS)} FROM configuracion_guild").fetchall()
+        self._por_guild = {int(f[0]): ConfiguracionGuild(*f) for f in filas}
+        return len(self._por_guild)
+
+    def actualizar(self, config: ConfiguracionGuild):
+        """Reemplaza la configuración en memoria (después de guardar())."""
+        self._por_guild[config.guild_id] = config
+
+    def ambito(self, guild_id):
+        """guild_id con el que se guardan y filtran las filas de un comando;
+        los mensajes directos cuentan como el servidor principal."""
+        guild_id = guild_id or self.guild_principal
+        return str(guild_id) if guild_id else None
+
+    def obtener(self, guild_id) -> ConfiguracionGuild:
+        """Configuración del servidor (None si no tiene); el principal usa el respaldo."""
+        guild_id = guild_id or self.guild_principal
+        config = self._por_guild.get(guild_id)
+        if config is None and guild_id == self.guild_principal:
+            config = self.respaldo
+        return config
+
+    def roles(self, guild_id) -> dict:
+        config = self.obtener(guild_id)
+        return config.roles() if config else {}
+
+
+def guardar(conn, config: ConfiguracionGuild):
+    """Inserta o reemplaza la fila del servidor. Debe llamarse dentro de una transacción."""
+    valores = [str(getattr(config, c)) if getattr(config, c) else None for c in _CAMPOS_DISCORD]
+    conn.execute(
+        f"""INSERT INTO configuracion_guild (guild_id, {', '.join(CAMPOS)}, actualizado_en)
+            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(guild_id) DO UPDATE SET
+            {', '.join(f'{c} = excluded.{c}' for c in CAMPOS)}, actualizado_en = CURRENT_TIMESTAMP""",
+        [str(config.guild_id)] + valores + [config.drive_folder_id])
+
+
+def filas_sin_guild(conn) -> int:
+    """Casos, documentos y PQRS creados antes de tener guild_id."""
+    return sum(conn.execute(f"SELECT COUNT(*) FROM {tabla} WHERE guild_id IS NULL").fetchone()[0]
+               for tabla in TABLAS_CON_GUILD)
+
+
+def asignar_guild(conn, guild_id) -> dict:
+    """Asigna `guild_id` a las filas que no tienen servidor. Retorna tabla -> filas.
+    Debe llamarse dentro de una transacción."""
+    return {tabla: conn.execute(f"UPDATE {tabla} SET guild_id = ? WHERE guild_id IS NULL",
+                                (str(guild_id),)).rowcount
+            for tabla in TABLAS_CON_GUILD}
@@ -0,0 +1,279 @@
+"""
+Subidas a Google Drive en segundo plano y consulta de metadatos por lotes.
+Las subidas se encolan y las atiende un pool acotado de workers que ejecutan
+la API (bloqueante, httplib2) en hilos propios: subida reanudable por partes,
+reintentos con backoff exponencial ante 429/5xx y un Future que el comando
+puede esperar sin bloquear el event loop.
+
+Las librerías de Google se importan recién en el primer uso (ClienteDrive):
+importarlas y construir el servicio cuesta tiempo en cada arranque y Drive
+se usa poco.
+"""
+
+import asyncio
+import inspect
+import json
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+CHUNK_SIZE = 5 * 1024 * 1024  # múltiplo de 256 KB, como exige la API
+REINTENTOS = 5
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+LOTE_METADATOS = 100  # llamadas por petición batch (máximo que acepta Drive)
+CAMPOS_METADATOS = 'id, name, mimeType, size, modifiedTime, trashed'
+# 403 que son límites de uso y no falta de permisos
+RAZONES_LIMITE = {'rateLimitExceeded', 'userRateLimitExceeded', 'dailyLimitExceeded'}
+
+
+class ClienteDrive:
+    """Credenciales y servicios de Drive construidos en el primer uso.
+    Las credenciales se cargan una vez (GOOGLE_CREDENTIALS o el archivo) y se
+    comparten; el servicio se construye uno por hilo, porque httplib2 no es
+    seguro entre hilos, a partir del documento de discovery que trae
+    google-api-python-client, sin pedirlo por red."""
+
+    def __init__(self, scopes, archivo_credenciales, variable_entorno: str = 'GOOGLE_CREDENTIALS'):
+        self.scopes = scopes
+        self.archivo_credenciales = archivo_credenciales
+        self.variable_entorno = variable_entorno
+        self._credenciales = None
+        self._cargadas = False
+        self._documento = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _cargar_credenciales(self):
+        from google.oauth2 import service_account
+        creds_json = os.getenv(self.variable_entorno)
+        try:
+            if creds_json:
+                credenciales = service_account.Credentials.from_service_account_info(
+                    json.loads(creds_json), scopes=self.scopes)
+                print(f"✅ Google Drive: credenciales desde {self.variable_entorno}")
+            else:
+                credenciales = service_account.Credentials.from_service_account_file(
+                    self.archivo_credenciales, scopes=self.scopes)
+                print("✅ Google Drive: credenciales desde archivo local")
+            return credenciales
+        except json.JSONDecodeError as je:
+            print(f"❌ Error parsando JSON de {self.variable_entorno}: {je}")
+        except FileNotFoundError:
+            print(f"⚠️ Archivo {self.archivo_credenciales} no encontrado y {self.variable_entorno} no definida. "
+                  "Google Drive no disponible.")
+        except Exception as e:
+            print(f"⚠️ No se pudo autenticar con Google Drive: {e}")
+        return None
+
+    def credenciales(self):
+        """Credenciales compartidas, o None si no hay configuración válida."""
+        if not self._cargadas:
+            with self._lock:
+                if not self._cargadas:
+                    self._credenciales = self._cargar_credenciales()
+                    self._cargadas = True
+        return self._credenciales
+
+    @property
+    def disponible(self) -> bool:
+        return self.credenciales() is not None
+
+    def _documento_discovery(self) -> str:
+        if self._documento is None:
+            from googleapiclient.discovery_cache import get_static_doc
+            with self._lock:
+                if self._documento is None:
+                    self._documento = get_static_doc('drive', 'v3')
+        return self._documento
+
+    def servicio(self):
+        """Servicio de Drive del hilo actual (se construye la primera vez)."""
+        servicio = getattr(self._local, 'servicio', None)
+        if servicio is None:
+            credenciales = self.credenciales()
+            if credenciales is None:
+                raise RuntimeError("Google Drive no está configurado")
+            from googleapiclient.discovery import build_from_document
+            servicio = self._local.servicio = build_from_document(
+                self._documento_discovery(), credentials=credenciales)
+        return servicio
+
+
+def _es_reintentable(error: Exception) -> bool:
+    import httplib2
+    from googleapiclient.errors import HttpError
+    if isinstance(error, HttpError):
+        return error.resp.status in ESTADOS_REINTENTABLES
+    # solo errores de red de httplib2/socket: el resto de OSError
+    # (FileNotFoundError, PermissionError de las credenciales o del archivo)
+    # no se arregla esperando
+    return isinstance(error, (ConnectionError, TimeoutError, socket.timeout, httplib2.ServerNotFoundError))
+
+
+def con_reintentos(func, reintentos: int = REINTENTOS, espera_base: float = 1.0):
+    """Ejecuta func() reintentando con backoff exponencial y jitter."""
+    for intento in range(reintentos + 1):
+        try:
+            return func()
+        except Exception as e:
+            if intento == reintentos or not _es_reintentable(e):
+                raise
+            time.sleep(min(espera_base * 2 ** intento, 32) + random.uniform(0, 1))
+
+
+def _medido(func, observar, operacion):
+    """con_reintentos(func), reportando a observar(operacion, segundos, error)."""
+    if observar is None:
+        return con_reintentos(func)
+    inicio = time.perf_counter()
+    error = None
+    try:
+        return con_reintentos(func)
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        observar(operacion, time.perf_counter() - inicio, error)
+
+
+def subir_archivo(servicio, archivo_path, nombre_archivo, carpeta_id, progreso=None, chunksize=CHUNK_SIZE,
+                  observar=None):
+    """Sube un archivo por partes (bloqueante), lo hace público y retorna el webViewLink.
+    `progreso(fraccion)` se llama después de cada parte subida; `observar`
+    recibe la latencia de cada llamada a la API (incluidos sus reintentos)."""
+    from googleapiclient.http import MediaFileUpload
+    media = MediaFileUpload(archivo_path, chunksize=chunksize, resumable=True)
+    request = servicio.files().create(
+        body={'name': nombre_archivo, 'parents': [carpeta_id]},
+        media_body=media,
+        fields='id, webViewLink'
+    )
+    archivo = None
+    while archivo is None:
+        # next_chunk retoma desde la última parte confirmada si se reintenta
+        status, archivo = _medido(request.next_chunk, observar, 'subir_parte')
+        if status and progreso:
+            progreso(status.progress())
+
+    # Hacer el archivo público
+    _medido(servicio.permissions().create(
+        fileId=archivo['id'],
+        body={'type': 'anyone', 'role': 'reader'}
+    ).execute, observar, 'permiso_publico')
+    if progreso:
+        progreso(1.0)
+    return archivo.get('webViewLink')
+
+
+def metadatos_en_lote(servicio, file_ids, observar=None) -> dict:
+    """Metadatos de varios archivos en una sola petición HTTP (batch de la API),
+    bloqueante. Retorna file_id -> (metadatos, None) o (None, HttpError) por
+    archivo; los errores de la petición completa se reintentan y, si persisten,
+    se lanzan."""
+    if len(file_ids) > LOTE_METADATOS:
+        raise ValueError(f"Máximo {LOTE_METADATOS} archivos por lote")
+
+    def ejecutar():
+        # un batch nuevo en cada intento: execute() no se puede repetir
+        resultados = {}
+
+        def guardar(request_id, respuesta, error):
+            resultados[request_id] = (respuesta, error)
+        lote = servicio.new_batch_http_request(callback=guardar)
+        # files() arma el recurso desde el documento de discovery en cada llamada
+        archivos = servicio.files()
+        for file_id in file_ids:
+            lote.add(archivos.get(fileId=file_id, fields=CAMPOS_METADATOS, supportsAllDrives=True),
+                     request_id=file_id)
+        lote.execute()
+        return resultados
+    return _medido(ejecutar, observar, 'metadatos_lote')
+
+
+def es_limite_de_uso(error) -> bool:
+    """HttpError por cuota o rate limit (429, o 403 con razón de límite)."""
+    if error.resp.status == 429:
+        return True
+    razones = {d.get('reason') for d in (error.error_details or []) if isinstance(d, dict)}
+    return error.resp.status == 403 and bool(razones & RAZONES_LIMITE)
+
+
+class ColaSubidas:
+    """Cola de subidas atendida por `workers` tareas, cada una con su hilo.
+    `crear_servicio()` se llama una vez por hilo porque el cliente httplib2
+    no es seguro entre hilos."""
+
+    def __init__(self, crear_servicio, carpeta_id, workers: int = 2, max_pendientes: int = 50, observar=None):
+        self._crear_servicio = crear_servicio
+        self._observar = observar
+        self._carpeta_id = carpeta_id
+        self._workers = workers
+        self._max_pendientes = max_pendientes
+        self._cola = None
+        self._tareas = []
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='drive')
+        self._local = threading.local()
+
+    @property
+    def pendientes(self) -> int:
+        return self._cola.qsize() if self._cola else 0
+
+    def _iniciar(self):
+        self._cola = asyncio.Queue(maxsize=self._max_pendientes)
+        self._tareas = [asyncio.create_task(self._worker()) for _ in range(self._workers)]
+
+    async def subir(self, archivo_path, nombre_archivo, progreso=None, carpeta_id=None) -> asyncio.Future:
+        """Encola una subida y retorna un Future con el link (o la excepción).
+        `progreso` puede ser función o corrutina y se invoca en el event loop.
+        `carpeta_id` reemplaza la carpeta de la cola (carpeta de cada servidor)."""
+        if self._cola is None:
+            self._iniciar()
+        futuro = asyncio.get_running_loop().create_future()
+        await self._cola.put((archivo_path, nombre_archivo, progreso, carpeta_id or self._carpeta_id, futuro))
+        return futuro
+
+    def _subir_en_hilo(self, archivo_path, nombre_archivo, carpeta_id, progreso):
+        servicio = getattr(self._local, 'servicio', None)
+        if servicio is None:
+            servicio = self._local.servicio = self._crear_servicio()
+        return subir_archivo(servicio, archivo_path, nombre_archivo, carpeta_id, progreso,
+                             observar=self._observar)
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            archivo_path, nombre_archivo, progreso, carpeta_id, futuro = await self._cola.get()
+            notificar = None
+            if progreso:
+                def notificar(fraccion, progreso=progreso):
+                    loop.call_soon_threadsafe(self._notificar, progreso, fraccion)
+            try:
+                link = await loop.run_in_executor(
+                    self._executor, self._subir_en_hilo, archivo_path, nombre_archivo, carpeta_id, notificar)
+                if not futuro.done():
+                    futuro.set_result(link)
+            except Exception as e:
+                print(f"Error subiendo archivo: {e}")
+                if not futuro.done():
+                    futuro.set_exception(e)
+            finally:
+                self._cola.task_done()
+
+    @staticmethod
+    def _notificar(progreso, fraccion):
+        try:
+            resultado = progreso(fraccion)
+            if inspect.isawaitable(resultado):
+                asyncio.ensure_future(resultado)
+        except Exception as e:
+            print(f"Error notificando progreso de subida: {e}")
+
+    async def detener(self):
+        for tarea in self._tareas:
+            tarea.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        self._tareas = []
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,105 @@
+"""
+Exportación de tablas a CSV o JSON Lines (opcionalmente gzip) en memoria
+constante: las filas se leen del cursor por lotes y los encabezados salen de
+cursor.description, así siempre coinciden con el esquema actual.
+Con `incremental=True` solo se exportan las filas cambiadas desde la última
+exportación: cada escritura le da a la fila la siguiente versión de
+version_cambios (triggers de la migración 11) y marcas_exportacion guarda
+la última versión exportada de cada tabla. Como SQLite confirma una
+escritura a la vez, las versiones siguen el orden de los commits: una
+transacción larga no queda con una versión menor que la marca (lo que sí
+pasaba con una marca de reloj sobre actualizado_en).
+"""
+
+import csv
+import gzip
+import json
+import os
+from datetime import datetime, timezone
+
+TABLAS = ('documentos', 'casos', 'pqrs')
+FORMATOS = ('csv', 'jsonl')
+LOTE = 1000
+
+
+def _abrir(ruta, comprimir):
+    if comprimir:
+        return gzip.open(ruta, 'wt', encoding='utf-8', newline='')
+    return open(ruta, 'w', encoding='utf-8', newline='')
+
+
+def escribir(cursor, archivo, formato: str = 'csv', lote: int = LOTE) -> int:
+    """Vuelca el cursor en `archivo` por lotes y retorna la cantidad de filas."""
+    columnas = [d[0] for d in cursor.description]
+    total = 0
+    if formato == 'csv':
+        writer = csv.writer(archivo)
+        writer.writerow(columnas)
+    elif formato != 'jsonl':
+        raise ValueError(f"Formato no soportado: {formato}")
+    while True:
+        filas = cursor.fetchmany(lote)
+        if not filas:
+            break
+        if formato == 'csv':
+            writer.writerows(filas)
+        else:
+            for fila in filas:
+                archivo.write(json.dumps(dict(zip(columnas, fila)), ensure_ascii=False, default=str))
+                archivo.write('\n')
+        total += len(filas)
+    return total
+
+
+def marca(conn, tabla: str) -> int:
+    """Última versión exportada de la tabla (0 si nunca se exportó)."""
+    row = conn.execute("SELECT version FROM marcas_exportacion WHERE tabla = ?", (tabla,)).fetchone()
+    return row[0] if row else 0
+
+
+def version_actual(conn) -> int:
+    return conn.execute("SELECT version FROM version_cambios WHERE id = 1").fetchone()[0]
+
+
+def exportar(conn, tablas=TABLAS, directorio: str = '.', formato: str = 'csv',
+             comprimir: bool = False, incremental: bool = False, lote: int = LOTE) -> list:
+    """Exporta cada tabla a un archivo y retorna [(ruta, filas), ...].
+    `conn` debe estar en autocommit (basedatos.conectar): las lecturas se
+    hacen en una sola transacción para obtener una foto consistente."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato}")
+    extension = formato + ('.gz' if comprimir else '')
+    ahora = datetime.now(timezone.utc)
+    sufijo = "_" + ahora.strftime("%Y%m%d%H%M%S") if incremental else ""
+
+    resultado = []
+    conn.execute("BEGIN")
+    try:
+        # leída en la misma foto que las filas: todo lo confirmado tiene versión
+        # <= hasta, y lo que se confirme después tendrá una mayor
+        hasta = version_actual(conn)
+        for tabla in tablas:
+            ruta = os.path.join(directorio, f"{tabla}_export{sufijo}.{extension}")
+            if incremental:
+                cursor = conn.execute(
+                    f"SELECT * FROM {tabla} WHERE version > ? AND version <= ? ORDER BY version",
+                    (marca(conn, tabla), hasta))
+            else:
+                cursor = conn.execute(f"SELECT * FROM {tabla} ORDER BY id")
+            with _abrir(ruta, comprimir) as archivo:
+                resultado.append((ruta, escribir(cursor, archivo, formato, lote)))
+    finally:
+        conn.execute("COMMIT")
+
+    if incremental:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO marcas_exportacion (tabla, version) VALUES (?, ?) "
+                "ON CONFLICT(tabla) DO UPDATE SET version = excluded.version",
+                [(tabla, hasta) for tabla in tablas])
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    return resultado
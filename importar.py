@@ -0,0 +1,209 @@
+"""
+Importación masiva de casos y documentos desde CSV o JSON Lines.
+Cada fila lleva `clase` = caso | documento:
+
+  caso:      tipo (E/D), implicado, descripcion, visibilidad, anio, consecutivo,
+             estado, referencia (clave local para adjuntarle documentos del mismo archivo)
+  documento: tipo, titulo, descripcion, link, adjuntar_iuc o caso_ref, ius_tipo (F/A)
+
+Todo el archivo se valida antes de escribir; si hay errores no se importa
+nada. Los IUC/IUS se reservan por bloques (secuencias.reservar) y las filas
+se insertan con executemany dentro de la transacción del llamador.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+
+import secuencias
+import validador_drive
+
+TIPOS_CASO = {'E': 'ÉTICO', 'D': 'DISCIPLINARIO'}
+VISIBILIDADES = ('PUBLICO', 'RESERVADO')
+
+
+class ErrorImportacion(Exception):
+    """El archivo tiene filas inválidas; `errores` es [(linea, mensaje), ...]."""
+
+    def __init__(self, errores):
+        super().__init__(f"{len(errores)} filas con errores")
+        self.errores = errores
+
+
+def leer_filas(contenido: str, nombre: str = '') -> list:
+    """Retorna [(linea, dict)] desde CSV (con encabezado) o JSON Lines."""
+    contenido = contenido.lstrip('﻿')
+    if nombre.lower().endswith(('.jsonl', '.ndjson', '.json')) or contenido.lstrip().startswith('{'):
+        filas = []
+        for n, linea in enumerate(contenido.splitlines(), start=1):
+            if linea.strip():
+                try:
+                    filas.append((n, json.loads(linea)))
+                except json.JSONDecodeError as e:
+                    raise ErrorImportacion([(n, f"JSON inválido: {e}")])
+        return filas
+    lector = csv.DictReader(io.StringIO(contenido))
+    return [(n, fila) for n, fila in enumerate(lector, start=2)]
+
+
+def _texto(fila, campo):
+    valor = fila.get(campo)
+    if valor is None:
+        return None
+    valor = str(valor).strip()
+    return valor or None
+
+
+def _entero(fila, campo):
+    valor = _texto(fila, campo)
+    return int(valor) if valor is not None else None
+
+
+def _validar(conn, filas, guild_id):
+    """Separa y valida casos y documentos. Retorna (casos, documentos, errores)."""
+    anio_actual = datetime.now().year
+    casos, documentos, errores = [], [], []
+    referencias = {}
+    iucs_manuales = set()
+
+    for linea, fila in filas:
+        clase = (_texto(fila, 'clase') or '').lower()
+        try:
+            if clase == 'caso':
+                tipo = (_texto(fila, 'tipo') or '').upper()
+                if tipo not in TIPOS_CASO:
+                    raise ValueError("tipo de caso inválido (use E o D)")
+                visibilidad = (_texto(fila, 'visibilidad') or 'PUBLICO').upper()
+                if visibilidad not in VISIBILIDADES:
+                    raise ValueError("visibilidad inválida (PUBLICO o RESERVADO)")
+                anio = _entero(fila, 'anio') or anio_actual
+                consecutivo = _entero(fila, 'consecutivo')
+                if consecutivo is not None:
+                    if not 1 <= consecutivo <= 9999:
+                        raise ValueError("consecutivo fuera de rango (1-9999)")
+                    iuc = f"IUC-{tipo}-{anio}-{consecutivo:04d}"
+                    if iuc in iucs_manuales or conn.execute("SELECT 1 FROM casos WHERE iuc = ?", (iuc,)).fetchone():
+                        raise ValueError(f"el IUC {iuc} ya existe")
+                    iucs_manuales.add(iuc)
+                caso = {
+                    'linea': linea, 'tipo': tipo, 'anio': anio, 'consecutivo': consecutivo,
+                    'implicado': _texto(fila, 'implicado'),
+                    'descripcion': _texto(fila, 'descripcion'),
+                    'estado': (_texto(fila, 'estado') or 'EN TRAMITE').upper(),
+                    'visibilidad': visibilidad,
+                    'iuc': None,
+                }
+                referencia = _texto(fila, 'referencia')
+                if referencia:
+                    if referencia in referencias:
+                        raise ValueError(f"referencia repetida: {referencia}")
+                    referencias[referencia] = caso
+                casos.append(caso)
+            elif clase == 'documento':
+                tipo = _texto(fila, 'tipo')
+                if not tipo:
+                    raise ValueError("falta el tipo de documento")
+                ius_tipo = (_texto(fila, 'ius_tipo') or 'F').upper()
+                if ius_tipo not in ('F', 'A'):
+                    raise ValueError("ius_tipo inválido (F o A)")
+                documentos.append({
+                    'linea': linea, 'tipo': tipo.upper(), 'ius_tipo': ius_tipo,
+                    'titulo': _texto(fila, 'titulo'),
+                    'descripcion': _texto(fila, 'descripcion'),
+                    'link': _texto(fila, 'link'),
+                    'adjuntar_iuc': (_texto(fila, 'adjuntar_iuc') or '').upper() or None,
+                    'caso_ref': _texto(fila, 'caso_ref'),
+                })
+            else:
+                raise ValueError("clase debe ser 'caso' o 'documento'")
+        except ValueError as e:
+            errores.append((linea, str(e)))
+
+    # documentos: el caso debe existir (en la base o en el archivo) y no estar archivado
+    for doc in documentos:
+        if doc['caso_ref']:
+            if doc['caso_ref'] not in referencias:
+                errores.append((doc['linea'], f"caso_ref desconocida: {doc['caso_ref']}"))
+            elif referencias[doc['caso_ref']]['estado'] == 'ARCHIVADO':
+                errores.append((doc['linea'], "no puede adjuntarse a un caso archivado"))
+            else:
+                doc['caso'] = referencias[doc['caso_ref']]
+        elif doc['adjuntar_iuc']:
+            row = conn.execute("SELECT estado FROM casos WHERE iuc = ? AND guild_id IS ?",
+                               (doc['adjuntar_iuc'], guild_id)).fetchone()
+            if not row:
+                errores.append((doc['linea'], f"no existe el caso {doc['adjuntar_iuc']}"))
+            elif (row[0] or '').upper() == 'ARCHIVADO':
+                errores.append((doc['linea'], f"el caso {doc['adjuntar_iuc']} está archivado"))
+    return casos, documentos, errores
+
+
+def _asignar_iucs(conn, casos):
+    """Reserva un bloque de IUC por (tipo, año) para los casos sin consecutivo."""
+    grupos = {}
+    for caso in casos:
+        if caso['consecutivo'] is None:
+            grupos.setdefault((caso['tipo'], caso['anio']), []).append(caso)
+        else:
+            secuencias.asegurar_minimo(conn, 'IUC', caso['anio'], caso['tipo'], caso['consecutivo'])
+            caso['iuc'] = f"IUC-{caso['tipo']}-{caso['anio']}-{caso['consecutivo']:04d}"
+    for (tipo, anio), grupo in grupos.items():
+        numeros = secuencias.reservar(conn, 'IUC', anio, tipo, len(grupo))
+        for caso, numero in zip(grupo, numeros):
+            caso['iuc'] = f"IUC-{tipo}-{anio}-{numero:04d}"
+
+
+def _asignar_ius(conn, documentos):
+    """Reserva un bloque de IUS por (IUC, año, tipo) para los documentos adjuntos."""
+    grupos = {}
+    for doc in documentos:
+        iuc = doc['caso']['iuc'] if doc.get('caso') else doc['adjuntar_iuc']
+        doc['attached_iuc'] = iuc
+        if not iuc:
+            doc['ius'] = None
+            continue
+        partes = iuc.split('-')
+        anio = next((int(p) for p in partes if p.isdigit() and len(p) == 4), datetime.now().year)
+        try:
+            iuc_num = f"{int(partes[-1]):04d}"
+        except ValueError:
+            iuc_num = "0000"
+        grupos.setdefault((iuc_num, anio, doc['ius_tipo']), []).append(doc)
+    for (iuc_num, anio, tipo), grupo in grupos.items():
+        numeros = secuencias.reservar(conn, f"IUS-{iuc_num}", anio, tipo, len(grupo))
+        for doc, numero in zip(grupo, numeros):
+            doc['ius'] = f"IUS-{tipo}-{anio}-{iuc_num}-{numero}"
+
+
+def importar(conn, filas, registrado_por: str, guild_id: str = None) -> dict:
+    """Valida e inserta las filas en el servidor `guild_id`. Debe llamarse dentro
+    de una transacción (BaseDatos.transaccion); lanza ErrorImportacion sin
+    escribir nada si hay errores."""
+    casos, documentos, errores = _validar(conn, filas, guild_id)
+    if errores:
+        raise ErrorImportacion(errores)
+
+    _asignar_iucs(conn, casos)
+    _asignar_ius(conn, documentos)
+
+    conn.executemany(
+        """INSERT INTO casos (iuc, tipo, anio, implicado, estado, descripcion, visibilidad, guild_id)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        [(c['iuc'], TIPOS_CASO[c['tipo']], c['anio'], c['implicado'], c['estado'],
+          c['descripcion'], c['visibilidad'], guild_id) for c in casos])
+    for doc in documentos:
+        doc['drive_file_id'] = validador_drive.extraer_id(doc['link'])
+    conn.executemany(
+        """INSERT INTO documentos (tipo, titulo, descripcion, link_drive, ius, attached_iuc, registrado_por, guild_id,
+                                   drive_file_id)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        [(d['tipo'], d['titulo'], d['descripcion'], d['link'], d['ius'], d['attached_iuc'],
+          registrado_por, guild_id, d['drive_file_id']) for d in documentos])
+    for file_id in {d['drive_file_id'] for d in documentos if d['drive_file_id']}:
+        validador_drive.programar(conn, file_id)
+
+    return {
+        'casos': [(c['iuc'], c['visibilidad']) for c in casos],
+        'documentos': [(d['ius'], d['attached_iuc']) for d in documentos],
+    }
@@ -0,0 +1,43 @@
+"""
+Listados paginados por cursor (keyset): cada página continúa desde la última
+fila vista en lugar de usar OFFSET, así el costo por página es constante.
+"""
+
+POR_PAGINA = 20
+
+
+def pagina_pqrs(conn, guild_id, estado=None, tipo=None, anio=None, usuario_id=None, cursor=None,
+                limite=POR_PAGINA):
+    """Retorna (filas, siguiente_cursor) ordenadas de la más reciente a la más antigua.
+    Cada fila es (id, radicado, tipo, asunto, estado, fecha_radicacion).
+    Solo lista las PQRS del servidor `guild_id` (None = filas sin servidor).
+    `cursor` es la tupla (fecha_radicacion, id) de la última fila de la página anterior."""
+    # IS en lugar de = para que None compare con NULL; usa el índice igual que =
+    condiciones, params = ["guild_id IS ?"], [guild_id]
+    if estado:
+        condiciones.append("estado = ?")
+        params.append(estado)
+    if anio:
+        # rango sobre la columna indexada en lugar de strftime()
+        condiciones.append("fecha_radicacion >= ? AND fecha_radicacion < ?")
+        params += [f"{anio}-01-01", f"{anio + 1}-01-01"]
+    if tipo:
+        condiciones.append("tipo = ?")
+        params.append(tipo)
+    if usuario_id:
+        condiciones.append("usuario_id = ?")
+        params.append(str(usuario_id))
+    if cursor:
+        condiciones.append("(fecha_radicacion, id) < (?, ?)")
+        params += list(cursor)
+    filas = conn.execute(
+        f"""SELECT id, radicado, tipo, asunto, estado, fecha_radicacion FROM pqrs
+            WHERE {" AND ".join(condiciones)}
+            ORDER BY fecha_radicacion DESC, id DESC LIMIT ?""",
+        params + [limite + 1]
+    ).fetchall()
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = (filas[-1][5], filas[-1][0])
+    return filas, siguiente
@@ -0,0 +1,202 @@
+"""
+Métricas en formato de texto de Prometheus para el endpoint /metrics, sin
+dependencias externas. Contadores e histogramas se actualizan con un lock por
+métrica (se observan también desde los hilos de SQLite y Drive); los medidores
+pueden leer su valor de una función al momento de exponer.
+"""
+
+import functools
+import math
+import threading
+import time
+from bisect import bisect_left
+
+from discord import app_commands
+
+TIPO_CONTENIDO = 'text/plain; version=0.0.4; charset=utf-8'
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatear(valor) -> str:
+    if valor is None or (isinstance(valor, float) and math.isnan(valor)):
+        return 'NaN'
+    if valor == math.inf:
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Metrica:
+    tipo = ''
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def _clave(self, etiquetas: dict) -> tuple:
+        return tuple(str(etiquetas.get(e, '')) for e in self.etiquetas)
+
+    def _etiquetas(self, clave, extra='') -> str:
+        partes = [f'{e}="{_escapar(v)}"' for e, v in zip(self.etiquetas, clave)]
+        if extra:
+            partes.append(extra)
+        return '{' + ','.join(partes) + '}' if partes else ''
+
+    def _lineas(self):
+        raise NotImplementedError
+
+    def exponer(self) -> str:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        lineas.extend(self._lineas())
+        return '\n'.join(lineas)
+
+
+class Contador(_Metrica):
+    tipo = 'counter'
+
+    def inc(self, valor: float = 1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + valor
+
+    def _lineas(self):
+        with self._lock:
+            valores = list(self._valores.items())
+        return [f"{self.nombre}{self._etiquetas(k)} {_formatear(v)}" for k, v in valores]
+
+
+class Histograma(_Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+
+    def observar(self, valor: float, **etiquetas):
+        clave = self._clave(etiquetas)
+        i = bisect_left(self.buckets, valor)
+        with self._lock:
+            datos = self._valores.get(clave)
+            if datos is None:
+                # [conteo por bucket (no acumulado)..., +Inf], suma
+                datos = self._valores[clave] = [[0] * (len(self.buckets) + 1), 0.0]
+            datos[0][i] += 1
+            datos[1] += valor
+
+    def _lineas(self):
+        with self._lock:
+            valores = [(k, list(d[0]), d[1]) for k, d in self._valores.items()]
+        lineas = []
+        for clave, conteos, suma in valores:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (math.inf,), conteos):
+                acumulado += conteo
+                le = f'le="{_formatear(limite if limite == math.inf else float(limite))}"'
+                lineas.append(f"{self.nombre}_bucket{self._etiquetas(clave, le)} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{self._etiquetas(clave)} {_formatear(suma)}")
+            lineas.append(f"{self.nombre}_count{self._etiquetas(clave)} {acumulado}")
+        return lineas
+
+
+class Medidor(_Metrica):
+    """Valor instantáneo. Con `funcion`, se lee al exponer: puede retornar un
+    número o un dict {valor_etiqueta | tupla_etiquetas: número}. Con
+    tipo='counter' sirve para exponer contadores que ya lleva otro objeto."""
+    tipo = 'gauge'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), funcion=None, tipo='gauge'):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.funcion = funcion
+        self.tipo = tipo
+
+    def set(self, valor: float, **etiquetas):
+        with self._lock:
+            self._valores[self._clave(etiquetas)] = valor
+
+    def _lineas(self):
+        if self.funcion is not None:
+            try:
+                resultado = self.funcion()
+            except Exception:
+                resultado = None
+            if isinstance(resultado, dict):
+                valores = [(k if isinstance(k, tuple) else (k,), v) for k, v in resultado.items()]
+            else:
+                valores = [((), resultado)]
+        else:
+            with self._lock:
+                valores = list(self._valores.items())
+        return [f"{self.nombre}{self._etiquetas(k)} {_formatear(v)}" for k, v in valores]
+
+
+class Registro:
+    def __init__(self):
+        self._metricas = []
+
+    def _registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nombre, ayuda, etiquetas=()) -> Contador:
+        return self._registrar(Contador(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_SEGUNDOS) -> Histograma:
+        return self._registrar(Histograma(nombre, ayuda, etiquetas, buckets))
+
+    def medidor(self, nombre, ayuda, etiquetas=(), funcion=None, tipo='gauge') -> Medidor:
+        return self._registrar(Medidor(nombre, ayuda, etiquetas, funcion, tipo))
+
+    def exponer(self) -> str:
+        return '\n'.join(m.exponer() for m in self._metricas) + '\n'
+
+
+def instrumentar_comandos(tree: app_commands.CommandTree, duracion: Histograma):
+    """Envuelve el callback de cada comando del árbol para medir su duración
+    por comando y resultado (ok/error). Llamar después de definir los comandos:
+    discord.py ya extrajo los parámetros, así que solo se reemplaza la llamada."""
+    for comando in tree.walk_commands():
+        if isinstance(comando, app_commands.Command):
+            comando._callback = _medido(comando._callback, comando.qualified_name, duracion)
+
+
+def _medido(original, nombre, duracion):
+    @functools.wraps(original)
+    async def medido(*args, **kwargs):
+        inicio = time.perf_counter()
+        resultado = 'ok'
+        try:
+            return await original(*args, **kwargs)
+        except BaseException:
+            resultado = 'error'
+            raise
+        finally:
+            duracion.observar(time.perf_counter() - inicio, comando=nombre, resultado=resultado)
+    return medido
+
+
+def instrumentar_http(http, llamadas: Contador, duracion: Histograma):
+    """Envuelve HTTPClient.request de discord.py: cuenta las llamadas a la API
+    por ruta (plantilla, sin IDs) y estado, y mide su latencia."""
+    original = http.request
+
+    @functools.wraps(original)
+    async def request(route, **kwargs):
+        ruta = f"{route.method} {route.path}"
+        inicio = time.perf_counter()
+        estado = '2xx'
+        try:
+            return await original(route, **kwargs)
+        except Exception as e:
+            estado = str(getattr(e, 'status', None) or type(e).__name__)
+            raise
+        finally:
+            duracion.observar(time.perf_counter() - inicio, ruta=ruta)
+            llamadas.inc(ruta=ruta, estado=estado)
+
+    http.request = request
@@ -0,0 +1,349 @@
+"""
+Migraciones versionadas del esquema de procuraduria.db.
+Cada migración se aplica una sola vez, en orden, y queda registrada en la
+tabla schema_version. Se ejecutan al arrancar el bot o con migrate_db.py.
+"""
+
+import os
+from datetime import datetime
+
+import cambios_externos
+import secuencias
+import validador_drive
+
+
+def _columnas(conn, tabla):
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({tabla})")}
+
+
+def _agregar_columna(conn, tabla, columna, tipo):
+    if columna not in _columnas(conn, tabla):
+        conn.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} {tipo}")
+
+
+def _001_esquema_inicial(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS documentos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo TEXT NOT NULL,
+        titulo TEXT,
+        descripcion TEXT,
+        link_drive TEXT,
+        ius TEXT UNIQUE,
+        attached_iuc TEXT,
+        fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        registrado_por TEXT
+    )''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS pqrs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        radicado TEXT UNIQUE NOT NULL,
+        tipo TEXT NOT NULL,
+        usuario_id TEXT NOT NULL,
+        usuario_nombre TEXT NOT NULL,
+        asunto TEXT NOT NULL,
+        descripcion TEXT NOT NULL,
+        estado TEXT DEFAULT 'PENDIENTE',
+        fecha_radicacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        fecha_respuesta TIMESTAMP,
+        respuesta TEXT,
+        canal_mensaje_id TEXT
+    )''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS casos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        iuc TEXT UNIQUE NOT NULL,
+        tipo TEXT NOT NULL,
+        anio INTEGER NOT NULL,
+        implicado TEXT,
+        estado TEXT DEFAULT 'EN TRAMITE',
+        descripcion TEXT,
+        visibilidad TEXT DEFAULT 'PUBLICO',
+        fecha_apertura TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        fecha_cierre TIMESTAMP,
+        mensaje_id TEXT,
+        canal_registros_id TEXT
+    )''')
+
+    # Bases creadas con versiones anteriores del bot
+    _agregar_columna(conn, "documentos", "ius", "TEXT")
+    _agregar_columna(conn, "documentos", "attached_iuc", "TEXT")
+    _agregar_columna(conn, "casos", "visibilidad", "TEXT DEFAULT 'PUBLICO'")
+    _agregar_columna(conn, "casos", "fecha_cierre", "TIMESTAMP")
+    _agregar_columna(conn, "casos", "mensaje_id", "TEXT")
+    _agregar_columna(conn, "casos", "canal_registros_id", "TEXT")
+
+
+def _002_contadores(conn):
+    secuencias.crear_tabla(conn)
+
+
+def _003_indices(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_documentos_attached_iuc ON documentos(attached_iuc)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pqrs_usuario_radicado ON pqrs(usuario_id, radicado)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pqrs_estado_fecha ON pqrs(estado, fecha_radicacion)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_casos_tipo_anio ON casos(tipo, anio)")
+
+
+# tabla -> columnas indexadas en su tabla FTS5 (contenido externo)
+FTS_COLUMNAS = {
+    'casos': ('implicado', 'descripcion'),
+    'documentos': ('titulo', 'descripcion'),
+    'pqrs': ('asunto', 'descripcion'),
+}
+
+
+def _004_busqueda_fts(conn):
+    for tabla, columnas in FTS_COLUMNAS.items():
+        cols = ", ".join(columnas)
+        nuevos = ", ".join(f"new.{c}" for c in columnas)
+        viejos = ", ".join(f"old.{c}" for c in columnas)
+        conn.execute(f"""CREATE VIRTUAL TABLE IF NOT EXISTS {tabla}_fts USING fts5(
+            {cols}, content='{tabla}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {tabla}_fts_ai AFTER INSERT ON {tabla} BEGIN
+            INSERT INTO {tabla}_fts(rowid, {cols}) VALUES (new.id, {nuevos});
+        END""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {tabla}_fts_ad AFTER DELETE ON {tabla} BEGIN
+            INSERT INTO {tabla}_fts({tabla}_fts, rowid, {cols}) VALUES ('delete', old.id, {viejos});
+        END""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {tabla}_fts_au AFTER UPDATE OF {cols} ON {tabla} BEGIN
+            INSERT INTO {tabla}_fts({tabla}_fts, rowid, {cols}) VALUES ('delete', old.id, {viejos});
+            INSERT INTO {tabla}_fts(rowid, {cols}) VALUES (new.id, {nuevos});
+        END""")
+        # indexar las filas que ya existían
+        conn.execute(f"INSERT INTO {tabla}_fts({tabla}_fts) VALUES ('rebuild')")
+
+
+def _005_indices_listado_pqrs(conn):
+    # llave de paginación por cursor de /listar-pqrs: (estado, fecha_radicacion, id)
+    conn.execute("DROP INDEX IF EXISTS idx_pqrs_estado_fecha")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pqrs_estado_fecha_id ON pqrs(estado, fecha_radicacion, id)")
+    # mismo orden sin filtro de estado
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pqrs_fecha_id ON pqrs(fecha_radicacion, id)")
+
+
+# tabla -> columna de fecha en hora local (bot.py la escribe con datetime.now());
+# las demás fechas salen de CURRENT_TIMESTAMP, en UTC como actualizado_en
+FECHAS_LOCALES = {
+    'casos': 'fecha_cierre',
+    'pqrs': 'fecha_respuesta',
+}
+
+# tabla -> fecha (en UTC) usada para rellenar actualizado_en en filas existentes
+TABLAS_CON_CAMBIOS = {
+    'casos': "COALESCE(datetime(fecha_cierre, 'utc'), fecha_apertura)",
+    'documentos': 'fecha_registro',
+    'pqrs': "COALESCE(datetime(fecha_respuesta, 'utc'), fecha_radicacion)",
+}
+
+
+def _006_marcas_de_cambio(conn):
+    # actualizado_en lo mantienen triggers; ALTER TABLE no admite DEFAULT CURRENT_TIMESTAMP
+    for tabla, fecha in TABLAS_CON_CAMBIOS.items():
+        _agregar_columna(conn, tabla, "actualizado_en", "TIMESTAMP")
+        conn.execute(f"UPDATE {tabla} SET actualizado_en = COALESCE({fecha}, CURRENT_TIMESTAMP)")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {tabla}_actualizado_ai AFTER INSERT ON {tabla} BEGIN
+            UPDATE {tabla} SET actualizado_en = CURRENT_TIMESTAMP WHERE id = new.id;
+        END""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {tabla}_actualizado_au AFTER UPDATE ON {tabla}
+            WHEN new.actualizado_en IS old.actualizado_en BEGIN
+            UPDATE {tabla} SET actualizado_en = CURRENT_TIMESTAMP WHERE id = new.id;
+        END""")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{tabla}_actualizado ON {tabla}(actualizado_en)")
+    conn.execute('''CREATE TABLE IF NOT EXISTS marcas_exportacion (
+        tabla TEXT PRIMARY KEY,
+        marca TIMESTAMP NOT NULL
+    )''')
+
+
+def _007_outbox(conn):
+    # mensajes de Discord pendientes, escritos en la misma transacción que el cambio (ver outbox.py)
+    conn.execute('''CREATE TABLE IF NOT EXISTS outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ruta TEXT NOT NULL,
+        destino TEXT NOT NULL,
+        contenido TEXT,
+        embed TEXT,
+        al_entregar TEXT,
+        clave TEXT,
+        estado TEXT DEFAULT 'PENDIENTE',
+        intentos INTEGER DEFAULT 0,
+        proximo_intento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        ultimo_error TEXT,
+        creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        entregado_en TIMESTAMP
+    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_estado_proximo ON outbox(estado, proximo_intento, id)")
+    # orden de entrega por destino
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_estado_destino ON outbox(estado, ruta, destino, id)")
+
+
+def _008_multi_guild(conn):
+    # configuración por servidor (ver configuracion.py); los IDs de Discord como TEXT
+    conn.execute('''CREATE TABLE IF NOT EXISTS configuracion_guild (
+        guild_id TEXT PRIMARY KEY,
+        canal_pqrs_id TEXT,
+        canal_registros_id TEXT,
+        rol_procuraduria_id TEXT,
+        rol_responder_id TEXT,
+        drive_folder_id TEXT,
+        actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    guild_id = os.getenv('GUILD_ID')
+    for tabla in ('casos', 'documentos', 'pqrs'):
+        _agregar_columna(conn, tabla, "guild_id", "TEXT")
+        # las filas existentes son del servidor de GUILD_ID; sin él las asigna
+        # el bot al conectarse (si está en un solo servidor) o admin.py asignar-guild
+        if guild_id:
+            conn.execute(f"UPDATE {tabla} SET guild_id = ? WHERE guild_id IS NULL", (guild_id,))
+    # /listar-pqrs filtra por servidor con la misma llave de paginación que _005
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pqrs_guild_fecha_id ON pqrs(guild_id, fecha_radicacion, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pqrs_guild_estado_fecha_id ON pqrs(guild_id, estado, fecha_radicacion, id)")
+    # filtro por usuario: sin este índice se recorren todas las PQRS del servidor
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pqrs_guild_usuario_fecha_id ON pqrs(guild_id, usuario_id, fecha_radicacion, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_casos_guild ON casos(guild_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_documentos_guild ON documentos(guild_id)")
+
+
+def _009_metadatos_drive(conn):
+    # metadatos de los archivos de Drive enlazados por los documentos (ver validador_drive.py)
+    conn.execute('''CREATE TABLE IF NOT EXISTS drive_metadatos (
+        file_id TEXT PRIMARY KEY,
+        estado TEXT NOT NULL DEFAULT 'PENDIENTE',
+        nombre TEXT,
+        mime TEXT,
+        tamano INTEGER,
+        modificado TEXT,
+        error TEXT,
+        intentos INTEGER DEFAULT 0,
+        verificado_en TIMESTAMP,
+        proximo TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_drive_metadatos_proximo ON drive_metadatos(proximo)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_drive_metadatos_estado ON drive_metadatos(estado)")
+    _agregar_columna(conn, 'documentos', 'drive_file_id', 'TEXT')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_documentos_drive_file ON documentos(drive_file_id)")
+    # el ID se extrae del link en Python; los documentos actualizados quedan
+    # con actualizado_en nuevo y la próxima exportación incremental los incluye
+    ids = [(validador_drive.extraer_id(link), doc_id)
+           for doc_id, link in conn.execute("SELECT id, link_drive FROM documentos WHERE link_drive IS NOT NULL")]
+    conn.executemany("UPDATE documentos SET drive_file_id = ? WHERE id = ?", [p for p in ids if p[0]])
+    conn.execute("""INSERT OR IGNORE INTO drive_metadatos (file_id)
+                    SELECT DISTINCT drive_file_id FROM documentos WHERE drive_file_id IS NOT NULL""")
+
+
+def _010_cambios_externos(conn):
+    # generación que sube admin.py en cada transacción (ver cambios_externos.py)
+    cambios_externos.crear_tabla(conn)
+
+
+def _trigger_version(tabla: str, sufijo: str, evento: str, condicion: str = '') -> str:
+    """Trigger que marca la fila con la hora y la siguiente versión de cambios."""
+    return f"""CREATE TRIGGER IF NOT EXISTS {tabla}_actualizado_{sufijo} AFTER {evento} ON {tabla} {condicion} BEGIN
+        UPDATE version_cambios SET version = version + 1 WHERE id = 1;
+        UPDATE {tabla} SET actualizado_en = CURRENT_TIMESTAMP,
+            version = (SELECT version FROM version_cambios WHERE id = 1) WHERE id = new.id;
+    END"""
+
+
+def _011_version_de_cambios(conn):
+    # contador de cambios para la exportación incremental (ver exportar.py): el
+    # trigger de cada escritura sube version_cambios dentro de la transacción y
+    # SQLite admite un solo escritor a la vez, así que las versiones quedan en
+    # el orden de los commits (una marca de reloj no lo garantiza)
+    conn.execute('''CREATE TABLE IF NOT EXISTS version_cambios (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    )''')
+    conn.execute("INSERT OR IGNORE INTO version_cambios (id, version) VALUES (1, 0)")
+    marcas = dict(conn.execute("SELECT tabla, marca FROM marcas_exportacion"))
+    nuevas_marcas = {}
+    for tabla in TABLAS_CON_CAMBIOS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {tabla}_actualizado_ai")
+        conn.execute(f"DROP TRIGGER IF EXISTS {tabla}_actualizado_au")
+        _agregar_columna(conn, tabla, "version", "INTEGER")
+
+        # versiones de las filas existentes en el orden de actualizado_en, primero
+        # las ya exportadas: la marca de la tabla pasa a ser la última de ellas
+        base = conn.execute("SELECT version FROM version_cambios WHERE id = 1").fetchone()[0]
+        marca = marcas.get(tabla)
+        conn.execute("CREATE TEMP TABLE orden_version (id INTEGER PRIMARY KEY, n INTEGER NOT NULL)")
+        conn.execute(f"""INSERT INTO orden_version (id, n)
+            SELECT id, ROW_NUMBER() OVER (ORDER BY actualizado_en > ?, actualizado_en, id) FROM {tabla}""", (marca,))
+        conn.execute(f"UPDATE {tabla} SET version = ? + (SELECT n FROM orden_version o WHERE o.id = {tabla}.id)",
+                     (base,))
+        filas = conn.execute("SELECT COUNT(*) FROM orden_version").fetchone()[0]
+        conn.execute("DROP TABLE orden_version")
+        conn.execute("UPDATE version_cambios SET version = version + ? WHERE id = 1", (filas,))
+        if marca is not None:
+            exportadas = conn.execute(
+                f"SELECT COUNT(*) FROM {tabla} WHERE actualizado_en <= ?", (marca,)).fetchone()[0]
+            nuevas_marcas[tabla] = base + exportadas
+
+        # la migración 6 rellenó actualizado_en con fechas en hora local
+        local = FECHAS_LOCALES.get(tabla)
+        if local:
+            conn.execute(
+                f"UPDATE {tabla} SET actualizado_en = datetime({local}, 'utc') WHERE actualizado_en = {local}")
+
+        conn.execute(_trigger_version(tabla, 'ai', 'INSERT'))
+        conn.execute(_trigger_version(tabla, 'au', 'UPDATE', 'WHEN new.version IS old.version'))
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{tabla}_version ON {tabla}(version)")
+
+    conn.execute("DROP TABLE marcas_exportacion")
+    conn.execute('''CREATE TABLE marcas_exportacion (
+        tabla TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    )''')
+    conn.executemany("INSERT INTO marcas_exportacion (tabla, version) VALUES (?, ?)", nuevas_marcas.items())
+
+
+# (versión, descripción, función) en orden de aplicación
+MIGRACIONES = [
+    (1, "esquema inicial", _001_esquema_inicial),
+    (2, "tabla de contadores", _002_contadores),
+    (3, "índices de consultas frecuentes", _003_indices),
+    (4, "búsqueda de texto completo (FTS5)", _004_busqueda_fts),
+    (5, "índices de paginación de PQRS", _005_indices_listado_pqrs),
+    (6, "marcas de cambio para exportación incremental", _006_marcas_de_cambio),
+    (7, "outbox de mensajes de Discord", _007_outbox),
+    (8, "configuración y datos por servidor", _008_multi_guild),
+    (9, "metadatos de archivos de Drive", _009_metadatos_drive),
+    (10, "aviso de cambios hechos fuera del bot", _010_cambios_externos),
+    (11, "versión de cambios para exportación incremental", _011_version_de_cambios),
+]
+
+
+def version_actual(conn) -> int:
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def aplicar(conn) -> list:
+    """Aplica las migraciones pendientes y retorna las versiones aplicadas.
+    `conn` debe estar en autocommit (ver basedatos.conectar)."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        descripcion TEXT,
+        aplicada_en TIMESTAMP
+    )''')
+    aplicadas = []
+    for version, descripcion, migrar in MIGRACIONES:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # releer dentro de la transacción por si otro proceso ya la aplicó
+            if version <= version_actual(conn):
+                conn.execute("ROLLBACK")
+                continue
+            migrar(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, descripcion, aplicada_en) VALUES (?, ?, ?)",
+                (version, descripcion, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        aplicadas.append(version)
+    return aplicadas
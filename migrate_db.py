@@ -1,30 +1,17 @@
-import sqlite3
+import migraciones
+from basedatos import DB_PATH, conectar
 
-DB = 'procuraduria.db'
+conn = conectar(DB_PATH)
+try:
+    aplicadas = migraciones.aplicar(conn)
+    version = migraciones.version_actual(conn)
+finally:
+    conn.close()
 
-alterations = [
-    ("documentos", "ius", "TEXT"),
-    ("documentos", "attached_iuc", "TEXT"),
-    ("casos", "visibilidad", "TEXT DEFAULT 'PUBLICO'"),
-    ("casos", "fecha_cierre", "TIMESTAMP")
-]
+if aplicadas:
+    for v in aplicadas:
+        print(f"+ Aplicada migración {v}")
+else:
+    print("- La base de datos ya estaba actualizada")
 
-conn = sqlite3.connect(DB)
-cur = conn.cursor()
-
-for table, column, coltype in alterations:
-    cur.execute(f"PRAGMA table_info({table})")
-    cols = [r[1] for r in cur.fetchall()]
-    if column in cols:
-        print(f"- La columna '{column}' ya existe en '{table}'")
-    else:
-        try:
-            cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {coltype}")
-            print(f"+ Añadida columna '{column}' a tabla '{table}'")
-        except Exception as e:
-            print(f"! Error añadiendo {column} a {table}: {e}")
-
-conn.commit()
-conn.close()
-
-print("Migración completa. Si quieres, reinicia el bot ahora.")
+print(f"Migración completa (versión {version}). Si quieres, reinicia el bot ahora.")
@@ -0,0 +1,252 @@
+"""
+Outbox de mensajes de Discord (logs del canal de registros, avisos de PQRS y
+DMs). Los comandos escriben la fila con `encolar` dentro de la misma
+transacción que el cambio, responden de inmediato, y el Despachador entrega
+en segundo plano:
+
+- en orden de id por destino: un mensaje que falla retiene a los siguientes
+  del mismo canal/usuario, pero no a los demás destinos;
+- con reintentos exponenciales guardados en la tabla, así nada se pierde al
+  reiniciar;
+- respetando los rate limits por ruta: un destino limitado espera su
+  retry_after sin frenar el resto.
+
+La entrega es "al menos una vez": si el bot cae entre el envío y la marca de
+entregado, el mensaje se repite al volver a arrancar.
+"""
+
+import asyncio
+import json
+import random
+
+import discord
+
+CANAL = 'canal'
+DM = 'dm'
+
+LOTE = 50
+CONCURRENCIA = 5      # envíos simultáneos a destinos distintos
+MAX_INTENTOS = 8
+ESPERA_BASE = 5       # segundos antes del primer reintento
+ESPERA_MAXIMA = 3600
+INTERVALO = 30        # revisión periódica aunque nadie despierte al despachador
+DIAS_RETENCION = 7    # los entregados se borran pasado este tiempo
+
+_SQL_LISTOS = """
+SELECT id, ruta, destino, contenido, embed, al_entregar, clave, intentos FROM outbox o
+WHERE estado = 'PENDIENTE' AND proximo_intento <= CURRENT_TIMESTAMP
+  AND NOT EXISTS (
+      SELECT 1 FROM outbox p
+      WHERE p.estado = 'PENDIENTE' AND p.ruta = o.ruta AND p.destino = o.destino
+        AND p.id < o.id AND p.proximo_intento > CURRENT_TIMESTAMP
+  )
+ORDER BY id LIMIT ?
+"""
+
+
+def encolar(conn, ruta: str, destino, contenido: str = None, embed: discord.Embed = None,
+            al_entregar: str = None, clave=None) -> int:
+    """Agrega un mensaje al outbox. Debe llamarse dentro de la transacción del
+    cambio que lo origina. `al_entregar` es el nombre de un callback registrado
+    con Despachador.al_entregar, que recibe (mensaje, clave) tras el envío."""
+    if ruta not in (CANAL, DM):
+        raise ValueError(f"Ruta no soportada: {ruta}")
+    c = conn.execute(
+        """INSERT INTO outbox (ruta, destino, contenido, embed, al_entregar, clave)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        (ruta, str(destino), contenido,
+         json.dumps(embed.to_dict(), ensure_ascii=False) if embed else None,
+         al_entregar, None if clave is None else str(clave)))
+    return c.lastrowid
+
+
+def _espera(intentos: int) -> float:
+    espera = min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** (intentos - 1))
+    return espera * (0.8 + random.random() * 0.4)
+
+
+class Despachador:
+    """Entrega en segundo plano los mensajes pendientes del outbox."""
+
+    def __init__(self, bot, db, lote: int = LOTE, max_intentos: int = MAX_INTENTOS,
+                 concurrencia: int = CONCURRENCIA):
+        self.bot = bot
+        self.db = db
+        self.lote = lote
+        self.max_intentos = max_intentos
+        self.entregados = 0
+        self.fallidos = 0
+        self._callbacks = {}
+        self._limitados = {}  # (ruta, destino) -> loop.time() hasta el que no se envía
+        self._despertar = asyncio.Event()
+        self._finalizados = asyncio.Event()
+        self._semaforo = asyncio.Semaphore(concurrencia)
+        self._tarea = None
+
+    def al_entregar(self, nombre: str):
+        """Decorador que registra un callback async (mensaje, clave)."""
+        def registrar(func):
+            self._callbacks[nombre] = func
+            return func
+        return registrar
+
+    def iniciar(self):
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.create_task(self._bucle())
+
+    def despertar(self):
+        """Avisa que hay mensajes nuevos (llamar después del commit)."""
+        self._despertar.set()
+
+    async def detener(self):
+        if self._tarea:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    async def pendientes(self) -> int:
+        row = await self.db.fetchone("SELECT COUNT(*) FROM outbox WHERE estado = 'PENDIENTE'")
+        return row[0]
+
+    async def estados(self, ids) -> dict:
+        """{id: (estado, ultimo_error)} de las filas indicadas."""
+        ids = list(ids)
+        resultado = {}
+        for i in range(0, len(ids), 500):
+            parte = ids[i:i + 500]
+            filas = await self.db.fetchall(
+                f"SELECT id, estado, ultimo_error FROM outbox WHERE id IN ({','.join('?' * len(parte))})", parte)
+            resultado.update({f[0]: (f[1], f[2]) for f in filas})
+        return resultado
+
+    async def esperar(self, ids, progreso=None, limite: float = 600, intervalo: float = 2.0) -> dict:
+        """Espera a que las filas `ids` se entreguen o fallen (o a que pase
+        `limite` segundos) y retorna sus estados. `progreso(entregados, fallidos, total)`
+        es una corrutina opcional que se llama cuando cambian las cifras."""
+        ids = list(ids)
+        loop = asyncio.get_running_loop()
+        fin = loop.time() + limite
+        anterior = None
+        while True:
+            self._finalizados.clear()
+            estados = await self.estados(ids)
+            entregados = sum(1 for e, _ in estados.values() if e == 'ENTREGADO')
+            fallidos = sum(1 for e, _ in estados.values() if e == 'FALLIDO')
+            if progreso and (entregados, fallidos) != anterior:
+                anterior = (entregados, fallidos)
+                await progreso(entregados, fallidos, len(ids))
+            restante = fin - loop.time()
+            if entregados + fallidos >= len(ids) or restante <= 0:
+                return estados
+            # despierta con cada entrega, pero no más de una vez por intervalo
+            try:
+                await asyncio.wait_for(self._finalizados.wait(), timeout=restante)
+            except asyncio.TimeoutError:
+                pass
+            await asyncio.sleep(min(intervalo, max(0, fin - loop.time())))
+
+    async def _bucle(self):
+        await self.bot.wait_until_ready()
+        loop = asyncio.get_running_loop()
+        proxima_limpieza = 0
+        while True:
+            self._despertar.clear()
+            lleno = False
+            try:
+                lleno = await self._ronda()
+                if loop.time() >= proxima_limpieza:
+                    await self.db.execute(
+                        "DELETE FROM outbox WHERE estado = 'ENTREGADO' AND entregado_en < datetime('now', ?)",
+                        (f"-{DIAS_RETENCION} days",))
+                    proxima_limpieza = loop.time() + 3600
+            except Exception as e:
+                print(f"Error en el despachador del outbox: {e}")
+            if lleno:
+                continue
+            ahora = loop.time()
+            espera = min([INTERVALO] + [max(0.1, t - ahora) for t in self._limitados.values()])
+            try:
+                await asyncio.wait_for(self._despertar.wait(), timeout=espera)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _ronda(self) -> bool:
+        """Procesa un lote; retorna True si vino lleno (puede haber más)."""
+        filas = await self.db.fetchall(_SQL_LISTOS, (self.lote,))
+        ahora = asyncio.get_running_loop().time()
+        self._limitados = {k: t for k, t in self._limitados.items() if t > ahora}
+        grupos = {}
+        for fila in filas:
+            destino = (fila[1], fila[2])
+            if destino not in self._limitados:
+                grupos.setdefault(destino, []).append(fila)
+        await asyncio.gather(*(self._entregar_grupo(destino, g) for destino, g in grupos.items()))
+        return len(filas) == self.lote and bool(grupos)
+
+    async def _entregar_grupo(self, destino, filas):
+        # en orden; si uno no sale, los siguientes del mismo destino esperan
+        for fila in filas:
+            if not await self._entregar(destino, fila):
+                return
+
+    async def _enviar(self, ruta, destino, contenido, embed):
+        if ruta == CANAL:
+            canal = self.bot.get_channel(int(destino)) or self.bot.get_partial_messageable(int(destino))
+        else:
+            canal = self.bot.get_user(int(destino)) or await self.bot.fetch_user(int(destino))
+        kwargs = {}
+        if contenido:
+            kwargs['content'] = contenido
+        if embed:
+            kwargs['embed'] = discord.Embed.from_dict(json.loads(embed))
+        return await canal.send(**kwargs)
+
+    async def _entregar(self, destino, fila) -> bool:
+        id_, ruta, destino_id, contenido, embed, al_entregar, clave, intentos = fila
+        try:
+            async with self._semaforo:
+                mensaje = await self._enviar(ruta, destino_id, contenido, embed)
+        except discord.RateLimited as e:
+            # no cuenta como intento: el destino queda en pausa hasta retry_after
+            self._limitados[destino] = asyncio.get_running_loop().time() + e.retry_after
+            return False
+        except (discord.Forbidden, discord.NotFound) as e:
+            # canal borrado, sin permisos o usuario con DMs cerrados: no tiene sentido reintentar
+            await self._fallar(id_, intentos + 1, e, definitivo=True)
+            return True
+        except Exception as e:
+            await self._fallar(id_, intentos + 1, e)
+            return False
+
+        await self.db.execute(
+            "UPDATE outbox SET estado = 'ENTREGADO', intentos = ?, entregado_en = CURRENT_TIMESTAMP, "
+            "ultimo_error = NULL WHERE id = ?", (intentos + 1, id_))
+        self.entregados += 1
+        self._finalizados.set()
+        if al_entregar:
+            callback = self._callbacks.get(al_entregar)
+            try:
+                if callback is None:
+                    raise KeyError(f"callback no registrado: {al_entregar}")
+                await callback(mensaje, clave)
+            except Exception as e:
+                print(f"Error en callback {al_entregar} del outbox #{id_}: {e}")
+        return True
+
+    async def _fallar(self, id_, intentos, error, definitivo=False):
+        error = f"{type(error).__name__}: {error}"[:500]
+        if definitivo or intentos >= self.max_intentos:
+            await self.db.execute(
+                "UPDATE outbox SET estado = 'FALLIDO', intentos = ?, ultimo_error = ? WHERE id = ?",
+                (intentos, error, id_))
+            self.fallidos += 1
+            self._finalizados.set()
+            print(f"⚠️ Outbox #{id_} descartado tras {intentos} intentos: {error}")
+        else:
+            await self.db.execute(
+                "UPDATE outbox SET intentos = ?, ultimo_error = ?, "
+                "proximo_intento = datetime('now', ?) WHERE id = ?",
+                (intentos, error, f"+{_espera(intentos):.0f} seconds", id_))
@@ -0,0 +1,87 @@
+"""
+Resolución de permisos por rol (Procuraduría y responder PQRS).
+Los roles de cada servidor salen de su configuración (ver configuracion.py);
+el conjunto de permisos de cada miembro se calcula una vez y se cachea hasta
+que cambien sus roles (on_member_update), los roles del servidor o su
+configuración (/configurar).
+"""
+
+import discord
+from discord import app_commands
+
+PROCURADURIA = 'procuraduria'
+RESPONDER = 'responder'
+
+
+class ResolutorPermisos:
+    def __init__(self, roles):
+        """roles: función guild_id -> {permiso: ID de rol} (0/None = no
+        configurado), o ese mismo dict si es igual para todos los servidores."""
+        if callable(roles):
+            self._roles_de = roles
+        else:
+            self._roles_de = lambda guild_id: roles
+        self._cache = {}
+
+    def _roles(self, guild_id) -> dict:
+        return {permiso: int(rol_id) for permiso, rol_id in self._roles_de(guild_id).items() if rol_id}
+
+    def configurado(self, permiso: str, guild_id=None) -> bool:
+        return permiso in self._roles(guild_id)
+
+    def rol_id(self, permiso: str, guild_id=None):
+        return self._roles(guild_id).get(permiso)
+
+    def permisos(self, usuario) -> frozenset:
+        guild = getattr(usuario, 'guild', None)
+        if guild is None:
+            # discord.User (DM): sin roles
+            return frozenset()
+        clave = (guild.id, usuario.id)
+        resultado = self._cache.get(clave)
+        if resultado is None:
+            resultado = frozenset(
+                permiso for permiso, rol_id in self._roles(guild.id).items()
+                if usuario.get_role(rol_id) is not None
+            )
+            self._cache[clave] = resultado
+        return resultado
+
+    def tiene(self, usuario, permiso: str) -> bool:
+        return permiso in self.permisos(usuario)
+
+    def invalidar(self, guild_id: int, miembro_id: int = None):
+        """Olvida un miembro, o todo el servidor si no se indica miembro."""
+        if miembro_id is not None:
+            self._cache.pop((guild_id, miembro_id), None)
+            return
+        for clave in [k for k in self._cache if k[0] == guild_id]:
+            del self._cache[clave]
+
+    @property
+    def tamano(self) -> int:
+        return len(self._cache)
+
+    def registrar_eventos(self, bot):
+        """Conecta la invalidación a los eventos de miembros y roles."""
+        async def on_member_update(before: discord.Member, after: discord.Member):
+            if before.roles != after.roles:
+                self.invalidar(after.guild.id, after.id)
+
+        async def on_member_remove(member: discord.Member):
+            self.invalidar(member.guild.id, member.id)
+
+        async def on_guild_role_delete(role: discord.Role):
+            self.invalidar(role.guild.id)
+
+        for listener in (on_member_update, on_member_remove, on_guild_role_delete):
+            bot.add_listener(listener)
+
+    def check(self, permiso: str, mensaje: str = "❌ No tienes permisos para usar este comando"):
+        """Decorador app_commands.check que exige `permiso`."""
+        async def predicate(interaction: discord.Interaction) -> bool:
+            if self.tiene(interaction.user, permiso):
+                return True
+            await interaction.response.send_message(mensaje, ephemeral=True)
+            return False
+        return app_commands.check(predicate)
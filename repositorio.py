@@ -0,0 +1,194 @@
+"""
+Acceso tipado a casos, documentos y PQRS. Cada tabla tiene su tipo de fila
+(dataclass con __slots__), su lista explícita de columnas y las operaciones
+obtener/listar/insertar/actualizar/eliminar.
+
+Las sentencias se arman una sola vez por tabla (y por combinación de
+columnas en INSERT/UPDATE), así el texto SQL no cambia entre llamadas y
+sqlite3 reutiliza la sentencia preparada de la caché de cada conexión (ver
+basedatos.conectar). Como nunca se usa SELECT *, agregar columnas a la base
+no cambia lo que leen los comandos hasta que se agreguen al dataclass.
+"""
+
+from dataclasses import dataclass, fields
+
+TAMANO_LOTE = 500  # límite de parámetros por sentencia en versiones antiguas de SQLite
+_CUALQUIERA = object()
+
+
+@dataclass(slots=True)
+class Caso:
+    id: int = None
+    iuc: str = None
+    tipo: str = None
+    anio: int = None
+    implicado: str = None
+    estado: str = None
+    descripcion: str = None
+    visibilidad: str = None
+    fecha_apertura: str = None
+    fecha_cierre: str = None
+    mensaje_id: str = None
+    canal_registros_id: str = None
+    actualizado_en: str = None
+    guild_id: str = None
+
+    @property
+    def reservado(self) -> bool:
+        return (self.visibilidad or 'PUBLICO').upper() == 'RESERVADO'
+
+    @property
+    def archivado(self) -> bool:
+        return (self.estado or '').upper() == 'ARCHIVADO'
+
+
+@dataclass(slots=True)
+class Documento:
+    id: int = None
+    tipo: str = None
+    titulo: str = None
+    descripcion: str = None
+    link_drive: str = None
+    ius: str = None
+    attached_iuc: str = None
+    fecha_registro: str = None
+    registrado_por: str = None
+    actualizado_en: str = None
+    guild_id: str = None
+    drive_file_id: str = None
+
+
+@dataclass(slots=True)
+class Pqrs:
+    id: int = None
+    radicado: str = None
+    tipo: str = None
+    usuario_id: str = None
+    usuario_nombre: str = None
+    asunto: str = None
+    descripcion: str = None
+    estado: str = None
+    fecha_radicacion: str = None
+    fecha_respuesta: str = None
+    respuesta: str = None
+    canal_mensaje_id: str = None
+    actualizado_en: str = None
+    guild_id: str = None
+
+
+def como_dict(fila) -> dict:
+    """Fila como dict columna -> valor (para JSON)."""
+    return {campo.name: getattr(fila, campo.name) for campo in fields(fila)}
+
+
+class Tabla:
+    """Operaciones sobre una tabla. `tipo` es el dataclass de sus filas,
+    `clave` la columna única con la que se busca (IUC, IUS, radicado) y
+    `orden` la fecha por la que se listan."""
+
+    def __init__(self, nombre: str, tipo, clave: str, orden: str):
+        self.nombre = nombre
+        self.tipo = tipo
+        self.clave = clave
+        self.orden = orden
+        self.columnas = tuple(campo.name for campo in fields(tipo))
+        self._select = f"SELECT {', '.join(self.columnas)} FROM {nombre}"
+        self._sql_id = f"{self._select} WHERE id = ?"
+        self._sql_clave = f"{self._select} WHERE {clave} = ?"
+        self._sql_clave_guild = f"{self._select} WHERE {clave} = ? AND guild_id IS ?"
+        self._sql_eliminar = f"DELETE FROM {nombre} WHERE id = ?"
+        # columnas -> sentencia, para no volver a armar el texto en cada llamada
+        self._sql_insertar = {}
+        self._sql_actualizar = {}
+
+    def _fila(self, valores):
+        return self.tipo(*valores) if valores else None
+
+    def _columnas(self, valores: dict) -> tuple:
+        invalidas = [c for c in valores if c not in self.columnas or c == 'id']
+        if invalidas:
+            raise ValueError(f"Columnas inválidas para {self.nombre}: {', '.join(invalidas)}")
+        return tuple(valores)
+
+    def por_id(self, conn, fila_id: int):
+        return self._fila(conn.execute(self._sql_id, (fila_id,)).fetchone())
+
+    def obtener(self, conn, clave: str, guild_id=_CUALQUIERA):
+        """Fila por su clave (None si no existe). Con `guild_id`, solo si es de
+        ese servidor (None = filas sin servidor)."""
+        if guild_id is _CUALQUIERA:
+            fila = conn.execute(self._sql_clave, (clave,)).fetchone()
+        else:
+            fila = conn.execute(self._sql_clave_guild, (clave, guild_id)).fetchone()
+        return self._fila(fila)
+
+    def obtener_varios(self, conn, claves: list) -> list:
+        filas = []
+        for i in range(0, len(claves), TAMANO_LOTE):
+            lote = claves[i:i + TAMANO_LOTE]
+            filas += conn.execute(
+                f"{self._select} WHERE {self.clave} IN ({','.join('?' * len(lote))})", lote).fetchall()
+        return [self.tipo(*f) for f in filas]
+
+    def listar(self, conn, estado: str = None, limite: int = None) -> list:
+        """Filas de la más reciente a la más antigua."""
+        sql, params = self._select, []
+        if estado:
+            sql += " WHERE estado = ?"
+            params.append(estado)
+        sql += f" ORDER BY {self.orden} DESC, id DESC"
+        if limite:
+            sql += " LIMIT ?"
+            params.append(limite)
+        return [self.tipo(*f) for f in conn.execute(sql, params)]
+
+    def insertar(self, conn, **valores) -> int:
+        """Inserta una fila con las columnas indicadas y retorna su id."""
+        columnas = self._columnas(valores)
+        sql = self._sql_insertar.get(columnas)
+        if sql is None:
+            sql = self._sql_insertar[columnas] = (
+                f"INSERT INTO {self.nombre} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})")
+        return conn.execute(sql, tuple(valores.values())).lastrowid
+
+    def actualizar(self, conn, fila_id: int, **valores) -> bool:
+        """Cambia las columnas indicadas de la fila; False si no existe."""
+        columnas = self._columnas(valores)
+        sql = self._sql_actualizar.get(columnas)
+        if sql is None:
+            sql = self._sql_actualizar[columnas] = (
+                f"UPDATE {self.nombre} SET {', '.join(f'{c} = ?' for c in columnas)} WHERE id = ?")
+        return conn.execute(sql, (*valores.values(), fila_id)).rowcount > 0
+
+    def eliminar(self, conn, fila_id: int) -> bool:
+        return conn.execute(self._sql_eliminar, (fila_id,)).rowcount > 0
+
+
+class TablaDocumentos(Tabla):
+    """Documentos, con las operaciones sobre los adjuntos de un caso."""
+
+    def __init__(self):
+        super().__init__('documentos', Documento, 'ius', 'fecha_registro')
+        self._sql_de_caso = f"{self._select} WHERE attached_iuc = ? ORDER BY fecha_registro, id"
+
+    def de_caso(self, conn, iuc: str) -> list:
+        """Documentos adjuntos al caso en orden de registro."""
+        return [Documento(*f) for f in conn.execute(self._sql_de_caso, (iuc,))]
+
+    def hay_de_caso(self, conn, iuc: str) -> bool:
+        return conn.execute("SELECT EXISTS(SELECT 1 FROM documentos WHERE attached_iuc = ?)", (iuc,)).fetchone()[0] == 1
+
+    def eliminar_de_caso(self, conn, iuc: str) -> list:
+        """Elimina los adjuntos del caso y retorna los documentos eliminados."""
+        eliminados = self.de_caso(conn, iuc)
+        conn.execute("DELETE FROM documentos WHERE attached_iuc = ?", (iuc,))
+        return eliminados
+
+    def renombrar_caso(self, conn, anterior: str, nuevo: str) -> int:
+        return conn.execute(
+            "UPDATE documentos SET attached_iuc = ? WHERE attached_iuc = ?", (nuevo, anterior)).rowcount
+
+
+casos = Tabla('casos', Caso, 'iuc', 'fecha_apertura')
+documentos = TablaDocumentos()
+pqrs = Tabla('pqrs', Pqrs, 'radicado', 'fecha_radicacion')
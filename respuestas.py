@@ -0,0 +1,85 @@
+"""
+Respuesta de PQRS por lotes (/responder-pqrs-lote): lectura de pares
+radicado/respuesta desde CSV y actualización de todas las filas en una sola
+sentencia executemany. Las notificaciones por DM las encola el llamador en el
+outbox dentro de la misma transacción.
+"""
+
+import csv
+import io
+import re
+
+MAX_LOTE = 500
+TAMANO_CONSULTA = 500  # límite de parámetros por sentencia en versiones antiguas de SQLite
+
+
+def leer_respuestas(contenido: str) -> list:
+    """Retorna [(radicado, respuesta)] desde un CSV de dos columnas. El
+    encabezado (radicado,respuesta) es opcional."""
+    contenido = contenido.lstrip('﻿')
+    pares = []
+    for fila in csv.reader(io.StringIO(contenido)):
+        if len(fila) < 2 or not fila[0].strip():
+            continue
+        radicado, respuesta = fila[0].strip().upper(), fila[1].strip()
+        if radicado == 'RADICADO':
+            continue
+        pares.append((radicado, respuesta))
+    return pares
+
+
+def leer_radicados(texto: str) -> list:
+    """Radicados separados por comas, espacios o saltos de línea."""
+    return [r.upper() for r in re.split(r"[\s,;]+", texto or "") if r]
+
+
+def aplicar_plantilla(plantilla: str, radicado: str, asunto: str) -> str:
+    # reemplazo literal: la respuesta puede contener llaves sin que falle
+    return plantilla.replace("{radicado}", radicado).replace("{asunto}", asunto or "")
+
+
+def responder(conn, pares, fecha: str, guild_id: str, incluir_respondidas: bool = False) -> dict:
+    """Marca como RESPONDIDA cada radicado con su respuesta. Debe llamarse
+    dentro de una transacción. Los radicados de otros servidores cuentan
+    como no encontrados. Retorna:
+      respondidas:     [(radicado, usuario_id, asunto, respuesta)]
+      no_encontradas:  [radicado]
+      ya_respondidas:  [radicado] (omitidas salvo `incluir_respondidas`)
+      repetidas:       [radicado] (solo cuenta la primera aparición)"""
+    vistos, unicos, repetidas = set(), [], []
+    for radicado, respuesta in pares:
+        if radicado in vistos:
+            repetidas.append(radicado)
+            continue
+        vistos.add(radicado)
+        unicos.append((radicado, respuesta))
+
+    radicados = [r for r, _ in unicos]
+    filas = {}
+    for i in range(0, len(radicados), TAMANO_CONSULTA):
+        parte = radicados[i:i + TAMANO_CONSULTA]
+        for r in conn.execute(
+                f"""SELECT radicado, usuario_id, asunto, estado FROM pqrs
+                    WHERE radicado IN ({','.join('?' * len(parte))}) AND guild_id IS ?""",
+                parte + [guild_id]):
+            filas[r[0]] = r
+
+    respondidas, no_encontradas, ya_respondidas = [], [], []
+    for radicado, respuesta in unicos:
+        fila = filas.get(radicado)
+        if not fila:
+            no_encontradas.append(radicado)
+        elif fila[3] == 'RESPONDIDA' and not incluir_respondidas:
+            ya_respondidas.append(radicado)
+        else:
+            respondidas.append((radicado, fila[1], fila[2], aplicar_plantilla(respuesta, radicado, fila[2])))
+
+    conn.executemany(
+        "UPDATE pqrs SET estado = 'RESPONDIDA', respuesta = ?, fecha_respuesta = ? WHERE radicado = ?",
+        [(respuesta, fecha, radicado) for radicado, _, _, respuesta in respondidas])
+    return {
+        'respondidas': respondidas,
+        'no_encontradas': no_encontradas,
+        'ya_respondidas': ya_respondidas,
+        'repetidas': repetidas,
+    }
@@ -0,0 +1,83 @@
+"""
+Consecutivos para radicados PQRS, IUC e IUS.
+Cada serie vive en la tabla `contadores` con clave (serie, anio, tipo), así
+que asignar un número es actualizar una sola fila por llave primaria. Las
+funciones reciben la conexión del llamador y deben ejecutarse dentro de su
+transacción (BaseDatos.transaccion) para que el número y el INSERT que lo usa
+se confirmen juntos.
+"""
+
+
+def crear_tabla(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS contadores (
+        serie TEXT NOT NULL,
+        anio INTEGER NOT NULL,
+        tipo TEXT NOT NULL DEFAULT '',
+        valor INTEGER NOT NULL,
+        PRIMARY KEY (serie, anio, tipo)
+    ) WITHOUT ROWID''')
+
+
+def _origen(serie: str, anio: int, tipo: str):
+    """Retorna (tabla, columna, prefijo) de los números ya emitidos en la serie."""
+    if serie == 'PQRS':
+        return 'pqrs', 'radicado', f"PQRS-{anio}-"
+    if serie == 'IUC':
+        return 'casos', 'iuc', f"IUC-{tipo}-{anio}-"
+    if serie.startswith('IUS-'):
+        return 'documentos', 'ius', f"IUS-{tipo}-{anio}-{serie[4:]}-"
+    raise ValueError(f"Serie desconocida: {serie}")
+
+
+def _valor_inicial(conn, serie: str, anio: int, tipo: str) -> int:
+    """Mayor número ya usado en la serie; solo se consulta la primera vez
+    que se asigna un número de una llave sin contador (en IUS, el primer
+    documento de cada caso). El rango [prefijo, prefijo con el último carácter
+    siguiente) usa el índice UNIQUE de la columna y recorre solo la serie;
+    LIKE no distingue mayúsculas y recorrería el índice completo."""
+    tabla, columna, prefijo = _origen(serie, anio, tipo)
+    fin = prefijo[:-1] + chr(ord(prefijo[-1]) + 1)
+    row = conn.execute(
+        f"SELECT MAX(CAST(substr({columna}, ?) AS INTEGER)) FROM {tabla} WHERE {columna} >= ? AND {columna} < ?",
+        (len(prefijo) + 1, prefijo, fin)
+    ).fetchone()
+    return row[0] or 0
+
+
+def reservar(conn, serie: str, anio: int, tipo: str = '', cantidad: int = 1) -> range:
+    """Reserva `cantidad` números consecutivos de la serie y los retorna como range.
+    Los números nunca se reutilizan, ni siquiera si se borra el registro."""
+    if cantidad < 1:
+        raise ValueError("cantidad debe ser mayor que cero")
+    c = conn.execute(
+        "UPDATE contadores SET valor = valor + ? WHERE serie = ? AND anio = ? AND tipo = ?",
+        (cantidad, serie, anio, tipo)
+    )
+    if c.rowcount == 0:
+        conn.execute(
+            "INSERT INTO contadores (serie, anio, tipo, valor) VALUES (?, ?, ?, ?)",
+            (serie, anio, tipo, _valor_inicial(conn, serie, anio, tipo) + cantidad)
+        )
+    ultimo = conn.execute(
+        "SELECT valor FROM contadores WHERE serie = ? AND anio = ? AND tipo = ?",
+        (serie, anio, tipo)
+    ).fetchone()[0]
+    return range(ultimo - cantidad + 1, ultimo + 1)
+
+
+def siguiente(conn, serie: str, anio: int, tipo: str = '') -> int:
+    """Asigna el siguiente número de la serie."""
+    return reservar(conn, serie, anio, tipo, 1)[0]
+
+
+def asegurar_minimo(conn, serie: str, anio: int, tipo: str, valor: int):
+    """Garantiza que el contador sea al menos `valor` (números asignados a mano)."""
+    c = conn.execute(
+        "UPDATE contadores SET valor = MAX(valor, ?) WHERE serie = ? AND anio = ? AND tipo = ?",
+        (valor, serie, anio, tipo)
+    )
+    if c.rowcount == 0:
+        conn.execute(
+            "INSERT INTO contadores (serie, anio, tipo, valor) VALUES (?, ?, ?, ?)",
+            (serie, anio, tipo, max(valor, _valor_inicial(conn, serie, anio, tipo)))
+        )
@@ -0,0 +1,60 @@
+"""
+Sincronización de los comandos de barra condicionada a una huella.
+tree.sync() es una llamada a la API con rate limit estricto; solo se hace
+cuando el hash de las definiciones (to_dict de cada comando) difiere del
+último sincronizado, que se guarda en disco junto a la base de datos.
+"""
+
+import hashlib
+import json
+import os
+
+from basedatos import DB_PATH
+
+HUELLAS_PATH = os.getenv(
+    'COMANDOS_HUELLA_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), 'comandos_sincronizados.json')
+)
+
+
+def _destino(guild) -> str:
+    return str(guild.id) if guild else 'global'
+
+
+def huella(tree, guild=None) -> str:
+    """sha256 de las definiciones que se enviarían con tree.sync(guild=guild)."""
+    definiciones = sorted(
+        (c.to_dict() for c in tree.get_commands(guild=guild)),
+        key=lambda d: (d.get('type', 1), d['name'])
+    )
+    contenido = json.dumps(definiciones, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def leer_huellas(ruta: str = HUELLAS_PATH) -> dict:
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def guardar_huella(destino: str, valor: str, ruta: str = HUELLAS_PATH):
+    huellas = leer_huellas(ruta)
+    huellas[destino] = valor
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(huellas, f, indent=2)
+    os.replace(temporal, ruta)
+
+
+async def sincronizar(tree, guild=None, forzar: bool = False, ruta: str = HUELLAS_PATH):
+    """Sincroniza si cambió la huella (o si `forzar`). Retorna la lista de
+    comandos sincronizados, o None si no hizo falta."""
+    destino = _destino(guild)
+    actual = huella(tree, guild)
+    if not forzar and leer_huellas(ruta).get(destino) == actual:
+        return None
+    sincronizados = await tree.sync(guild=guild)
+    guardar_huella(destino, actual, ruta)
+    return sincronizados
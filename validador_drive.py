@@ -0,0 +1,298 @@
+"""
+Validación en segundo plano de los links de Drive de los documentos.
+
+Al registrar un documento se extrae el ID del archivo de su link
+(documentos.drive_file_id) y se agenda en la tabla drive_metadatos. El
+ValidadorDrive toma los archivos vencidos, los consulta a la API de Drive de
+a LOTE por petición HTTP (batch) y guarda nombre, tipo MIME, tamaño y fecha
+de modificación, o el motivo por el que el link ya no sirve:
+
+    DISPONIBLE      el archivo existe y no está en la papelera
+    PAPELERA        el archivo está en la papelera
+    NO_ENCONTRADO   el archivo no existe (o la cuenta de servicio no lo ve)
+    SIN_ACCESO      existe pero la cuenta de servicio no tiene permiso
+    ERROR           falla transitoria (cuota, 5xx, red): se reintenta pronto
+
+Cada archivo se vuelve a revisar cada REFRESCO (con jitter, para repartir
+las revisiones); los ERROR se reintentan con backoff exponencial.
+"""
+
+import asyncio
+import os
+import random
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from urllib.parse import urlparse
+
+from drive import LOTE_METADATOS, es_limite_de_uso, metadatos_en_lote
+
+PENDIENTE = 'PENDIENTE'
+DISPONIBLE = 'DISPONIBLE'
+PAPELERA = 'PAPELERA'
+NO_ENCONTRADO = 'NO_ENCONTRADO'
+SIN_ACCESO = 'SIN_ACCESO'
+ERROR = 'ERROR'
+ROTOS = (PAPELERA, NO_ENCONTRADO, SIN_ACCESO)
+DESCRIPCIONES = {
+    PENDIENTE: "sin verificar",
+    DISPONIBLE: "disponible",
+    PAPELERA: "en la papelera de Drive",
+    NO_ENCONTRADO: "no existe en Drive",
+    SIN_ACCESO: "sin permiso de lectura",
+    ERROR: "no se pudo verificar",
+}
+
+REFRESCO = float(os.getenv('DRIVE_VALIDACION_HORAS', 24)) * 3600
+ESPERA_ERROR = 300     # segundos antes del primer reintento de un ERROR
+INTERVALO = 300        # revisión periódica aunque nadie despierte al validador
+ESPERA_INICIAL = 60    # no competir con el arranque del bot
+
+_HOSTS = ('drive.google.com', 'docs.google.com')
+# /file/d/<id>, /document/d/<id>, /drive/folders/<id>, ...?id=<id>
+_RUTA_ID = re.compile(r'/(?:d|folders)/([-\w]{10,})')
+_PARAMETRO_ID = re.compile(r'(?:^|&)id=([-\w]{10,})')
+
+
+def extraer_id(link: str):
+    """ID del archivo de un link de Google Drive/Docs; None si no es uno."""
+    try:
+        url = urlparse((link or '').strip())
+    except ValueError:
+        return None
+    host = (url.hostname or '').lower()
+    if not any(host == h or host.endswith('.' + h) for h in _HOSTS):
+        return None
+    encontrado = _RUTA_ID.search(url.path) or _PARAMETRO_ID.search(url.query)
+    return encontrado.group(1) if encontrado else None
+
+
+@dataclass(slots=True)
+class MetadatosDrive:
+    file_id: str = None
+    estado: str = None
+    nombre: str = None
+    mime: str = None
+    tamano: int = None
+    modificado: str = None
+    error: str = None
+    intentos: int = None
+    verificado_en: str = None
+    proximo: str = None
+
+    @property
+    def roto(self) -> bool:
+        return self.estado in ROTOS
+
+    def descripcion(self) -> str:
+        return DESCRIPCIONES.get(self.estado, self.estado)
+
+
+_COLUMNAS = ', '.join(campo.name for campo in fields(MetadatosDrive))
+
+
+# ==================== TABLA drive_metadatos ====================
+def programar(conn, file_id: str):
+    """Agenda la verificación inmediata del archivo (nuevo o ya conocido).
+    Debe llamarse dentro de la transacción que registra el documento."""
+    conn.execute(
+        """INSERT INTO drive_metadatos (file_id) VALUES (?)
+           ON CONFLICT(file_id) DO UPDATE SET proximo = CURRENT_TIMESTAMP""", (file_id,))
+
+
+def obtener(conn, file_id: str):
+    if not file_id:
+        return None
+    fila = conn.execute(f"SELECT {_COLUMNAS} FROM drive_metadatos WHERE file_id = ?", (file_id,)).fetchone()
+    return MetadatosDrive(*fila) if fila else None
+
+
+def vencidos(conn, limite: int) -> list:
+    """IDs a verificar ahora, los más atrasados primero."""
+    return [f[0] for f in conn.execute(
+        "SELECT file_id FROM drive_metadatos WHERE proximo <= CURRENT_TIMESTAMP ORDER BY proximo LIMIT ?",
+        (limite,))]
+
+
+def conteos(conn) -> dict:
+    return dict(conn.execute("SELECT estado, COUNT(*) FROM drive_metadatos GROUP BY estado").fetchall())
+
+
+def rotos(conn, guild_id=None) -> list:
+    """(ius, título, link, estado, verificado_en) de los documentos con link
+    roto; con `guild_id`, solo los de ese servidor."""
+    sql = f"""SELECT d.ius, d.titulo, d.link_drive, m.estado, m.verificado_en
+              FROM drive_metadatos m JOIN documentos d ON d.drive_file_id = m.file_id
+              WHERE m.estado IN ({','.join('?' * len(ROTOS))})"""
+    params = list(ROTOS)
+    if guild_id is not None:
+        sql += " AND d.guild_id IS ?"
+        params.append(str(guild_id))
+    return conn.execute(sql + " ORDER BY d.fecha_registro, d.id", params).fetchall()
+
+
+def podar(conn) -> int:
+    """Borra los archivos que ya no enlaza ningún documento."""
+    return conn.execute(
+        """DELETE FROM drive_metadatos WHERE NOT EXISTS
+           (SELECT 1 FROM documentos d WHERE d.drive_file_id = drive_metadatos.file_id)""").rowcount
+
+
+def _clasificar(metadatos, error) -> tuple:
+    """(estado, metadatos, error) de la respuesta de Drive a un archivo."""
+    if error is None:
+        return (PAPELERA if metadatos.get('trashed') else DISPONIBLE), metadatos, None
+    estado = ERROR
+    status = error.resp.status
+    if status == 404:
+        estado = NO_ENCONTRADO
+    elif status == 403 and not es_limite_de_uso(error):
+        estado = SIN_ACCESO
+    return estado, None, f"{status} {error.reason}"[:200]
+
+
+def _espera(estado: str, intentos: int, refresco: float, espera_error: float) -> float:
+    if estado == ERROR:
+        espera = min(refresco, espera_error * 2 ** (intentos - 1))
+    else:
+        espera = refresco
+    return espera * (0.9 + random.random() * 0.2)
+
+
+def guardar(conn, resultados: dict, refresco: float = REFRESCO, espera_error: float = ESPERA_ERROR) -> list:
+    """Guarda file_id -> (estado, metadatos, error) y agenda la próxima revisión.
+    Un ERROR conserva el estado y los metadatos de la última verificación.
+    Retorna los IDs que pasaron a un estado roto. Debe llamarse dentro de una
+    transacción."""
+    anteriores = {}  # file_id -> (estado, intentos)
+    ids = list(resultados)
+    for i in range(0, len(ids), 500):
+        parte = ids[i:i + 500]
+        anteriores.update((f[0], f[1:]) for f in conn.execute(
+            f"SELECT file_id, estado, intentos FROM drive_metadatos WHERE file_id IN ({','.join('?' * len(parte))})",
+            parte))
+    actualizados, errores, nuevos_rotos = [], [], []
+    for file_id, (estado, datos, error) in resultados.items():
+        if file_id not in anteriores:
+            continue  # podado mientras se verificaba
+        anterior, intentos = anteriores[file_id]
+        if estado == ERROR:
+            intentos = (intentos or 0) + 1
+            errores.append((error, intentos, _espera(ERROR, intentos, refresco, espera_error), file_id))
+            continue
+        if estado in ROTOS and anterior not in ROTOS:
+            nuevos_rotos.append(file_id)
+        datos = datos or {}
+        tamano = datos.get('size')
+        actualizados.append((
+            estado, datos.get('name'), datos.get('mimeType'), int(tamano) if tamano else None,
+            datos.get('modifiedTime'), error, _espera(estado, 0, refresco, espera_error), file_id))
+    conn.executemany(
+        """UPDATE drive_metadatos SET estado = ?, nombre = ?, mime = ?, tamano = ?, modificado = ?,
+               error = ?, intentos = 0, verificado_en = CURRENT_TIMESTAMP,
+               proximo = datetime('now', '+' || CAST(? AS INTEGER) || ' seconds')
+           WHERE file_id = ?""", actualizados)
+    conn.executemany(
+        """UPDATE drive_metadatos SET estado = CASE WHEN estado = 'PENDIENTE' THEN 'ERROR' ELSE estado END,
+               error = ?, intentos = ?, proximo = datetime('now', '+' || CAST(? AS INTEGER) || ' seconds')
+           WHERE file_id = ?""", errores)
+    return nuevos_rotos
+
+
+# ==================== TAREA DE FONDO ====================
+class ValidadorDrive:
+    """Verifica en segundo plano los archivos vencidos de drive_metadatos.
+    `crear_servicio()` se llama una vez en el hilo propio del validador
+    (httplib2 no es seguro entre hilos); `disponible()` indica si Drive está
+    configurado y se consulta una vez antes de empezar."""
+
+    def __init__(self, db, crear_servicio, disponible=lambda: True, lote: int = LOTE_METADATOS,
+                 refresco: float = REFRESCO, espera_error: float = ESPERA_ERROR, intervalo: float = INTERVALO,
+                 espera_inicial: float = ESPERA_INICIAL, observar=None):
+        self.db = db
+        self.lote = min(lote, LOTE_METADATOS)
+        self.refresco = refresco
+        self.espera_error = espera_error
+        self.intervalo = intervalo
+        self.espera_inicial = espera_inicial
+        self.verificados = 0
+        self.peticiones = 0
+        self.rotos_detectados = 0
+        self._crear_servicio = crear_servicio
+        self._disponible = disponible
+        self._observar = observar
+        self._servicio = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='drive-validador')
+        self._despertar = asyncio.Event()
+        self._tarea = None
+
+    def iniciar(self):
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.create_task(self._bucle())
+
+    def despertar(self):
+        """Avisa que hay archivos nuevos agendados (llamar después del commit)."""
+        self._despertar.set()
+
+    async def detener(self):
+        if self._tarea:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+        self._executor.shutdown(wait=False)
+
+    async def _esperar(self, segundos: float):
+        try:
+            await asyncio.wait_for(self._despertar.wait(), timeout=segundos)
+        except asyncio.TimeoutError:
+            pass
+        self._despertar.clear()
+
+    async def _bucle(self):
+        await self._esperar(self.espera_inicial)
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(self._executor, self._disponible):
+            print("⚠️ Google Drive no configurado: no se validan los links de los documentos")
+            return
+        while True:
+            try:
+                verificados = await self.verificar_vencidos()
+            except Exception as e:
+                print(f"Error validando links de Drive: {e}")
+                verificados = 0
+            if verificados < self.lote:
+                # no quedan vencidos: quitar los archivos sin documentos y esperar
+                if verificados:
+                    await self.db.transaccion(podar)
+                await self._esperar(self.intervalo)
+
+    def _consultar(self, file_ids):
+        if self._servicio is None:
+            self._servicio = self._crear_servicio()
+        return metadatos_en_lote(self._servicio, file_ids, self._observar)
+
+    async def verificar_vencidos(self) -> int:
+        """Verifica un lote de archivos vencidos y retorna cuántos eran."""
+        file_ids = await self.db.run(vencidos, self.lote)
+        if not file_ids:
+            return 0
+        loop = asyncio.get_running_loop()
+        self.peticiones += 1
+        try:
+            respuestas = await loop.run_in_executor(self._executor, self._consultar, file_ids)
+            resultados = {i: _clasificar(*respuestas[i]) for i in file_ids if i in respuestas}
+        except Exception as e:
+            # falló la petición completa (tras sus reintentos): todo el lote a backoff
+            print(f"Error consultando metadatos de Drive: {e}")
+            resultados = {}
+        for file_id in file_ids:
+            resultados.setdefault(file_id, (ERROR, None, "sin respuesta de Drive"))
+        nuevos_rotos = await self.db.transaccion(guardar, resultados, self.refresco, self.espera_error)
+        self.verificados += len(file_ids)
+        self.rotos_detectados += len(nuevos_rotos)
+        if nuevos_rotos:
+            print(f"⚠️ {len(nuevos_rotos)} links de Drive dejaron de funcionar (ver admin.py links-rotos)")
+        return len(file_ids)
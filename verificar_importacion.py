@@ -0,0 +1,83 @@
+"""
+Control del tiempo de importación de bot.py (arranque en frío).
+
+Importa el bot en un proceso nuevo con `python -X importtime`, toma la
+mediana de varias corridas y falla si supera el presupuesto o si se importan
+módulos que deben cargarse en el primer uso (cliente de Google Drive).
+
+    python verificar_importacion.py                 # presupuesto por defecto
+    IMPORT_BUDGET_MS=800 python verificar_importacion.py --corridas 5
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+PRESUPUESTO_MS = float(os.getenv('IMPORT_BUDGET_MS', 1500))
+# no deben importarse al cargar bot.py (ver drive.ClienteDrive)
+PROHIBIDOS = ('googleapiclient', 'google.oauth2', 'google.auth')
+
+_LINEA = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def medir(modulo: str = 'bot') -> tuple:
+    """Importa `modulo` en un proceso nuevo. Retorna (ms acumulados, [(ms, módulo)] más lentos, módulos cargados)."""
+    codigo = f"import sys, json; import {modulo}; print(json.dumps(sorted(sys.modules)))"
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    resultado = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', codigo],
+        cwd=directorio, capture_output=True, text=True, check=True)
+    total, propios = None, []
+    for linea in resultado.stderr.splitlines():
+        m = _LINEA.match(linea)
+        if not m:
+            continue
+        acumulado, nombre = int(m.group(2)), m.group(4)
+        # sangría de 3 espacios: importado directamente por `modulo`
+        if len(m.group(3)) == 3:
+            propios.append((acumulado / 1000, nombre))
+        if nombre == modulo:
+            total = acumulado / 1000
+    cargados = json.loads(resultado.stdout.strip().splitlines()[-1])
+    return total, sorted(propios, reverse=True)[:10], cargados
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Verifica el presupuesto de tiempo de importación de bot.py")
+    parser.add_argument('--modulo', default='bot')
+    parser.add_argument('--corridas', type=int, default=3)
+    parser.add_argument('--presupuesto-ms', type=float, default=PRESUPUESTO_MS)
+    args = parser.parse_args(argv)
+
+    tiempos = []
+    for _ in range(args.corridas):
+        total, mas_lentos, cargados = medir(args.modulo)
+        tiempos.append(total)
+    mediana = statistics.median(tiempos)
+
+    print(f"Importar {args.modulo}: mediana {mediana:.0f} ms en {args.corridas} corridas "
+          f"(presupuesto {args.presupuesto_ms:.0f} ms)")
+    print("Dependencias directas más lentas:")
+    for ms, nombre in mas_lentos:
+        print(f"  {ms:8.1f} ms  {nombre}")
+
+    errores = []
+    if mediana > args.presupuesto_ms:
+        errores.append(f"la importación tarda {mediana:.0f} ms, más que el presupuesto de {args.presupuesto_ms:.0f} ms")
+    prohibidos = sorted(m for m in cargados if m.startswith(PROHIBIDOS))
+    if prohibidos:
+        errores.append("se importan al arrancar módulos que deben cargarse en el primer uso: "
+                       + ", ".join(prohibidos[:5]) + (" …" if len(prohibidos) > 5 else ""))
+    for error in errores:
+        print(f"❌ {error}")
+    if not errores:
+        print("✅ Dentro del presupuesto")
+    return 1 if errores else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
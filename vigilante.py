@@ -0,0 +1,140 @@
+"""
+Vigilante del event loop: detecta llamadas bloqueantes (SQLite, Drive u otro
+código síncrono ejecutado dentro de una corrutina).
+
+Una tarea del loop late cada `intervalo` y mide su propio retraso. Un hilo
+aparte revisa el último latido; si el loop lleva más de `umbral` sin latir,
+captura la pila del hilo del loop (sys._current_frames) mientras sigue
+bloqueado y la atribuye a la tarea en ejecución y al comando que la inició.
+"""
+
+import asyncio
+import collections
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+
+import discord
+from discord import app_commands
+
+UMBRAL = 0.25      # segundos sin latir para considerar el loop bloqueado
+INTERVALO = 0.05   # periodo del latido
+MAX_REPORTES = 20  # reportes recientes que se conservan para /vigilante
+
+
+class Vigilante:
+    def __init__(self, umbral: float = UMBRAL, intervalo: float = INTERVALO,
+                 observar_retraso=None, al_bloqueo=None):
+        """`observar_retraso(segundos)` recibe el retraso de cada latido (en el loop);
+        `al_bloqueo(reporte)` se llama desde el hilo vigilante con cada bloqueo."""
+        self.umbral = umbral
+        self.intervalo = intervalo
+        self.observar_retraso = observar_retraso
+        self.al_bloqueo = al_bloqueo
+        self.reportes = collections.deque(maxlen=MAX_REPORTES)
+        self.retraso_maximo = 0.0
+        self._comandos = {}  # tarea -> (comando, usuario, inicio)
+        self._loop = None
+        self._hilo_loop = None
+        self._ultimo_latido = 0.0
+        self._reporte_abierto = None
+        self._tarea = None
+        self._detenido = threading.Event()
+
+    # ---------- seguimiento de comandos ----------
+    def seguir_comandos(self, tree):
+        """Envuelve los callbacks de los comandos para saber cuál corre en cada tarea."""
+        for comando in tree.walk_commands():
+            if isinstance(comando, app_commands.Command):
+                comando._callback = self._seguido(comando._callback, comando.qualified_name)
+
+    def _seguido(self, original, nombre):
+        async def seguido(*args, **kwargs):
+            tarea = asyncio.current_task()
+            interaction = next((a for a in args if isinstance(a, discord.Interaction)), None)
+            usuario = str(interaction.user) if interaction else None
+            self._comandos[tarea] = (nombre, usuario, time.monotonic())
+            try:
+                return await original(*args, **kwargs)
+            finally:
+                self._comandos.pop(tarea, None)
+        seguido.__name__ = getattr(original, '__name__', nombre)
+        seguido.__wrapped__ = original
+        return seguido
+
+    # ---------- ciclo de vida ----------
+    def iniciar(self):
+        if self._tarea is not None and not self._tarea.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._hilo_loop = threading.get_ident()
+        self._ultimo_latido = time.monotonic()
+        self._detenido.clear()
+        self._tarea = self._loop.create_task(self._latir())
+        threading.Thread(target=self._vigilar, name='vigilante', daemon=True).start()
+
+    def detener(self):
+        self._detenido.set()
+        if self._tarea:
+            self._tarea.cancel()
+            self._tarea = None
+
+    async def _latir(self):
+        while True:
+            antes = time.monotonic()
+            await asyncio.sleep(self.intervalo)
+            ahora = time.monotonic()
+            retraso = max(0.0, ahora - antes - self.intervalo)
+            self._ultimo_latido = ahora
+            self.retraso_maximo = max(self.retraso_maximo, retraso)
+            if self.observar_retraso:
+                self.observar_retraso(retraso)
+            reporte = self._reporte_abierto
+            if reporte is not None:
+                # el loop volvió: completar la duración del bloqueo ya reportado
+                self._reporte_abierto = None
+                reporte['duracion'] = round(retraso + self.intervalo, 3)
+                print(f"⏱️ Event loop liberado tras {reporte['duracion']:.3f}s ({reporte['origen']})")
+
+    # ---------- hilo vigilante ----------
+    def _vigilar(self):
+        while not self._detenido.wait(self.intervalo):
+            bloqueado = time.monotonic() - self._ultimo_latido
+            if bloqueado >= self.umbral and self._reporte_abierto is None:
+                try:
+                    self._reportar(bloqueado)
+                except Exception as e:
+                    print(f"Error del vigilante: {e}")
+
+    def _reportar(self, bloqueado: float):
+        frame = sys._current_frames().get(self._hilo_loop)
+        pila = traceback.format_stack(frame) if frame else []
+        tarea = asyncio.current_task(self._loop)
+        comando = self._comandos.get(tarea) if tarea else None
+        en_curso = [
+            {'comando': c, 'usuario': u, 'segundos': round(time.monotonic() - t, 3)}
+            for c, u, t in list(self._comandos.values())
+        ]
+        if comando:
+            origen = f"/{comando[0]}"
+        elif tarea:
+            origen = f"tarea {tarea.get_name()} ({getattr(tarea.get_coro(), '__qualname__', '?')})"
+        else:
+            origen = "callback fuera de tareas"
+        reporte = {
+            'fecha': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'origen': origen,
+            'comando': comando[0] if comando else None,
+            'usuario': comando[1] if comando else None,
+            'bloqueado': round(bloqueado, 3),
+            'duracion': None,
+            'en_curso': en_curso,
+            'pila': [linea.rstrip() for linea in pila],
+        }
+        self._reporte_abierto = reporte
+        self.reportes.append(reporte)
+        print(f"⚠️ Event loop bloqueado {bloqueado:.3f}s en {origen}\n" + "".join(pila[-8:]))
+        if self.al_bloqueo:
+            self.al_bloqueo(reporte)